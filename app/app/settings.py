@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -55,11 +56,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,22 +91,147 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# core.db.backends.postgresql adds to the PostgreSQL backend the health
+# checks of Django 4.1 and an in-process connection pool. DB_CONN_MAX_AGE
+# keeps the connection of each thread open between requests; it is best
+# left at 0 under runserver, which starts a thread per request. Setting
+# DB_POOL_SIZE instead shares that many connections among the threads of a
+# worker, which suits threaded and ASGI workers.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
         'PORT': 5432,
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': os.environ.get(
+            'DB_CONN_HEALTH_CHECKS', 'true'
+        ).lower() in ('1', 'true', 'yes', 'on'),
+        'POOL': {
+            'MAX_SIZE': int(os.environ['DB_POOL_SIZE']),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+        } if os.environ.get('DB_POOL_SIZE') else None,
     }
 }
 
+# Read replicas of the default database, one per host in DB_REPLICA_HOSTS.
+# Without replicas replica_1 points at the default database, so the tests
+# can route reads to it as a mirror of default.
+DB_REPLICA_HOSTS = [
+    host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host
+]
+for index, host in enumerate(
+    DB_REPLICA_HOSTS or [DATABASES['default']['HOST']],
+    start=1
+):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+# Safe requests read from the replicas, except for STICKY_SECONDS after a
+# write made with the same credentials. CACHE_ALIAS must name a cache shared
+# by every worker, or the other workers do not see the writes.
+REPLICA_ROUTING = {
+    'ALIASES': [
+        f'replica_{index}'
+        for index in range(1, len(DB_REPLICA_HOSTS) + 1)
+    ],
+    'STICKY_SECONDS': int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10)),
+    'CACHE_ALIAS': os.environ.get('DB_REPLICA_STICKY_CACHE_ALIAS', 'shared'),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recipe-app',
+    },
+    # Shared by the workers of a host. Point it at memcached or redis when
+    # the app runs on several hosts.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'SHARED_CACHE_LOCATION',
+            '/tmp/recipe-app-cache'
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Recipe list and detail responses cached by recipe.mixins. Entries are
+# keyed on a version every write of the user bumps, so they never go stale.
+RECIPE_RESPONSE_CACHE = {
+    'ENABLED': os.environ.get(
+        'RECIPE_RESPONSE_CACHE', 'true'
+    ).lower() in ('1', 'true', 'yes', 'on'),
+    'CACHE_ALIAS': os.environ.get('RECIPE_RESPONSE_CACHE_ALIAS', 'default'),
+    'TIMEOUT': int(os.environ.get('RECIPE_RESPONSE_CACHE_TTL', 300)),
+}
+
+# Build the list responses from values() rows instead of model instances,
+# see recipe.readers.ValuesReader
+RECIPE_VALUES_LISTS = os.environ.get(
+    'RECIPE_VALUES_LISTS', 'true'
+).lower() in ('1', 'true', 'yes', 'on')
+
+
+# Django REST framework
+# JSON is rendered and parsed with orjson when installed, see core.renderers
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
 
 # Authentication
 
 AUTH_USER_MODEL = 'core.User'
 
+# Token lookups cached by core.authentication.CachedTokenAuthentication in
+# each worker. Deleted tokens and changed users are invalidated in every
+# worker through INVALIDATION_CACHE_ALIAS, which must name a cache shared by
+# all of them, or other workers keep accepting them for up to TTL seconds.
+# Set CACHE_ALIAS to a shared cache to keep a single copy for every worker.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 1024)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+    'CACHE_ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS'),
+    'INVALIDATION_CACHE_ALIAS': os.environ.get(
+        'TOKEN_AUTH_INVALIDATION_CACHE_ALIAS',
+        'shared'
+    ),
+}
+
+# Clients allowed to read /metrics besides staff users: the addresses or
+# networks of METRICS_ALLOWED_IPS, and requests sending METRICS_TOKEN as a
+# bearer token.
+METRICS_ENDPOINT = {
+    'ALLOWED_IPS': [
+        network for network in os.environ.get(
+            'METRICS_ALLOWED_IPS', ''
+        ).split(',') if network
+    ],
+    'TOKEN': os.environ.get('METRICS_TOKEN'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -148,6 +276,20 @@ MEDIA_URL = 'media/'
 STATIC_ROOT = get_static_dir(BASE_DIR, 'static')
 MEDIA_ROOT = get_static_dir(BASE_DIR, 'media')
 
+# Worker threads building the resized variants of uploaded recipe images.
+# EAGER builds them on the request thread instead.
+RECIPE_IMAGE_PIPELINE = {
+    'WORKERS': int(os.environ.get('RECIPE_IMAGE_WORKERS', 2)),
+    'EAGER': False,
+}
+
+# Recipe images are named after their content and shared by every recipe
+# using the same bytes. Unreferenced images written in the last seconds are
+# kept, since an identical upload may be about to reference them again.
+RECIPE_IMAGE_GRACE_SECONDS = int(
+    os.environ.get('RECIPE_IMAGE_GRACE_SECONDS', 3600)
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
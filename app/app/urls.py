@@ -2,9 +2,13 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
+from core.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path('api/users/', include('users.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/async/users/', include('users.async_urls')),
+    path('api/async/recipe/', include('recipe.async_urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
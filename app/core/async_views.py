@@ -0,0 +1,29 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def async_api_view(view):
+    '''Return an async version of a DRF view. The view runs with its
+    authentication, queries and rendering in a single hop to a worker
+    thread, and the event loop is free while the response is written, so
+    slow clients hold no thread. The worker threads are not tied to the
+    request, so they close their own expired database connections'''
+
+    def run(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    run_in_thread = sync_to_async(run, thread_sensitive=False)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run_in_thread(request, *args, **kwargs)
+
+    return async_view
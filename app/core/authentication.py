@@ -0,0 +1,203 @@
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    '''Cache of token keys to their users. Entries live in an in-process
+    LRU bounded in size and age or, when a cache alias is set, in that
+    shared cache backend.
+
+    In-process entries are invalidated in every worker through the cache
+    of the invalidation alias: forgetting a token writes a new version of
+    it there, and an entry is only used while the version it was cached
+    with is still the current one. Versions expire with the entries they
+    invalidate'''
+    key_prefix = 'auth-token:'
+    version_prefix = 'auth-token-version:'
+
+    def __init__(self, max_size=1024, ttl=60, cache_alias=None,
+                 invalidation_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.invalidation_alias = invalidation_alias
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        '''Return the user of the token key or None if it is not cached'''
+        if self.cache_alias:
+            user = caches[self.cache_alias].get(self._shared_key(key))
+        else:
+            user = self._get_local(key)
+
+        with self._lock:
+            if user is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return user
+
+    def version(self, key):
+        '''Return the version of the token key in the invalidation cache,
+        to read before looking the token up and pass to set()'''
+        if self.cache_alias or not self.invalidation_alias:
+            return None
+        return caches[self.invalidation_alias].get(
+            self._shared_key(key, self.version_prefix)
+        )
+
+    def set(self, key, user, version=None):
+        '''Cache the user of the token key, looked up at the version'''
+        if self.cache_alias:
+            caches[self.cache_alias].set(
+                self._shared_key(key),
+                user,
+                self.ttl
+            )
+            return
+
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.ttl, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        '''Forget the token key'''
+        self._forget_shared([key])
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_pk):
+        '''Forget every token key of the user'''
+        if self.cache_alias or self.invalidation_alias:
+            self._forget_shared(list(Token.objects.filter(
+                user_id=user_pk
+            ).values_list('key', flat=True)))
+        with self._lock:
+            for key, (user, expires, version) in list(self._entries.items()):
+                if user.pk == user_pk:
+                    del self._entries[key]
+
+    def clear(self):
+        '''Forget every in-process entry and reset the counters'''
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        '''Return the hit and miss counters'''
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+    def _get_local(self, key):
+        '''Return a copy of the in-process entry if it has not expired nor
+        been invalidated by another worker'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires, version = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        if version != self.version(key):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            return None
+        # Each request gets its own instance so views can change it
+        return copy.copy(user)
+
+    def _forget_shared(self, keys):
+        '''Drop the token keys from the shared cache, or give them a new
+        version in the invalidation cache'''
+        if not keys:
+            return
+        if self.cache_alias:
+            caches[self.cache_alias].delete_many(
+                [self._shared_key(key) for key in keys]
+            )
+        elif self.invalidation_alias:
+            version = uuid.uuid4().hex
+            caches[self.invalidation_alias].set_many({
+                self._shared_key(key, self.version_prefix): version
+                for key in keys
+            }, self.ttl)
+
+    def _shared_key(self, key, prefix=None):
+        '''Return the shared cache key, which does not expose the token'''
+        return (prefix or self.key_prefix) + hashlib.sha256(
+            key.encode()
+        ).hexdigest()
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    '''Return the token cache configured by the TOKEN_AUTH_CACHE setting'''
+    global _token_cache
+    if _token_cache is None:
+        options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+        _token_cache = TokenCache(
+            max_size=options.get('MAX_SIZE', 1024),
+            ttl=options.get('TTL', 60),
+            cache_alias=options.get('CACHE_ALIAS'),
+            invalidation_alias=options.get('INVALIDATION_CACHE_ALIAS'),
+        )
+    return _token_cache
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    '''Rebuild the token cache when its settings change'''
+    global _token_cache
+    if setting in ('TOKEN_AUTH_CACHE', 'CACHES'):
+        _token_cache = None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''Token authentication that skips the token and user lookup for keys
+    authenticated recently'''
+
+    def authenticate_credentials(self, key):
+        '''Return the user and token of the key, from the cache if
+        possible'''
+        token_cache = get_token_cache()
+        user = token_cache.get(key)
+        if user is None:
+            # Read before the lookup, so an invalidation made meanwhile
+            # leaves the entry outdated
+            version = token_cache.version(key)
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, version)
+            return (user, token)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return (user, self.get_model()(key=key, user=user))
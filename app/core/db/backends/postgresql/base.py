@@ -0,0 +1,122 @@
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import Error as DatabaseError
+
+from core.db.pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options, check):
+    '''Return the pool of the process for the alias and connection
+    parameters, creating it with the POOL options on first use'''
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                max_idle=options.get('MAX_IDLE', 300),
+                check=check,
+            )
+        return _pools[key]
+
+
+def close_pools():
+    '''Close the idle connections of every pool of the process'''
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def is_usable(connection):
+    '''Return whether the DB-API connection answers a query'''
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    '''PostgreSQL backend with the CONN_HEALTH_CHECKS setting of Django 4.1
+    and an optional in-process connection pool set with POOL: MAX_SIZE,
+    TIMEOUT and MAX_IDLE. A pooled connection goes back to the pool when
+    Django closes it, so pooling is meant for a CONN_MAX_AGE of 0'''
+
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        '''Return whether reused connections are checked before use'''
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool_options(self):
+        '''Return the POOL options or None when pooling is off'''
+        return self.settings_dict.get('POOL')
+
+    def get_new_connection(self, conn_params):
+        '''Return a connection from the pool if pooling is on'''
+        if not self.pool_options:
+            return super().get_new_connection(conn_params)
+
+        pool = get_pool(
+            self.alias,
+            conn_params,
+            self.pool_options,
+            is_usable if self.health_check_enabled else None,
+        )
+        connection = pool.acquire(
+            lambda: self._connect_unpooled(conn_params)
+        )
+        self._pool = pool
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level',
+            connection.isolation_level
+        )
+        return connection
+
+    def _connect_unpooled(self, conn_params):
+        '''Open a connection for the pool'''
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        '''Give a pooled connection back to its pool instead of closing it'''
+        pool = getattr(self, '_pool', None)
+        if pool is None:
+            return super()._close()
+        self._pool = None
+        with self.wrap_database_errors:
+            pool.release(self.connection)
+
+    def connect(self):
+        '''Connect, a new connection needing no health check'''
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        '''Close the connection if needed at the start or end of a request,
+        and check the health of a kept one before its next use'''
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        '''Close a reused connection that does not answer anymore'''
+        if (
+            self.connection is None or
+            not self.health_check_enabled or
+            self.health_check_done
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
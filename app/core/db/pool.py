@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+
+class ConnectionPool:
+    '''Pool of open DB-API connections shared by the threads of a process.
+    It holds at most max_size connections, in use or idle; acquiring one
+    when all are in use waits up to timeout seconds. Idle connections are
+    dropped after max_idle seconds and, when check is given, tested with it
+    before being handed out again'''
+
+    def __init__(self, max_size=10, timeout=10, max_idle=300, check=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check = check
+        self.size = 0
+        self._idle = deque()
+        self._condition = threading.Condition()
+
+    def acquire(self, connect):
+        '''Return an idle connection, or one opened by calling connect if the
+        pool is not full'''
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._condition:
+                connection = self._pop_idle()
+                if connection is None and self.size < self.max_size:
+                    self.size += 1
+                    break
+                if connection is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise OperationalError(
+                            f'No connection available in the pool of '
+                            f'{self.max_size} after {self.timeout}s'
+                        )
+                    continue
+            # Checked without the lock, since it is a round trip
+            if self.check is None or self.check(connection):
+                return connection
+            self._close(connection)
+            self._discard()
+
+        try:
+            return connect()
+        except BaseException:
+            self._discard()
+            raise
+
+    def release(self, connection):
+        '''Give the connection back, rolled back to an idle state, or drop it
+        if it is broken'''
+        try:
+            if connection.closed:
+                raise OperationalError('Connection closed')
+            connection.rollback()
+        except Exception:
+            self._close(connection)
+            self._discard()
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close(self):
+        '''Close the idle connections'''
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            self.size -= len(idle)
+        for connection, released_at in idle:
+            self._close(connection)
+
+    def stats(self):
+        '''Return the number of open and idle connections'''
+        with self._condition:
+            return {'size': self.size, 'idle': len(self._idle)}
+
+    def _pop_idle(self):
+        '''Return the most recently released connection, dropping the
+        expired and closed ones. Called with the lock held'''
+        while self._idle:
+            connection, released_at = self._idle.pop()
+            if connection.closed or (
+                time.monotonic() - released_at >= self.max_idle
+            ):
+                self._close(connection)
+                self.size -= 1
+                continue
+            return connection
+        return None
+
+    def _discard(self):
+        '''Free the place of a connection that was dropped'''
+        with self._condition:
+            self.size -= 1
+            self._condition.notify()
+
+    def _close(self, connection):
+        '''Close a connection, ignoring the errors of broken ones'''
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,59 @@
+import contextvars
+
+from django.conf import settings
+
+# The replica the reads of the current request go to, picked once per
+# request by core.middleware.ReplicaMiddleware so they all see the same lag
+_replica = contextvars.ContextVar('replica', default=None)
+
+# Apps whose rows must be read fresh, such as a token created by the
+# previous request
+PRIMARY_ONLY_APPS = {'authtoken'}
+
+
+def replica_aliases():
+    '''Return the aliases of the replicas reads are routed to'''
+    return getattr(settings, 'REPLICA_ROUTING', {}).get('ALIASES', [])
+
+
+def use_replica(alias):
+    '''Read from the replica alias in the current context, or from the
+    default database with None, and return the token resetting it'''
+    return _replica.set(alias)
+
+
+def reset_replica(token):
+    '''Restore the replica use the token was returned with'''
+    _replica.reset(token)
+
+
+class ReplicaRouter:
+    '''Route the reads of safe requests to the replica picked for them and
+    everything else to the default database'''
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if (
+            alias is None or
+            alias not in replica_aliases() or
+            model._meta.app_label in PRIMARY_ONLY_APPS
+        ):
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        '''Allow relations between objects read from the default database
+        and its replicas, which hold the same rows'''
+        databases = {'default', *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        '''Migrate the default database only, replicas copy its schema'''
+        if db in replica_aliases():
+            return False
+        return None
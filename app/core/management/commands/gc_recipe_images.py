@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe, recipe_image_storage
+
+
+class Command(BaseCommand):
+    """ Command to delete recipe images and variants no recipe references """
+
+    help = 'Delete unreferenced files from the recipe image storage'
+    path = 'uploads/recipe'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the unreferenced files without deleting them'
+        )
+        parser.add_argument(
+            '--grace-seconds',
+            type=int,
+            default=settings.RECIPE_IMAGE_GRACE_SECONDS,
+            help='Keep unreferenced files written in the last seconds'
+        )
+
+    def referenced(self):
+        '''Return the names of every image and variant in use'''
+        names = set()
+        rows = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', 'image_variants').iterator()
+        for image, variants in rows:
+            names.add(image)
+            names.update(variants.values())
+        return names
+
+    def handle(self, *args, **options):
+        storage = recipe_image_storage
+        referenced = self.referenced()
+        deleted = 0
+        freed = 0
+        for name in storage.walk(self.path):
+            if name in referenced:
+                continue
+            if storage.is_recent(name, options['grace_seconds']):
+                continue
+            deleted += 1
+            freed += storage.size(name)
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+
+        verb = 'would be deleted' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} unreferenced files {verb} ({freed} bytes)'
+        ))
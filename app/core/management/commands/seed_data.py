@@ -0,0 +1,113 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seeding import Seeder
+
+
+class Command(BaseCommand):
+    """ Command generating users with tags, ingredients and recipes to run
+    load tests and benchmarks against. The same seed always generates the
+    same data """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--tags',
+            type=int,
+            default=10,
+            help='Tags per user'
+        )
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=20,
+            help='Ingredients per user'
+        )
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100,
+            help='Recipes per user'
+        )
+        parser.add_argument(
+            '--tags-per-recipe',
+            type=int,
+            default=2,
+            help='Average tags linked to each recipe'
+        )
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=5,
+            help='Average ingredients linked to each recipe'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Prefix of the emails of the generated users'
+        )
+        parser.add_argument(
+            '--password',
+            default='seedpassword',
+            help='Password of every generated user'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Insert with COPY instead of bulk INSERTs'
+        )
+        parser.add_argument(
+            '--no-search-vectors',
+            action='store_false',
+            dest='search_vectors',
+            help='Leave the search vectors of the recipes empty'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete the users generated with the prefix first'
+        )
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        counts = [
+            'users', 'tags', 'ingredients', 'recipes', 'tags_per_recipe',
+            'ingredients_per_recipe',
+        ]
+        for name in counts:
+            if options[name] < 0:
+                raise CommandError(f'--{name.replace("_", "-")} must not '
+                                   f'be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        seeder = Seeder(
+            **{name: options[name] for name in counts},
+            seed=options['seed'],
+            password=options['password'],
+            prefix=options['prefix'],
+            batch_size=options['batch_size'],
+            copy=options['copy'],
+            search_vectors=options['search_vectors'],
+            using=options['database']
+        )
+        users = seeder.seeded_users()
+        if options['clear']:
+            deleted = users.delete()[1].get(users.model._meta.label, 0)
+            self.stdout.write(f'{deleted} seeded users deleted')
+        elif users.exists():
+            raise CommandError(
+                f'Users with the prefix {options["prefix"]} exist, use '
+                f'--clear to replace them'
+            )
+
+        start = time.perf_counter()
+        created = seeder.run()
+        seconds = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{count} {name}' for name, count in created.items()) +
+            f' created in {seconds:.1f}s'
+        ))
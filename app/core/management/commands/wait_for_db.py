@@ -1,20 +1,82 @@
+import random
 import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connections
 from django.db.utils import OperationalError
 
+from core.warmup import warm_up
+
 
 class Command(BaseCommand):
-    """ Command to pause execution until database is available """
+    """ Command to pause execution until the database answers queries,
+    retrying with exponential backoff and jitter until a deadline """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait before giving up'
+        )
+        parser.add_argument(
+            '--initial-delay',
+            type=float,
+            default=0.1,
+            help='Seconds to wait at most after the first failure'
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=5,
+            help='Seconds to wait at most between two attempts'
+        )
+        parser.add_argument(
+            '--warm-up',
+            action='store_true',
+            help='Warm up the connection, the tables and the caches'
+        )
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        start = time.monotonic()
+        deadline = start + options['timeout']
+        delay = options['initial_delay']
+        attempts = 1
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
+                self.ping(options['database'])
+                break
+            except OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'Database unavailable after {attempts} attempts: '
+                        f'{exc}'
+                    )
                 self.stdout.write('.')
-                time.sleep(1)
-        self.stdout.write(self.style.SUCCESS('Database connected!'))
+                # Full jitter keeps many containers from retrying together
+                time.sleep(min(random.uniform(0, delay), remaining))
+                delay = min(delay * 2, options['max_delay'])
+                attempts += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Database connected! ({time.monotonic() - start:.3f}s, '
+            f'{attempts} attempts)'
+        ))
+        if options['warm_up']:
+            for phase, seconds in warm_up(options['database']).items():
+                self.stdout.write(f'Warmed up {phase} in {seconds:.3f}s')
+
+    def ping(self, alias):
+        '''Open a connection and run a query, raising OperationalError if
+        the database does not answer'''
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except OperationalError:
+            # Drop a connection broken after it was opened
+            connection.close()
+            raise
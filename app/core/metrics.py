@@ -0,0 +1,151 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CollectorRegistry, Histogram, multiprocess, REGISTRY
+)
+from rest_framework import serializers
+
+# Prometheus keeps the values of every worker process in files of this
+# directory when it is set, and the metrics endpoint merges them
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+# Methods labelled by name. Any other is labelled other, so clients cannot
+# create new series by sending made up methods
+METHODS = frozenset([
+    'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE',
+])
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float('inf'))
+
+REQUEST_DURATION = Histogram(
+    'api_request_duration_seconds',
+    'Time to answer the API requests',
+    ['view', 'method', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'api_request_db_queries',
+    'Database queries run by an API request',
+    ['view'],
+    buckets=QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'api_request_db_duration_seconds',
+    'Time an API request spent in database queries',
+    ['view'],
+)
+REQUEST_SERIALIZER_DURATION = Histogram(
+    'api_request_serializer_duration_seconds',
+    'Time an API request spent building the data of its serializers',
+    ['view'],
+)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    '''Totals of the database and serializer work of a request. Async views
+    work on other threads, which share it through the context'''
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+
+    def observe(self, view, method, status, seconds):
+        '''Record the request in the histograms'''
+        if method not in METHODS:
+            method = 'other'
+        REQUEST_DURATION.labels(view, method, status).observe(seconds)
+        REQUEST_QUERIES.labels(view).observe(self.queries)
+        REQUEST_DB_DURATION.labels(view).observe(self.db_seconds)
+        REQUEST_SERIALIZER_DURATION.labels(view).observe(
+            self.serializer_seconds
+        )
+
+
+def start_request():
+    '''Start collecting the metrics of a request and return them with the
+    token ending it'''
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    '''Stop collecting the metrics of the request of the token'''
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    '''Database execute wrapper adding the query to the metrics of the
+    current request'''
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - start
+
+
+@contextmanager
+def measure_serializer():
+    '''Add the time spent in the block to the serializer time of the
+    current request'''
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.serializer_seconds += time.perf_counter() - start
+
+
+def view_label(request):
+    '''Return the view and action that answered the request, such as
+    RecipeViewSet.list'''
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view = match.func
+    view_class = getattr(view, 'cls', None)
+    if view_class is None:
+        return f'{view.__module__}.{view.__name__}'
+    actions = getattr(view, 'actions', None) or {}
+    method = request.method.lower()
+    action = actions.get(method)
+    if action is None and method == 'head':
+        action = actions.get('get')
+    if action is None:
+        return view_class.__name__
+    return f'{view_class.__name__}.{action}'
+
+
+def get_registry():
+    '''Return the registry of the metrics of every worker process, or of
+    this process when there is a single one'''
+    if not os.environ.get(MULTIPROC_DIR_ENV):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+class MeasuredSerializerMixin:
+    '''Count the time spent building the data of the serializer in the
+    metrics of the request'''
+
+    @property
+    def data(self):
+        with measure_serializer():
+            return super().data
+
+
+class MeasuredListSerializer(MeasuredSerializerMixin,
+                             serializers.ListSerializer):
+    '''List serializer counting the time spent building its data in the
+    metrics of the request'''
@@ -0,0 +1,83 @@
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.db.routers import replica_aliases, reset_replica, use_replica
+from core.metrics import end_request, start_request, view_label
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class MetricsMiddleware:
+    '''Record the latency, database queries and time, and serializer time
+    of each request under the view and action that answered it'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        metrics.observe(
+            view_label(request),
+            request.method,
+            response.status_code,
+            time.perf_counter() - start
+        )
+        return response
+
+
+class ReplicaMiddleware:
+    '''Let safe requests read from the replicas, except for a few seconds
+    after a write made with the same credentials, so clients read their own
+    writes despite the replication lag. Every read of a request goes to
+    the same replica, so the request sees a single state of the data. The
+    credentials are the Authorization header or the session cookie, since
+    token authentication only runs in the views'''
+    key_prefix = 'replica-sticky:'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        options = settings.REPLICA_ROUTING
+        cache = caches[options.get('CACHE_ALIAS', 'shared')]
+        key = self.sticky_key(request)
+        safe = request.method in SAFE_METHODS
+        if safe and (key is None or cache.get(key) is None):
+            alias = random.choice(replica_aliases())
+        else:
+            alias = None
+        token = use_replica(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_replica(token)
+
+        if not safe and key is not None:
+            cache.set(key, True, options.get('STICKY_SECONDS', 10))
+        return response
+
+    def sticky_key(self, request):
+        '''Return the cache key marking the credentials of the request as
+        having written recently, or None for anonymous requests'''
+        credentials = (
+            request.headers.get('Authorization') or
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+        if not credentials:
+            return None
+        return (
+            self.key_prefix +
+            hashlib.sha256(credentials.encode()).hexdigest()
+        )
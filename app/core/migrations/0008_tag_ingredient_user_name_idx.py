@@ -0,0 +1,27 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(
+                fields=['user', 'name'],
+                name='core_tag_user_name_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tag_ingredient_user_name_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ('processing', 'Processing'),
+                    ('ready', 'Ready'),
+                    ('failed', 'Failed')
+                ],
+                max_length=10
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
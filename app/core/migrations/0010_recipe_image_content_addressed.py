@@ -0,0 +1,24 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:13
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_status_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(
+                null=True,
+                storage=core.storage.ContentAddressedStorage(),
+                upload_to=core.models.recipe_image_file_path
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 1000
+
+BACKFILL_SEARCH_VECTOR = '''
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(core_tag.name, ' ')
+        FROM core_recipe_tags
+        JOIN core_tag ON core_tag.id = core_recipe_tags.tag_id
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(core_ingredient.name, ' ')
+        FROM core_recipe_ingredients
+        JOIN core_ingredient
+            ON core_ingredient.id = core_recipe_ingredients.ingredient_id
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+    ), '')), 'B')
+WHERE id > %s AND id <= %s AND search_vector IS NULL
+'''
+
+
+def backfill_search_vector(apps, schema_editor):
+    '''Fill the search vectors by ranges of ids, each committed on its own,
+    so the rows are not all locked until the end'''
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT max(id) FROM core_recipe')
+        last = cursor.fetchone()[0] or 0
+        for start in range(0, last, BACKFILL_BATCH_SIZE):
+            cursor.execute(
+                BACKFILL_SEARCH_VECTOR,
+                [start, start + BACKFILL_BATCH_SIZE]
+            )
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch and the index is built without
+    # locking the table against writes, which cannot happen inside a
+    # transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_recipe_image_content_addressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                null=True
+            ),
+        ),
+        migrations.RunPython(
+            backfill_search_vector,
+            migrations.RunPython.noop
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:18
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    # Indexes are built without locking the tables against writes, which
+    # cannot happen inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_recipe_search_vector'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.BtreeGinExtension(),
+        django.contrib.postgres.operations.TrigramExtension(),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='ingredient',
+            index=models.Index(
+                django.db.models.expressions.F('user'),
+                django.db.models.functions.comparison.Collate(
+                    django.db.models.functions.text.Upper('name'),
+                    'C'
+                ),
+                name='core_ingredient_prefix_idx'
+            ),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(
+                django.db.models.expressions.F('user'),
+                django.db.models.functions.comparison.Collate(
+                    django.db.models.functions.text.Upper('name'),
+                    'C'
+                ),
+                name='core_tag_prefix_idx'
+            ),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='ingredient',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.db.models.expressions.F('user'),
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('name'),
+                    name='gin_trgm_ops'
+                ),
+                name='core_ingredient_trgm_idx'
+            ),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='tag',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.db.models.expressions.F('user'),
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('name'),
+                    name='gin_trgm_ops'
+                ),
+                name='core_tag_trgm_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:40
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently, RemoveIndexConcurrently
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built without locking the tables against writes, which
+    # cannot happen inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_tag_ingredient_autocomplete_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_listing_idx'
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_listing_idx'
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name='tag',
+            name='core_tag_user_name_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='ingredient',
+            index=models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_ingredient_listing_idx'
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name='ingredient',
+            name='core_ingredient_user_name_idx',
+        ),
+        # The unique (recipe_id, tag_id) constraints of the m2m tables serve
+        # the lookups from a recipe, these serve the ones from a tag or an
+        # ingredient with index only scans
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS core_recipe_tags_tag_idx '
+            'ON core_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX CONCURRENTLY IF EXISTS core_recipe_tags_tag_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+            'core_recipe_ingredients_ingredient_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id)',
+            'DROP INDEX CONCURRENTLY IF EXISTS '
+            'core_recipe_ingredients_ingredient_idx',
+        ),
+    ]
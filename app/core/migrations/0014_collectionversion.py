@@ -0,0 +1,38 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_versions(apps, schema_editor):
+    '''Create the collection version of every existing user'''
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    CollectionVersion = apps.get_model('core', 'CollectionVersion')
+    CollectionVersion.objects.bulk_create(
+        CollectionVersion(user_id=pk)
+        for pk in User.objects.values_list('pk', flat=True).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionVersion',
+            fields=[
+                ('user', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    primary_key=True,
+                    serialize=False,
+                    to=settings.AUTH_USER_MODEL
+                )),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,29 @@
+import hashlib
 import os
-import uuid
 
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin
 )
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Collate, Upper
 from django.conf import settings
 
+from .storage import ContentAddressedStorage
+
+recipe_image_storage = ContentAddressedStorage()
+
 
 def recipe_image_file_path(instance, filename):
-    '''Returns the final path of the uploaded image'''
-    extension = str(filename).split('.')[-1]
-    filename = f'{uuid.uuid4()}.{extension}'
+    '''Returns the final path of the uploaded image, named after the hash
+    of its content so identical uploads share one file'''
+    extension = str(filename).split('.')[-1].lower()
+    digest = hashlib.sha256()
+    for chunk in instance.image.chunks():
+        digest.update(chunk)
+    filename = f'{digest.hexdigest()}.{extension}'
     return os.path.join('uploads/recipe', filename)
 
 
@@ -65,6 +77,26 @@ class Tag(models.Model):
     )
     name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # Serves the listing of a user, ordered by name and id
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_listing_idx'
+            ),
+            # Serve the prefix and the fuzzy autocomplete of the names
+            models.Index(
+                F('user'),
+                Collate(Upper('name'), 'C'),
+                name='core_tag_prefix_idx'
+            ),
+            GinIndex(
+                F('user'),
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='core_tag_trgm_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -77,12 +109,41 @@ class Ingredient(models.Model):
     )
     name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # Serves the listing of a user, ordered by name and id
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_ingredient_listing_idx'
+            ),
+            # Serve the prefix and the fuzzy autocomplete of the names
+            models.Index(
+                F('user'),
+                Collate(Upper('name'), 'C'),
+                name='core_ingredient_prefix_idx'
+            ),
+            GinIndex(
+                F('user'),
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='core_ingredient_trgm_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class Recipe(models.Model):
     '''Model for the recipes'''
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -93,7 +154,65 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=recipe_image_storage
+    )
+    image_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+    image_variants = models.JSONField(default=dict, blank=True)
+    # Title, tag and ingredient names, kept current by core.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the listing of a user from the newest recipe
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_listing_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class CollectionVersionManager(models.Manager):
+
+    def get_version(self, user):
+        '''Return the version of the collections of the user'''
+        version = self.filter(user=user).values_list(
+            'version',
+            flat=True
+        ).first()
+        if version is None:
+            version = self.get_or_create(user=user)[0].version
+        return version
+
+    def bump(self, user_id):
+        '''Increase the version of the collections of the user'''
+        self.filter(user_id=user_id).update(version=F('version') + 1)
+
+
+class CollectionVersion(models.Model):
+    '''Version of the tags, ingredients and recipes of a user, increased by
+    every write to them'''
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    version = models.BigIntegerField(default=0)
+
+    objects = CollectionVersionManager()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.version}'
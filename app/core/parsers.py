@@ -0,0 +1,46 @@
+import codecs
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# orjson reads integers wider than 64 bits as floats, which JSONParser
+# keeps exact. Bodies with a run of 19 digits, the length from which
+# integers may not fit, are left to JSONParser, even if the digits are
+# within a string or a fraction
+LONG_DIGITS = re.compile(rb'[0-9]{19}')
+
+
+class FastJSONParser(JSONParser):
+    '''Parse JSON with orjson, which refuses NaN and Infinity like
+    JSONParser in strict mode. Bodies in other encodings than UTF-8, bodies
+    with integers wider than 64 bits, bodies orjson refuses, non strict
+    JSON and installs without orjson are left to JSONParser, so the data
+    and errors are the ones it gives'''
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        '''Parse the JSON body and return the resulting data'''
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (
+            orjson is None or
+            not self.strict or
+            codecs.lookup(encoding).name != 'utf-8'
+        ):
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        if LONG_DIGITS.search(content) is None:
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(io.BytesIO(content), media_type, parser_context)
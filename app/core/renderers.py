@@ -0,0 +1,65 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    '''Render JSON with orjson, several times faster than the json module on
+    large recipe lists, with the output of JSONRenderer but for floats.
+
+    Values orjson has no type for, such as decimals and lazy translations,
+    and datetimes, which DRF formats its own way, go through the encoder of
+    JSONRenderer. Indented or ASCII output, non strict JSON, values orjson
+    refuses, such as integers above 64 bits, and installs without orjson are
+    left to JSONRenderer.
+
+    Floats, such as the rank of searched recipes, parse back to the same
+    numbers but are not always written the same: orjson writes 1e-7 and
+    1e16 where the json module writes 1e-07 and 1e+16, and small numbers
+    may be written without an exponent. NaN and infinite floats are
+    rendered as null, where JSONRenderer fails'''
+    default = encoders.JSONEncoder().default
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        '''Render the data into JSON, returning a bytestring'''
+        if not self.use_orjson(data, accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, so the output is valid JavaScript.
+        # Both separators start with this byte, which is found much faster
+        # than they are replaced
+        if b'\xe2' in ret:
+            ret = ret.replace(
+                b'\xe2\x80\xa8',
+                b'\\u2028'
+            ).replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+    def use_orjson(self, data, accepted_media_type, renderer_context):
+        '''Return whether orjson renders the data like JSONRenderer would'''
+        return (
+            orjson is not None and
+            data is not None and
+            not self.ensure_ascii and
+            self.compact and
+            self.strict and
+            self.get_indent(
+                accepted_media_type,
+                renderer_context or {}
+            ) is None
+        )
@@ -0,0 +1,50 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Recipe
+
+SEARCH_CONFIG = 'english'
+
+
+def related_names(through, name):
+    '''Return a subquery joining the names linked to the outer recipe'''
+    return Coalesce(
+        Subquery(
+            through.objects.filter(
+                recipe_id=OuterRef('pk')
+            ).values('recipe_id').annotate(
+                names=StringAgg(name, ' ')
+            ).values('names')
+        ),
+        Value('')
+    )
+
+
+def recipe_search_vector():
+    '''Return the expression of a recipe search vector, weighting the
+    title above the tag and ingredient names'''
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(
+            related_names(Recipe.tags.through, 'tag__name'),
+            weight='B',
+            config=SEARCH_CONFIG
+        ) +
+        SearchVector(
+            related_names(Recipe.ingredients.through, 'ingredient__name'),
+            weight='B',
+            config=SEARCH_CONFIG
+        )
+    )
+
+
+def update_search_vectors(recipes):
+    '''Recompute the stored search vector of the recipes in one query'''
+    recipes.update(search_vector=recipe_search_vector())
+
+
+def search_query(terms):
+    '''Return the query matching web search style terms'''
+    return SearchQuery(terms, search_type='websearch', config=SEARCH_CONFIG)
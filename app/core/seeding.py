@@ -0,0 +1,271 @@
+import io
+import json
+import random
+import re
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+
+from .models import Ingredient, Recipe, Tag, User
+from .search import update_search_vectors
+from .warmup import hot_tables
+
+ADJECTIVES = [
+    'Classic', 'Spicy', 'Creamy', 'Crispy', 'Smoky', 'Roasted', 'Grilled',
+    'Zesty', 'Rustic', 'Sweet', 'Tangy', 'Hearty', 'Golden', 'Fresh',
+    'Slow cooked', 'Baked', 'Glazed', 'Herbed', 'Braised', 'Quick',
+]
+DISHES = [
+    'chicken curry', 'tomato soup', 'lasagna', 'risotto', 'pad thai',
+    'fish tacos', 'banana bread', 'chili', 'paella', 'ramen', 'moqueca',
+    'feijoada', 'pancakes', 'omelette', 'burrito', 'gnocchi', 'falafel',
+    'shepherd pie', 'carrot cake', 'goulash', 'dumplings', 'brownies',
+    'ceviche', 'pizza', 'salad', 'stir fry', 'meatballs', 'quiche',
+]
+TAGS = [
+    'Vegan', 'Vegetarian', 'Dessert', 'Breakfast', 'Dinner', 'Lunch',
+    'Quick', 'Gluten free', 'Dairy free', 'Spicy', 'Comfort food', 'Healthy',
+    'Holiday', 'Low carb', 'Kids', 'Brazilian', 'Italian', 'Mexican',
+    'Thai', 'Indian', 'Japanese', 'French', 'Soup', 'Baking', 'Grill',
+]
+INGREDIENTS = [
+    'Salt', 'Pepper', 'Olive oil', 'Garlic', 'Onion', 'Tomato', 'Butter',
+    'Flour', 'Sugar', 'Egg', 'Milk', 'Rice', 'Chicken', 'Beef', 'Pork',
+    'Shrimp', 'Cod', 'Potato', 'Carrot', 'Celery', 'Basil', 'Parsley',
+    'Cilantro', 'Lime', 'Lemon', 'Ginger', 'Chili', 'Cumin', 'Paprika',
+    'Cheese', 'Cream', 'Coconut milk', 'Beans', 'Corn', 'Spinach',
+    'Mushroom', 'Bell pepper', 'Zucchini', 'Noodles', 'Soy sauce',
+]
+
+
+def numbered_names(names, count, rng):
+    '''Return count distinct names, shuffled from the list and numbered
+    once it runs out'''
+    chosen = []
+    for index in range(count):
+        name = names[index % len(names)]
+        if index >= len(names):
+            name = f'{name} {index // len(names) + 1}'
+        chosen.append(name)
+    rng.shuffle(chosen)
+    return chosen
+
+
+class BulkCreateWriter:
+    '''Insert rows with bulk_create'''
+
+    def __init__(self, using='default', batch_size=1000):
+        self.using = using
+        self.batch_size = batch_size
+
+    def insert(self, model, rows, returning=True):
+        '''Insert the rows, dicts of column values, and return their ids
+        when asked to'''
+        objs = model._default_manager.using(self.using).bulk_create(
+            [model(**row) for row in rows],
+            batch_size=self.batch_size
+        )
+        return [obj.pk for obj in objs] if returning else None
+
+
+class CopyWriter:
+    '''Insert rows with Postgres COPY, several times faster than INSERT for
+    large batches. The ids of the rows are drawn from their sequence
+    beforehand, as COPY cannot return them'''
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    def insert(self, model, rows, returning=True):
+        '''Insert the rows, dicts of column values, and return their ids
+        when asked to'''
+        if not rows:
+            return [] if returning else None
+        table = model._meta.db_table
+        ids = None
+        with connections[self.using].cursor() as cursor:
+            if returning:
+                pk = model._meta.pk.column
+                cursor.execute(
+                    'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                    'FROM generate_series(1, %s)',
+                    [table, pk, len(rows)]
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                rows = [{pk: id, **row} for id, row in zip(ids, rows)]
+            columns = list(rows[0])
+            data = io.StringIO()
+            for row in rows:
+                data.write('\t'.join(
+                    self.copy_value(row[column]) for column in columns
+                ))
+                data.write('\n')
+            data.seek(0)
+            cursor.cursor.copy_expert(
+                'COPY {} ({}) FROM STDIN'.format(
+                    self.quote(table),
+                    ', '.join(self.quote(column) for column in columns)
+                ),
+                data
+            )
+        return ids
+
+    def quote(self, name):
+        return connections[self.using].ops.quote_name(name)
+
+    def copy_value(self, value):
+        '''Return the value in the text format of COPY'''
+        if value is None:
+            return '\\N'
+        if isinstance(value, dict):
+            value = json.dumps(value)
+        return str(value).replace('\\', '\\\\').replace(
+            '\t', '\\t'
+        ).replace('\n', '\\n')
+
+
+class Seeder:
+    '''Generate users with tags, ingredients and recipes for load tests.
+
+    Everything is drawn from a random generator started from the seed, so
+    the same options always generate the same rows, whichever writer
+    inserts them. Users are handled in chunks of about batch_size recipes,
+    each written in a transaction with the m2m rows and search vectors of
+    its recipes, so the memory stays flat with millions of recipes'''
+    email_domain = 'seed.example.com'
+
+    def __init__(self, users=10, tags=10, ingredients=20, recipes=100,
+                 tags_per_recipe=2, ingredients_per_recipe=5, seed=0,
+                 password='seedpassword', prefix='seed', batch_size=1000,
+                 copy=False, search_vectors=True, using='default'):
+        self.users = users
+        self.tags = tags
+        self.ingredients = ingredients
+        self.recipes = recipes
+        self.tags_per_recipe = tags_per_recipe
+        self.ingredients_per_recipe = ingredients_per_recipe
+        self.rng = random.Random(seed)
+        self.password = password
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.search_vectors = search_vectors
+        self.using = using
+        if copy:
+            self.writer = CopyWriter(using)
+        else:
+            self.writer = BulkCreateWriter(using, batch_size)
+        self.created = {'users': 0, 'tags': 0, 'ingredients': 0,
+                        'recipes': 0, 'recipe_tags': 0,
+                        'recipe_ingredients': 0}
+
+    def email(self, index):
+        return f'{self.prefix}{index}@{self.email_domain}'
+
+    def seeded_users(self):
+        '''Return the users generated with the prefix'''
+        return User.objects.using(self.using).filter(email__regex=(
+            rf'^{re.escape(self.prefix)}\d+@{re.escape(self.email_domain)}$'
+        ))
+
+    def run(self):
+        '''Generate every user and return the number of created rows'''
+        # Hashing is slow on purpose, so every user shares one hash
+        password = make_password(self.password)
+        chunk = max(1, self.batch_size // max(1, self.recipes))
+        for start in range(0, self.users, chunk):
+            with transaction.atomic(using=self.using):
+                self.seed_users(
+                    range(start, min(start + chunk, self.users)),
+                    password
+                )
+        # Refresh the planner statistics, or the benchmarks would run with
+        # plans made for the tables before the seeding
+        connection = connections[self.using]
+        with connection.cursor() as cursor:
+            for table in hot_tables():
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+        return self.created
+
+    def seed_users(self, indexes, password):
+        '''Generate a chunk of users with their collections'''
+        user_ids = self.insert(User, 'users', [{
+            'email': self.email(index),
+            'name': f'Seed user {index}',
+            'password': password,
+            'is_staff': False,
+            'is_active': True,
+            'is_superuser': False,
+        } for index in indexes])
+        for user_id in user_ids:
+            tag_ids = self.insert(Tag, 'tags', [
+                {'user_id': user_id, 'name': name}
+                for name in numbered_names(TAGS, self.tags, self.rng)
+            ])
+            ingredient_ids = self.insert(Ingredient, 'ingredients', [
+                {'user_id': user_id, 'name': name}
+                for name in numbered_names(
+                    INGREDIENTS,
+                    self.ingredients,
+                    self.rng
+                )
+            ])
+            for start in range(0, self.recipes, self.batch_size):
+                count = min(self.batch_size, self.recipes - start)
+                self.seed_recipes(user_id, count, tag_ids, ingredient_ids)
+
+    def seed_recipes(self, user_id, count, tag_ids, ingredient_ids):
+        '''Generate a batch of recipes of the user with their tags and
+        ingredients'''
+        rows = []
+        relations = []
+        for _ in range(count):
+            rows.append(self.recipe_row(user_id))
+            relations.append((
+                self.pick(tag_ids, self.tags_per_recipe),
+                self.pick(ingredient_ids, self.ingredients_per_recipe),
+            ))
+        recipe_ids = self.insert(Recipe, 'recipes', rows)
+        self.insert(Recipe.tags.through, 'recipe_tags', [
+            {'recipe_id': recipe_id, 'tag_id': tag_id}
+            for recipe_id, (tags, _) in zip(recipe_ids, relations)
+            for tag_id in tags
+        ], returning=False)
+        self.insert(Recipe.ingredients.through, 'recipe_ingredients', [
+            {'recipe_id': recipe_id, 'ingredient_id': ingredient_id}
+            for recipe_id, (_, ingredients) in zip(recipe_ids, relations)
+            for ingredient_id in ingredients
+        ], returning=False)
+        if self.search_vectors:
+            update_search_vectors(
+                Recipe.objects.using(self.using).filter(id__in=recipe_ids)
+            )
+
+    def recipe_row(self, user_id):
+        '''Return the columns of a random recipe of the user'''
+        rng = self.rng
+        title = f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}'
+        return {
+            'user_id': user_id,
+            'title': title,
+            'time_minutes': rng.randint(5, 240),
+            'price': Decimal(rng.randint(100, 99999)) / 100,
+            'link': (
+                f'https://recipes.example.com/{rng.getrandbits(32):08x}'
+                if rng.random() < 0.3 else ''
+            ),
+            'image': '',
+            'image_status': '',
+            'image_variants': {},
+        }
+
+    def pick(self, ids, mean):
+        '''Return a random sample of the ids, as large as the mean on
+        average'''
+        count = min(len(ids), self.rng.randint(0, 2 * mean))
+        return self.rng.sample(ids, count)
+
+    def insert(self, model, name, rows, returning=True):
+        ids = self.writer.insert(model, rows, returning=returning)
+        self.created[name] += len(rows)
+        return ids
@@ -0,0 +1,176 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache
+from .metrics import record_query
+from .models import (
+    CollectionVersion, Ingredient, Recipe, recipe_image_storage, Tag
+)
+from .search import update_search_vectors
+
+# Recipe relation holding the names of each model in the search vector
+SEARCHED_RELATIONS = {Tag: 'tags', Ingredient: 'ingredients'}
+
+
+@receiver(connection_created)
+def measure_queries(sender, connection, **kwargs):
+    '''Count the queries of every connection, whatever thread opens it, in
+    the metrics of the request they run for'''
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    '''Stop authenticating a deleted token from the cache'''
+    get_token_cache().delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_changed_user(sender, instance, **kwargs):
+    '''Drop the cached copies of a changed, deactivated or deleted user'''
+    get_token_cache().delete_user(instance.pk)
+
+
+def release_recipe_image(name, variants):
+    '''Delete the image and its variants once the transaction commits,
+    unless a recipe still references it or it was just written'''
+    def release():
+        if Recipe.objects.filter(image=name).exists():
+            return
+        if recipe_image_storage.is_recent(
+            name,
+            settings.RECIPE_IMAGE_GRACE_SECONDS
+        ):
+            return
+        for path in [name, *variants.values()]:
+            recipe_image_storage.delete(path)
+
+    transaction.on_commit(release)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_previous_image(sender, instance, update_fields=None, **kwargs):
+    '''Keep the stored image of the recipe to release it if replaced'''
+    instance._previous_image = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    instance._previous_image = Recipe.objects.filter(pk=instance.pk).values(
+        'image',
+        'image_variants'
+    ).first()
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_image(sender, instance, **kwargs):
+    '''Release the previous image of the recipe if it was replaced'''
+    previous = getattr(instance, '_previous_image', None)
+    if previous and previous['image'] and (
+        previous['image'] != instance.image.name
+    ):
+        release_recipe_image(previous['image'], previous['image_variants'])
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    '''Release the image of a deleted recipe'''
+    if instance.image:
+        release_recipe_image(instance.image.name, instance.image_variants)
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, **kwargs):
+    '''Refresh the search vector of a saved recipe'''
+    update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_relinked_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    '''Refresh the search vectors of recipes whose tags or ingredients
+    changed, from either side of the relation'''
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+        return
+
+    if action == 'pre_clear':
+        instance._linked_recipe_ids = linked_recipe_ids(instance)
+    elif action == 'post_clear':
+        pk_set = instance._linked_recipe_ids
+    if action in ('post_add', 'post_remove', 'post_clear') and pk_set:
+        update_search_vectors(Recipe.objects.filter(pk__in=pk_set))
+
+
+def linked_recipe_ids(instance):
+    '''Return the ids of the recipes linked to a tag or ingredient'''
+    field = SEARCHED_RELATIONS[type(instance)]
+    return list(Recipe.objects.filter(
+        **{field: instance}
+    ).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_renamed_name(sender, instance, created, **kwargs):
+    '''Refresh the search vectors of the recipes using a renamed tag or
+    ingredient'''
+    if created:
+        return
+    field = SEARCHED_RELATIONS[sender]
+    update_search_vectors(Recipe.objects.filter(**{field: instance}))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_linked_recipes(sender, instance, **kwargs):
+    '''Keep the recipes of a tag or ingredient being deleted, since its
+    links are gone once it is'''
+    instance._linked_recipe_ids = linked_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_unlinked_recipes(sender, instance, **kwargs):
+    '''Refresh the search vectors of the recipes of a deleted tag or
+    ingredient'''
+    recipe_ids = getattr(instance, '_linked_recipe_ids', None)
+    if recipe_ids:
+        update_search_vectors(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_collection_version(sender, instance, created, **kwargs):
+    '''Start versioning the collections of a new user'''
+    if created:
+        CollectionVersion.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def bump_collection_version(sender, instance, **kwargs):
+    '''Invalidate the ETags of the collections of the owner'''
+    CollectionVersion.objects.bump(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_relinked_collection_version(sender, instance, action, **kwargs):
+    '''Invalidate the ETags of the collections of the owner of relinked
+    recipes, tags or ingredients'''
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        CollectionVersion.objects.bump(instance.user_id)
@@ -0,0 +1,49 @@
+import os
+import time
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    '''File system storage for files named after a hash of their content.
+
+    A name that already exists holds the same bytes, so it is reused instead
+    of getting a suffix, and saving it again only refreshes its modification
+    time. New files are written under a temporary name and moved into place
+    so a concurrent reader never sees a partial file'''
+
+    def get_available_name(self, name, max_length=None):
+        '''Return the name unchanged, an existing file is the same file'''
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            self.touch(name)
+            return name
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def touch(self, name):
+        '''Mark the file as just written'''
+        os.utime(self.path(name))
+
+    def is_recent(self, name, seconds):
+        '''Return whether the file was written in the last seconds'''
+        try:
+            return time.time() - os.path.getmtime(self.path(name)) < seconds
+        except FileNotFoundError:
+            return False
+
+    def walk(self, path=''):
+        '''Yield the names of every file below the path'''
+        if not self.exists(path):
+            return
+        directories, files = self.listdir(path)
+        for filename in files:
+            yield os.path.join(path, filename)
+        for directory in directories:
+            yield from self.walk(os.path.join(path, directory))
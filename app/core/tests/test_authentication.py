@@ -0,0 +1,188 @@
+import multiprocessing
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import get_token_cache, TokenCache
+
+ME_URL = reverse('users:me')
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tokens',
+    },
+}
+
+
+def create_user(email='bob@esponja.com', name='Bob Esponja'):
+    '''Create and return a user'''
+    return get_user_model().objects.create_user(
+        email=email,
+        password='senhadobob123',
+        name=name
+    )
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    '''Test authenticating requests with cached tokens'''
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_cached(self):
+        '''Test a token is looked up in the database only once'''
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        stats = get_token_cache().stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_deleted_token_rejected(self):
+        '''Test a deleted token stops authenticating right away'''
+        self.client.get(ME_URL)
+        self.token.delete()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        '''Test a deactivated user stops authenticating right away'''
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_visible(self):
+        '''Test the cached user does not hide a profile update'''
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'Patrick Estrela'})
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['name'], 'Patrick Estrela')
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 1, 'TTL': 60})
+    def test_least_recently_used_evicted(self):
+        '''Test the cache holds at most MAX_SIZE tokens'''
+        other = Token.objects.create(user=create_user('lula@molusco.com'))
+        self.client.get(ME_URL)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other.key}')
+        self.client.get(ME_URL)
+        self.assertEqual(get_token_cache().stats()['size'], 1)
+        self.assertIsNone(get_token_cache().get(self.token.key))
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 10, 'TTL': 60})
+    def test_expired_token_reloaded(self):
+        '''Test entries older than the TTL are looked up again'''
+        with patch('time.monotonic', return_value=1000):
+            self.client.get(ME_URL)
+        with patch('time.monotonic', return_value=1061):
+            with self.assertNumQueries(1):
+                self.client.get(ME_URL)
+
+    @override_settings(
+        CACHES=SHARED_CACHES,
+        TOKEN_AUTH_CACHE={'TTL': 60, 'CACHE_ALIAS': 'tokens'}
+    )
+    def test_shared_cache_invalidated(self):
+        '''Test tokens cached in a shared backend are invalidated'''
+        self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenCacheInvalidationTests(TestCase):
+    '''Test invalidating tokens cached by other workers'''
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            CACHES={
+                'default': {
+                    'BACKEND': (
+                        'django.core.cache.backends.locmem.LocMemCache'
+                    ),
+                },
+                'shared': {
+                    'BACKEND': (
+                        'django.core.cache.backends.filebased.FileBasedCache'
+                    ),
+                    'LOCATION': self.cache_dir.name,
+                },
+            },
+            TOKEN_AUTH_CACHE={
+                'TTL': 60,
+                'INVALIDATION_CACHE_ALIAS': 'shared',
+            }
+        )
+        self.settings_override.enable()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.cache_dir.cleanup()
+
+    def test_invalidated_by_other_process(self):
+        '''Test a token forgotten by another process is looked up again
+        instead of being taken from the cache of this one'''
+        self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+        worker = multiprocessing.get_context('fork').Process(
+            target=get_token_cache().delete,
+            args=[self.token.key]
+        )
+        worker.start()
+        worker.join()
+        self.assertEqual(worker.exitcode, 0)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+    def test_deactivated_user_invalidated_in_other_workers(self):
+        '''Test deactivating a user invalidates the copies cached by
+        every worker'''
+        self.client.get(ME_URL)
+        other_worker = TokenCache(
+            ttl=60,
+            invalidation_alias='shared'
+        )
+        other_worker.set(
+            self.token.key,
+            self.user,
+            other_worker.version(self.token.key)
+        )
+        self.assertIsNotNone(other_worker.get(self.token.key))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(other_worker.get(self.token.key))
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,22 +1,146 @@
+from io import StringIO
+
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from unittest.mock import patch
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from core.models import Ingredient, Recipe, Tag
+
+PING = 'core.management.commands.wait_for_db.Command.ping'
 
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db to be available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch(PING) as ping:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ping.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch(PING) as ping:
+            ping.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ping.call_count, 6)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts):
+        """Test the waits grow exponentially up to the maximum delay"""
+        with patch(PING) as ping:
+            ping.side_effect = [OperationalError] * 6 + [None]
+            call_command(
+                'wait_for_db',
+                initial_delay=1,
+                max_delay=8,
+                stdout=StringIO()
+            )
+        delays = [call.args[0] for call in ts.call_args_list]
+        self.assertEqual(len(delays), 6)
+        for delay, limit in zip(delays, [1, 2, 4, 8, 8, 8]):
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, limit)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_deadline(self, ts):
+        """Test giving up once the deadline passed"""
+        with patch(PING) as ping:
+            ping.side_effect = OperationalError('refused')
+            with self.assertRaisesMessage(CommandError, 'refused'):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+            self.assertEqual(ping.call_count, 1)
+
+    def test_wait_for_db_real_connection(self):
+        """Test the database answers a query and is warmed up"""
+        out = StringIO()
+        call_command('wait_for_db', warm_up=True, stdout=out)
+        self.assertIn('Database connected!', out.getvalue())
+        for phase in ['connection', 'queries', 'prewarm', 'application']:
+            self.assertIn(f'Warmed up {phase} in', out.getvalue())
+
+
+class SeedDataTests(TestCase):
+    '''Test generating data for load tests'''
+    options = {
+        'users': 3,
+        'tags': 30,
+        'ingredients': 4,
+        'recipes': 7,
+        'tags_per_recipe': 2,
+        'ingredients_per_recipe': 3,
+        'batch_size': 5,
+    }
+
+    def seed(self, **options):
+        call_command(
+            'seed_data',
+            **{**self.options, **options},
+            stdout=StringIO()
+        )
+
+    def snapshot(self):
+        '''Return the generated rows, without their ids'''
+        return [
+            (
+                recipe.user.email,
+                recipe.title,
+                recipe.time_minutes,
+                recipe.price,
+                recipe.link,
+                recipe.image.name,
+                recipe.image_status,
+                recipe.image_variants,
+                sorted(tag.name for tag in recipe.tags.all()),
+                sorted(item.name for item in recipe.ingredients.all()),
+            )
+            for recipe in Recipe.objects.select_related(
+                'user'
+            ).prefetch_related('tags', 'ingredients').order_by(
+                'user__email',
+                'id'
+            )
+        ]
+
+    def test_seed_data(self):
+        '''Test the users, collections and relations are generated'''
+        self.seed()
+        users = get_user_model().objects.filter(
+            email__endswith='@seed.example.com'
+        )
+        self.assertEqual(users.count(), 3)
+        self.assertTrue(users.first().check_password('seedpassword'))
+        self.assertEqual(Tag.objects.filter(user__in=users).count(), 90)
+        self.assertEqual(
+            Tag.objects.filter(user=users.first()).values('name').distinct(
+            ).count(),
+            30
+        )
+        self.assertEqual(Ingredient.objects.count(), 12)
+        self.assertEqual(Recipe.objects.count(), 21)
+        recipe = Recipe.objects.first()
+        self.assertIsNotNone(recipe.search_vector)
+        self.assertLessEqual(recipe.ingredients.count(), 4)
+        for tag in recipe.tags.all():
+            self.assertEqual(tag.user_id, recipe.user_id)
+
+    def test_seed_data_deterministic(self):
+        '''Test the same seed generates the same data with either writer,
+        and another seed different data'''
+        self.seed(seed=7)
+        first = self.snapshot()
+        self.seed(seed=7, clear=True, copy=True)
+        self.assertEqual(self.snapshot(), first)
+        self.seed(seed=8, clear=True)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_seed_data_existing_users(self):
+        '''Test seeding twice with the same prefix is refused'''
+        self.seed(users=1)
+        with self.assertRaises(CommandError):
+            self.seed(users=1)
+        self.seed(users=1, prefix='other')
+        self.assertEqual(get_user_model().objects.count(), 2)
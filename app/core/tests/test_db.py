@@ -0,0 +1,136 @@
+import threading
+import time
+
+from django.db import connection
+from django.db.utils import InterfaceError, OperationalError
+from django.test import SimpleTestCase, TestCase
+
+from core.db.backends.postgresql.base import close_pools, DatabaseWrapper
+from core.db.pool import ConnectionPool
+
+
+class FakeConnection:
+    '''DB-API connection recording how the pool uses it'''
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    '''Test sharing connections with the connection pool'''
+
+    def test_reuse_released(self):
+        '''Test a released connection is rolled back and handed out again'''
+        pool = ConnectionPool(max_size=2)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        self.assertEqual(first.rollbacks, 1)
+        self.assertIs(pool.acquire(FakeConnection), first)
+        self.assertEqual(pool.stats(), {'size': 1, 'idle': 0})
+
+    def test_max_size(self):
+        '''Test acquiring from a full pool times out'''
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+        with self.assertRaises(OperationalError):
+            pool.acquire(FakeConnection)
+
+    def test_wait_for_release(self):
+        '''Test acquiring from a full pool waits for a release'''
+        pool = ConnectionPool(max_size=1, timeout=5)
+        first = pool.acquire(FakeConnection)
+        timer = threading.Timer(0.05, pool.release, [first])
+        timer.start()
+        self.assertIs(pool.acquire(FakeConnection), first)
+        timer.join()
+
+    def test_drop_broken(self):
+        '''Test broken, expired and unhealthy connections are dropped'''
+        pool = ConnectionPool(max_size=1, max_idle=60)
+        broken = pool.acquire(FakeConnection)
+        broken.closed = 2
+        pool.release(broken)
+        self.assertEqual(pool.stats(), {'size': 0, 'idle': 0})
+
+        expired = pool.acquire(FakeConnection)
+        pool.release(expired)
+        pool._idle[0] = (expired, time.monotonic() - 60)
+        self.assertIsNot(pool.acquire(FakeConnection), expired)
+        self.assertTrue(expired.closed)
+
+        pool = ConnectionPool(max_size=1, check=lambda connection: False)
+        unhealthy = pool.acquire(FakeConnection)
+        pool.release(unhealthy)
+        self.assertIsNot(pool.acquire(FakeConnection), unhealthy)
+        self.assertTrue(unhealthy.closed)
+        self.assertEqual(pool.stats(), {'size': 1, 'idle': 0})
+
+    def test_failed_connect(self):
+        '''Test a failed connect frees its place in the pool'''
+        pool = ConnectionPool(max_size=1)
+
+        def connect():
+            raise OperationalError('refused')
+
+        with self.assertRaises(OperationalError):
+            pool.acquire(connect)
+        self.assertEqual(pool.stats(), {'size': 0, 'idle': 0})
+
+
+class DatabaseWrapperTests(TestCase):
+    '''Test the health checks and pooling of the database backend'''
+
+    def make_wrapper(self, **settings):
+        '''Return a wrapper of its own on the test database'''
+        settings_dict = {**connection.settings_dict, **settings}
+        wrapper = DatabaseWrapper(settings_dict, alias='default')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def query(self, wrapper):
+        '''Run a query with the wrapper'''
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def test_health_check(self):
+        '''Test a kept connection that died is replaced before its use'''
+        wrapper = self.make_wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        self.query(wrapper)
+        dead = wrapper.connection
+        dead.close()
+        wrapper.close_if_unusable_or_obsolete()
+        self.query(wrapper)
+        self.assertIsNot(wrapper.connection, dead)
+
+    def test_no_health_check(self):
+        '''Test a kept connection is used as is without health checks'''
+        wrapper = self.make_wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=False)
+        self.query(wrapper)
+        wrapper.connection.close()
+        wrapper.close_if_unusable_or_obsolete()
+        with self.assertRaises(InterfaceError):
+            self.query(wrapper)
+
+    def test_pool(self):
+        '''Test closed connections go back to the pool for other threads'''
+        self.addCleanup(close_pools)
+        pool = {'MAX_SIZE': 1, 'TIMEOUT': 1, 'MAX_IDLE': 60}
+        wrapper = self.make_wrapper(POOL=pool, CONN_HEALTH_CHECKS=True)
+        self.query(wrapper)
+        pooled = wrapper.connection
+        wrapper.close()
+        self.assertFalse(pooled.closed)
+
+        other = self.make_wrapper(POOL=pool, CONN_HEALTH_CHECKS=True)
+        self.query(other)
+        self.assertIs(other.connection, pooled)
+        other.close()
+        close_pools()
+        self.assertTrue(pooled.closed)
@@ -0,0 +1,168 @@
+import datetime
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+DATA = {
+    'price': Decimal('12.50'),
+    'created': datetime.datetime(
+        2022, 5, 1, 12, 30, 15, 123456,
+        tzinfo=datetime.timezone.utc
+    ),
+    'day': datetime.date(2022, 5, 1),
+    'duration': datetime.timedelta(minutes=90),
+    'label': gettext_lazy('Vegan'),
+    'text': 'Feijão com arroz',
+    'separators': 'line\u2028paragraph\u2029',
+    'ids': (1, 2),
+    1: 'integer key',
+}
+
+
+class FastJSONRendererTests(TestCase):
+    '''Test rendering JSON with orjson'''
+
+    def test_same_output(self):
+        '''Test the output is the one of JSONRenderer'''
+        for data in [DATA, [DATA, DATA], {'count': 0}, None, 'text']:
+            self.assertEqual(
+                FastJSONRenderer().render(data),
+                JSONRenderer().render(data)
+            )
+
+    def test_floats(self):
+        '''Test floats are rendered as the same numbers, and non finite
+        ones as null'''
+        data = {'floats': [0.5, 0.06079271, 1e-7, 1e16, -2.5e-5, 1.5e300]}
+        content = FastJSONRenderer().render(data)
+        self.assertEqual(json.loads(content), data)
+        self.assertEqual(
+            FastJSONRenderer().render({'rank': 0.06079271}),
+            JSONRenderer().render({'rank': 0.06079271})
+        )
+        self.assertEqual(
+            FastJSONRenderer().render([float('nan'), float('inf')]),
+            b'[null,null]'
+        )
+        with self.assertRaises(ValueError):
+            JSONRenderer().render([float('nan')])
+
+    def test_large_integers(self):
+        '''Test integers orjson refuses are rendered by JSONRenderer'''
+        data = {'big': 2 ** 70}
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            JSONRenderer().render(data)
+        )
+
+    def test_uses_orjson(self):
+        '''Test orjson renders compact output'''
+        with patch('json.dumps') as dumps:
+            FastJSONRenderer().render(DATA)
+        dumps.assert_not_called()
+
+    def test_indent(self):
+        '''Test indented output is left to JSONRenderer'''
+        renderer = FastJSONRenderer()
+        content = renderer.render(
+            DATA,
+            'application/json; indent=4',
+            {}
+        )
+        self.assertEqual(
+            content,
+            JSONRenderer().render(DATA, 'application/json; indent=4', {})
+        )
+        self.assertIn(b'\n    "price"', content)
+
+    def test_without_orjson(self):
+        '''Test falling back to the json module without orjson'''
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(DATA),
+                JSONRenderer().render(DATA)
+            )
+
+
+class FastJSONParserTests(TestCase):
+    '''Test parsing JSON with orjson'''
+
+    def parse(self, content, **context):
+        return FastJSONParser().parse(io.BytesIO(content), None, context)
+
+    def test_parse(self):
+        '''Test the body is parsed'''
+        self.assertEqual(
+            self.parse('{"name": "Feijão", "ids": [1, 2]}'.encode()),
+            {'name': 'Feijão', 'ids': [1, 2]}
+        )
+
+    def test_invalid(self):
+        '''Test invalid and non strict JSON are refused'''
+        for content in [b'{"name": ', b'{"price": NaN}']:
+            with self.assertRaises(ParseError):
+                self.parse(content)
+
+    def test_large_integers(self):
+        '''Test integers wider than 64 bits are kept exact'''
+        for value in [2 ** 64, 10 ** 23, -2 ** 63 - 1, 2 ** 64 - 1]:
+            self.assertEqual(
+                self.parse(f'{{"id": {value}}}'.encode()),
+                {'id': value}
+            )
+        self.assertEqual(
+            self.parse(b'{"rank": 0.123456789012345678901}'),
+            {'rank': 0.123456789012345678901}
+        )
+
+    def test_out_of_range_float(self):
+        '''Test floats orjson refuses are parsed like JSONParser does'''
+        self.assertEqual(
+            self.parse(b'{"price": 1e400}'),
+            {'price': float('inf')}
+        )
+
+    def test_other_encoding(self):
+        '''Test bodies in other encodings are decoded'''
+        self.assertEqual(
+            self.parse('{"name": "Feijão"}'.encode('latin-1'),
+                       encoding='latin-1'),
+            {'name': 'Feijão'}
+        )
+
+
+class FastJSONAPITests(TestCase):
+    '''Test the API renders and parses JSON with orjson'''
+
+    def test_recipe_round_trip(self):
+        '''Test a recipe is created from JSON and its price rendered'''
+        user = get_user_model().objects.create_user(
+            email='rapido@json.com',
+            password='senhadorapido123'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        res = client.post(
+            reverse('recipe:recipe-list'),
+            '{"title": "Moqueca", "time_minutes": 40, "price": "25.90", '
+            '"tags": [], "ingredients": []}',
+            content_type='application/json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.get().price, Decimal('25.90'))
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertIn(b'"price":"25.90"', res.content)
@@ -0,0 +1,191 @@
+import tempfile
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import (
+    AsyncClient, override_settings, TestCase, TransactionTestCase
+)
+from django.urls import reverse
+from prometheus_client import generate_latest, REGISTRY
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.metrics import get_registry
+from core.models import Recipe, Tag
+
+METRICS_URL = reverse('metrics')
+
+
+def sample(name, view, **labels):
+    '''Return the value of a sample of the metrics of the process'''
+    return REGISTRY.get_sample_value(name, {'view': view, **labels}) or 0
+
+
+class MetricsTests(TestCase):
+    '''Test recording the metrics of the requests per view'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='metrico@medidor.com',
+            password='senhadometrico123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+    def test_request_metrics(self):
+        '''Test the latency, queries and serializer time of a view'''
+        view = 'TagViewSet.list'
+        count = sample(
+            'api_request_duration_seconds_count',
+            view,
+            method='GET',
+            status='200'
+        )
+        queries = sample('api_request_db_queries_sum', view)
+        serializer = sample(
+            'api_request_serializer_duration_seconds_sum',
+            view
+        )
+
+        self.client.get(reverse('recipe:tag-list'))
+
+        self.assertEqual(sample(
+            'api_request_duration_seconds_count',
+            view,
+            method='GET',
+            status='200'
+        ), count + 1)
+        self.assertGreater(sample('api_request_db_queries_sum', view), queries)
+        self.assertGreater(
+            sample('api_request_db_duration_seconds_sum', view),
+            0
+        )
+        self.assertGreater(
+            sample('api_request_serializer_duration_seconds_sum', view),
+            serializer
+        )
+
+    def test_view_labels(self):
+        '''Test requests are labelled with their view and action'''
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Salad',
+            time_minutes=5,
+            price=2
+        )
+        requests = [
+            ('post', reverse(
+                'recipe:recipe-upload-image',
+                args=[recipe.id]
+            ), 'RecipeViewSet.upload_image'),
+            ('post', reverse('users:token'), 'CreateTokenView'),
+            ('get', '/no/such/page/', 'unresolved'),
+        ]
+        for method, url, view in requests:
+            before = self.count(view, method.upper())
+            getattr(self.client, method)(url, {})
+            self.assertEqual(self.count(view, method.upper()), before + 1)
+
+    def test_unknown_method_label(self):
+        '''Test made up methods share a single label'''
+        url = reverse('recipe:tag-list')
+        before = self.count('TagViewSet', 'other')
+        self.client.generic('BREW', url)
+        self.client.generic('PROPFIND', url)
+        self.assertEqual(self.count('TagViewSet', 'other'), before + 2)
+        self.assertEqual(self.count('TagViewSet', 'BREW'), 0)
+
+    def count(self, view, method):
+        '''Return the number of requests recorded for the view and method,
+        whatever their status'''
+        return sum(
+            metric_sample.value
+            for metric in REGISTRY.collect()
+            if metric.name == 'api_request_duration_seconds'
+            for metric_sample in metric.samples
+            if metric_sample.name == 'api_request_duration_seconds_count'
+            and metric_sample.labels['view'] == view
+            and metric_sample.labels['method'] == method
+        )
+
+    @override_settings(METRICS_ENDPOINT={'TOKEN': 'scraper-token'})
+    def test_metrics_endpoint(self):
+        '''Test exposing the metrics in the Prometheus text format'''
+        self.client.get(reverse('recipe:tag-list'))
+        res = self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION='Bearer scraper-token'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            b'api_request_db_queries_bucket{le="1.0",view="TagViewSet.list"}',
+            res.content
+        )
+
+    @override_settings(METRICS_ENDPOINT={
+        'ALLOWED_IPS': ['10.0.0.0/8'],
+        'TOKEN': 'scraper-token',
+    })
+    def test_metrics_endpoint_restricted(self):
+        '''Test only allowed addresses, the bearer token and staff users
+        read the metrics'''
+        client = APIClient()
+        self.assertEqual(
+            client.get(METRICS_URL).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+        self.assertEqual(
+            client.get(
+                METRICS_URL,
+                HTTP_AUTHORIZATION='Bearer wrong-token'
+            ).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+        self.assertEqual(
+            client.get(METRICS_URL, REMOTE_ADDR='10.1.2.3').status_code,
+            status.HTTP_200_OK
+        )
+
+        client.force_login(self.user)
+        self.assertEqual(
+            client.get(METRICS_URL).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(
+            client.get(METRICS_URL).status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_multiprocess_registry(self):
+        '''Test merging the metrics files of the worker processes'''
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.dict('os.environ', PROMETHEUS_MULTIPROC_DIR=directory):
+            registry = get_registry()
+            self.assertIsNot(registry, REGISTRY)
+            self.assertEqual(generate_latest(registry), b'')
+
+
+class AsyncMetricsTests(TransactionTestCase):
+    '''Test counting the queries async views run on other threads'''
+
+    def test_async_view_queries(self):
+        '''Test the queries of an async view are counted'''
+        user = get_user_model().objects.create_user(
+            email='assincrono@medidor.com',
+            password='senhadoassincrono123'
+        )
+        token = Token.objects.create(user=user)
+        view = 'TagViewSet.list'
+        queries = sample('api_request_db_queries_sum', view)
+        res = async_to_sync(AsyncClient().get)(
+            reverse('recipe-async:tag-list'),
+            authorization=f'Token {token.key}'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(sample('api_request_db_queries_sum', view), queries)
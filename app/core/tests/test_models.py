@@ -1,6 +1,8 @@
+import hashlib
+
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from core.models import Ingredient, Recipe, recipe_image_file_path, Tag
-from unittest.mock import patch
 from django.test import TestCase
 
 
@@ -81,11 +83,10 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(recipe), recipe.title)
 
-    @patch('uuid.uuid4')
-    def test_filename_uuid(self, mock_uuid):
-        '''Test that filename was save in the correct location'''
-        test_uuid = 'test-uuid'
-        mock_uuid.return_value = test_uuid
-        file_path = recipe_image_file_path(None, 'myimage.jpg')
-        expected_path = f'uploads/recipe/{test_uuid}.jpg'
+    def test_filename_content_hash(self):
+        '''Test that filename is the hash of the image content'''
+        recipe = Recipe(image=SimpleUploadedFile('myimage.JPG', b'image'))
+        file_path = recipe_image_file_path(recipe, 'myimage.JPG')
+        digest = hashlib.sha256(b'image').hexdigest()
+        expected_path = f'uploads/recipe/{digest}.jpg'
         self.assertEqual(file_path, expected_path)
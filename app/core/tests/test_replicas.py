@@ -0,0 +1,127 @@
+import random
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import override_settings, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.db.routers import ReplicaRouter, reset_replica, use_replica
+from core.models import Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+REPLICA_ROUTING = {
+    'ALIASES': ['replica_1'],
+    'STICKY_SECONDS': 10,
+    'CACHE_ALIAS': 'default',
+}
+
+
+@override_settings(REPLICA_ROUTING=REPLICA_ROUTING)
+class ReplicaRoutingTests(TransactionTestCase):
+    '''Test reading from replica_1, which mirrors the default database in
+    the tests. The replica has a connection of its own, so the data is
+    committed'''
+    databases = {'default', 'replica_1'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='luigi@replica.com',
+            password='senhadoluigi123'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        Tag.objects.create(user=self.user, name='Vegan')
+
+    def get_tags(self):
+        '''List the tags, returning the response and the queries run on
+        the default database and on the replica'''
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['replica_1']) as replica:
+            res = self.client.get(TAGS_URL)
+        return res, default.captured_queries, replica.captured_queries
+
+    def test_safe_requests_read_replica(self):
+        '''Test the reads of a safe request go to the replica'''
+        res, default, replica = self.get_tags()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+        self.assertTrue(any('core_tag' in q['sql'] for q in replica))
+        self.assertFalse(any('core_tag' in q['sql'] for q in default))
+
+    def test_one_replica_per_request(self):
+        '''Test the replica is picked once for all the reads of a
+        request'''
+        with patch(
+            'core.middleware.random.choice',
+            wraps=random.choice
+        ) as choice:
+            res, default, replica = self.get_tags()
+        choice.assert_called_once_with(['replica_1'])
+        self.assertGreater(len(replica), 1)
+
+    def test_router_reads_picked_replica(self):
+        '''Test the router sends the reads to the replica of the context,
+        if it is still configured'''
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Tag))
+        token = use_replica('replica_1')
+        try:
+            self.assertEqual(router.db_for_read(Tag), 'replica_1')
+            self.assertIsNone(router.db_for_read(Token))
+            with override_settings(REPLICA_ROUTING={'ALIASES': []}):
+                self.assertIsNone(router.db_for_read(Tag))
+        finally:
+            reset_replica(token)
+
+    def test_token_read_from_default(self):
+        '''Test tokens are read from the default database'''
+        res, default, replica = self.get_tags()
+        self.assertTrue(any('authtoken_token' in q['sql'] for q in default))
+        self.assertFalse(any('authtoken_token' in q['sql'] for q in replica))
+
+    def test_read_your_writes(self):
+        '''Test reads go to the default database after a write until the
+        stickiness expires'''
+        res = self.client.post(TAGS_URL, {'name': 'Quick'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res, default, replica = self.get_tags()
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(replica, [])
+
+        cache.clear()
+        res, default, replica = self.get_tags()
+        self.assertNotEqual(replica, [])
+
+    def test_stickiness_per_credentials(self):
+        '''Test a write only sticks the credentials it was made with'''
+        self.client.post(TAGS_URL, {'name': 'Quick'})
+        other = get_user_model().objects.create_user(
+            email='mario@replica.com',
+            password='senhadomario123'
+        )
+        token = Token.objects.create(user=other)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res, default, replica = self.get_tags()
+        self.assertNotEqual(replica, [])
+
+    def test_allow_migrate(self):
+        '''Test the replicas are not migrated'''
+        router = ReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica_1', 'core'))
+        self.assertIsNone(router.allow_migrate('default', 'core'))
+
+    @override_settings(REPLICA_ROUTING={'ALIASES': []})
+    def test_no_replicas(self):
+        '''Test every query goes to the default database without replicas'''
+        res, default, replica = self.get_tags()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(replica, [])
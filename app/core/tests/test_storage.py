@@ -0,0 +1,98 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings, TestCase
+
+from core.models import Recipe, recipe_image_storage
+
+
+class RecipeImageStorageTests(TestCase):
+    '''Test storing recipe images by the hash of their content'''
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name,
+            RECIPE_IMAGE_GRACE_SECONDS=0
+        )
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            email='penelope@charmosa.com',
+            password='senhadapenelope123'
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def create_recipe(self, content=b'image', **kwargs):
+        '''Create a recipe with an image of the content'''
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                user=self.user,
+                title='Cheesecake',
+                time_minutes=60,
+                price=20,
+                image=SimpleUploadedFile('cake.jpg', content),
+                **kwargs
+            )
+
+    def stored_files(self):
+        '''Return the names of every stored file'''
+        return sorted(recipe_image_storage.walk('uploads/recipe'))
+
+    def test_identical_images_share_a_file(self):
+        '''Test identical uploads are stored once'''
+        first = self.create_recipe()
+        second = self.create_recipe()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.stored_files(), [first.image.name])
+
+    def test_replaced_image_released(self):
+        '''Test a replaced image and its variants are deleted'''
+        variant = recipe_image_storage.save(
+            'uploads/recipe/variants/cake-thumbnail.jpg',
+            SimpleUploadedFile('cake.jpg', b'thumbnail')
+        )
+        recipe = self.create_recipe(image_variants={'thumbnail': variant})
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.image = SimpleUploadedFile('cake.jpg', b'other')
+            recipe.image_variants = {}
+            recipe.save()
+        self.assertEqual(self.stored_files(), [recipe.image.name])
+
+    def test_shared_image_kept(self):
+        '''Test an image still used by another recipe is kept'''
+        first = self.create_recipe()
+        second = self.create_recipe()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.stored_files(), [second.image.name])
+
+    def test_recent_image_kept(self):
+        '''Test an image written within the grace period is kept'''
+        recipe = self.create_recipe()
+        with self.settings(RECIPE_IMAGE_GRACE_SECONDS=3600):
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe.delete()
+        self.assertEqual(len(self.stored_files()), 1)
+
+    def test_gc_command(self):
+        '''Test the command deletes only the unreferenced files'''
+        recipe = self.create_recipe()
+        orphan = recipe_image_storage.save(
+            'uploads/recipe/orphan.jpg',
+            SimpleUploadedFile('orphan.jpg', b'orphan')
+        )
+        out = StringIO()
+        call_command('gc_recipe_images', dry_run=True, stdout=out)
+        self.assertIn(orphan, out.getvalue())
+        self.assertTrue(recipe_image_storage.exists(orphan))
+
+        call_command('gc_recipe_images', stdout=StringIO())
+        self.assertEqual(self.stored_files(), [recipe.image.name])
+        self.assertTrue(os.path.exists(recipe.image.path))
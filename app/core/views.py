@@ -0,0 +1,52 @@
+import ipaddress
+import secrets
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from .metrics import get_registry
+
+
+def metrics_allowed(request):
+    '''Return whether the request may read the metrics: it comes from an
+    allowed address, sends the bearer token or is made by a staff user'''
+    options = getattr(settings, 'METRICS_ENDPOINT', {})
+    token = options.get('TOKEN')
+    if token:
+        scheme, _, credentials = request.headers.get(
+            'Authorization', ''
+        ).partition(' ')
+        if scheme.lower() == 'bearer' and secrets.compare_digest(
+            credentials.strip().encode(),
+            token.encode()
+        ):
+            return True
+
+    allowed = options.get('ALLOWED_IPS', [])
+    if allowed:
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR'))
+        except ValueError:
+            address = None
+        if address is not None and any(
+            address in ipaddress.ip_network(network, strict=False)
+            for network in allowed
+        ):
+            return True
+
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_active and user.is_staff)
+
+
+@require_GET
+def metrics(request):
+    '''Return the metrics of every worker process in the Prometheus text
+    format, to the clients METRICS_ENDPOINT allows'''
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()),
+        content_type=CONTENT_TYPE_LATEST
+    )
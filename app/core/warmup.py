@@ -0,0 +1,102 @@
+import time
+
+from django.apps import apps
+from django.db import connections
+from django.urls import get_resolver
+from PIL import Image
+from rest_framework.settings import api_settings
+
+# Tables read by nearly every request, whose pages and catalog entries are
+# loaded ahead of the first requests
+HOT_MODELS = [
+    'authtoken.Token',
+    'core.User',
+    'core.CollectionVersion',
+    'core.Recipe',
+    'core.Tag',
+    'core.Ingredient',
+]
+
+
+def hot_tables():
+    '''Return the tables of the hot models and their many-to-many tables'''
+    tables = []
+    for label in HOT_MODELS:
+        model = apps.get_model(label)
+        tables.append(model._meta.db_table)
+        tables += [
+            field.remote_field.through._meta.db_table
+            for field in model._meta.local_many_to_many
+        ]
+    return tables
+
+
+def warm_up_connection(using):
+    '''Open the connection and make its first round trip'''
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def warm_up_queries(using):
+    '''Read a row of every hot table through its primary key index, which
+    loads their catalog entries into the connection and their first pages
+    into the shared buffers'''
+    for label in HOT_MODELS:
+        model = apps.get_model(label)
+        list(model._default_manager.using(using).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:1])
+
+
+def prewarm_tables(using):
+    '''Load the hot tables and their indexes into the shared buffers with
+    pg_prewarm, when the extension is installed'''
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_prewarm'"
+        )
+        if cursor.fetchone() is None:
+            return
+        tables = hot_tables()
+        cursor.execute(
+            'SELECT pg_prewarm(oid) FROM pg_class WHERE relname = ANY(%s) '
+            'UNION ALL '
+            'SELECT pg_prewarm(indexrelid) FROM pg_index '
+            'JOIN pg_class ON pg_class.oid = indrelid '
+            'WHERE relname = ANY(%s)',
+            [tables, tables]
+        )
+
+
+def warm_up_application(using):
+    '''Fill the in-process caches the first requests would fill: the URL
+    resolver, the model relations, the DRF classes and the image plugins'''
+    get_resolver().reverse_dict
+    for model in apps.get_models():
+        model._meta.get_fields()
+    for setting in ['DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PARSER_CLASSES',
+                    'DEFAULT_RENDERER_CLASSES']:
+        getattr(api_settings, setting)
+    Image.init()
+
+
+WARM_UP_PHASES = [
+    ('connection', warm_up_connection),
+    ('queries', warm_up_queries),
+    ('prewarm', prewarm_tables),
+    ('application', warm_up_application),
+]
+
+
+def warm_up(using='default'):
+    '''Do the work the first requests of a process would pay for and return
+    the seconds each phase took'''
+    timings = {}
+    for name, phase in WARM_UP_PHASES:
+        start = time.perf_counter()
+        phase(using)
+        timings[name] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,62 @@
+"""
+Gunicorn config serving the ASGI application with uvicorn workers in
+production:
+
+    gunicorn app.asgi:application -c gunicorn.conf.py
+
+The async endpoints under /api/async/ write their responses on the event
+loop, so slow clients do not hold a worker thread. With several workers,
+set PROMETHEUS_MULTIPROC_DIR to a directory the workers share their
+metrics in.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS',
+    multiprocessing.cpu_count() * 2 + 1
+))
+worker_class = 'uvicorn.workers.UvicornWorker'
+# Restart the workers now and then to bound the growth of their memory
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+accesslog = '-'
+
+
+def post_worker_init(worker):
+    '''Warm up each worker before it accepts requests, unless
+    GUNICORN_WARM_UP is off'''
+    if os.environ.get('GUNICORN_WARM_UP', 'true').lower() not in (
+        '1', 'true', 'yes', 'on'
+    ):
+        return
+    from django.db import connections
+    from core.warmup import warm_up
+
+    timings = warm_up()
+    # The connection belongs to this thread, not to the request threads
+    connections.close_all()
+    worker.log.info('Warmed up: ' + ', '.join(
+        f'{phase} {seconds:.3f}s' for phase, seconds in timings.items()
+    ))
+
+
+def on_starting(server):
+    '''Drop the metrics files of the workers of an earlier run'''
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    '''Stop reporting the gauges of a worker that exited'''
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
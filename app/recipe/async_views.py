@@ -0,0 +1,7 @@
+from core.async_views import async_api_view
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+recipe_list = async_api_view(RecipeViewSet.as_view({'get': 'list'}))
+recipe_detail = async_api_view(RecipeViewSet.as_view({'get': 'retrieve'}))
+tag_list = async_api_view(TagViewSet.as_view({'get': 'list'}))
+ingredient_list = async_api_view(IngredientViewSet.as_view({'get': 'list'}))
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.http import urlencode
+
+
+class ResponseCache:
+    '''Cache of the data of API responses. Keys hold the collection version
+    of the user, so a write of the user makes the older entries unreachable
+    and they expire on their own'''
+    key_prefix = 'recipe-response:'
+
+    def __init__(self, enabled=True, cache_alias='default', timeout=300):
+        self.enabled = enabled
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, request, version):
+        '''Return the key of the response to the request when the
+        collections of its user are at the version'''
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = '\n'.join([
+            str(request.user.pk),
+            str(version),
+            # Links in the responses are absolute
+            request.scheme,
+            request.get_host(),
+            request.path,
+            query,
+        ])
+        return self.key_prefix + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        '''Return the cached data of the key or None'''
+        data = caches[self.cache_alias].get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        '''Cache the data of the key'''
+        caches[self.cache_alias].set(key, data, self.timeout)
+
+    def clear(self):
+        '''Reset the counters'''
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        '''Return the hit and miss counters and the hit rate'''
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    '''Return the response cache configured by the RECIPE_RESPONSE_CACHE
+    setting'''
+    global _response_cache
+    if _response_cache is None:
+        options = getattr(settings, 'RECIPE_RESPONSE_CACHE', {})
+        _response_cache = ResponseCache(
+            enabled=options.get('ENABLED', True),
+            cache_alias=options.get('CACHE_ALIAS', 'default'),
+            timeout=options.get('TIMEOUT', 300),
+        )
+    return _response_cache
+
+
+@receiver(setting_changed)
+def reset_response_cache(setting, **kwargs):
+    '''Rebuild the response cache when its settings change'''
+    global _response_cache
+    if setting in ('RECIPE_RESPONSE_CACHE', 'CACHES'):
+        _response_cache = None
@@ -0,0 +1,87 @@
+import csv
+import json
+from collections import defaultdict
+
+from core.models import Recipe
+
+
+class Echo:
+    '''File-like object handing back what is written to it, so csv.writer
+    produces rows that can be streamed'''
+
+    def write(self, value):
+        return value
+
+
+class RecipeExporter:
+    '''Stream the recipes of a user with the names of their tags and
+    ingredients.
+
+    Recipes are read with a server-side cursor in chunks, and the names of
+    each chunk are loaded with one query per relation, so memory depends on
+    the chunk size and not on the number of recipes'''
+    fields = ['id', 'title', 'time_minutes', 'price', 'link']
+    relations = {
+        'tags': (Recipe.tags.through, 'tag__name'),
+        'ingredients': (Recipe.ingredients.through, 'ingredient__name'),
+    }
+    content_types = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def __init__(self, user, chunk_size=2000):
+        self.user = user
+        self.chunk_size = chunk_size
+
+    def iter_recipes(self):
+        '''Yield every recipe of the user as a dictionary'''
+        rows = Recipe.objects.filter(user=self.user).order_by('id').values(
+            *self.fields
+        ).iterator(chunk_size=self.chunk_size)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield from self.add_names(chunk)
+                chunk = []
+        if chunk:
+            yield from self.add_names(chunk)
+
+    def add_names(self, chunk):
+        '''Return the recipes of the chunk with their tag and ingredient
+        names'''
+        ids = [row['id'] for row in chunk]
+        for field, (through, name) in self.relations.items():
+            names = defaultdict(list)
+            links = through.objects.filter(recipe_id__in=ids).order_by(
+                name
+            ).values_list('recipe_id', name)
+            for recipe_id, value in links:
+                names[recipe_id].append(value)
+            for row in chunk:
+                row[field] = names[row['id']]
+        return chunk
+
+    def iter_ndjson(self):
+        '''Yield every recipe as a line of JSON'''
+        for recipe in self.iter_recipes():
+            recipe['price'] = str(recipe['price'])
+            yield json.dumps(recipe) + '\n'
+
+    def iter_csv(self):
+        '''Yield a header and every recipe as CSV lines, with the names of
+        tags and ingredients joined by |'''
+        writer = csv.writer(Echo())
+        columns = self.fields + list(self.relations)
+        yield writer.writerow(columns)
+        for recipe in self.iter_recipes():
+            for field in self.relations:
+                recipe[field] = '|'.join(recipe[field])
+            yield writer.writerow([recipe[column] for column in columns])
+
+    def iter_lines(self, export_type):
+        '''Yield the lines of the export in the requested type'''
+        if export_type == 'csv':
+            return self.iter_csv()
+        return self.iter_ndjson()
@@ -0,0 +1,185 @@
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchRank, TrigramWordSimilarity
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Value
+from django.db.models.functions import Cast, Collate, Upper
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+from core.search import search_query
+
+
+class RecipeFilter:
+    '''Filter recipes by the ids of their tags and ingredients.
+
+    Each dimension takes a comma separated list of ids, e.g. ?tags=1,2, and
+    matches recipes having any of them (the default) or all of them, chosen
+    with ?match=any|all or per dimension with ?tags_match=all. Conditions
+    are subqueries on the m2m tables instead of joins, so a recipe matching
+    several ids is returned only once.
+
+    ?search= matches web search style terms against the stored search vector
+    of the recipes and annotates them with their rank'''
+    dimensions = {
+        'tags': (Recipe.tags.through, 'tag_id'),
+        'ingredients': (Recipe.ingredients.through, 'ingredient_id'),
+    }
+    match_param = 'match'
+    match_choices = ('any', 'all')
+    search_param = 'search'
+
+    def __init__(self, query_params):
+        self.query_params = query_params
+
+    def filter_queryset(self, queryset):
+        '''Return the recipes matching the requested ids'''
+        default_match = self.get_match(self.match_param, 'any')
+        for name, (through, column) in self.dimensions.items():
+            ids = self.get_ids(name)
+            if not ids:
+                continue
+            match = self.get_match(f'{name}_{self.match_param}', default_match)
+            if match == 'all':
+                queryset = queryset.filter(
+                    pk__in=self.match_all(through, column, ids)
+                )
+            else:
+                queryset = queryset.filter(
+                    self.match_any(through, column, ids)
+                )
+        if self.is_search():
+            queryset = self.search(queryset, self.get_terms())
+        return queryset
+
+    def is_search(self):
+        '''Return whether the recipes are searched by terms'''
+        return bool(self.get_terms())
+
+    def get_terms(self):
+        '''Return the terms of the search'''
+        return self.query_params.get(self.search_param, '').strip()
+
+    def search(self, queryset, terms):
+        '''Return the recipes matching the terms, annotated with their
+        rank'''
+        query = search_query(terms)
+        # ts_rank returns a real, which is cast to double precision so the
+        # rank of a page cursor survives the round trip through JSON
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+
+    def match_any(self, through, column, ids):
+        '''Return the condition of recipes linked to any of the ids'''
+        return Exists(through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            **{f'{column}__in': ids}
+        ))
+
+    def match_all(self, through, column, ids):
+        '''Return the ids of the recipes linked to every id'''
+        return through.objects.filter(
+            **{f'{column}__in': ids}
+        ).values('recipe_id').annotate(
+            matched=Count(column)
+        ).filter(matched=len(ids)).values('recipe_id')
+
+    def get_ids(self, name):
+        '''Convert a list of numeric strings into a set of integers'''
+        param = self.query_params.get(name)
+        if not param:
+            return set()
+        try:
+            ids = {int(str_id) for str_id in param.split(',')}
+        except ValueError:
+            raise ValidationError({
+                name: [_('Expected a comma separated list of ids.')]
+            })
+        if any(pk < 1 for pk in ids):
+            raise ValidationError({
+                name: [_('Ids must be positive integers.')]
+            })
+        return ids
+
+    def get_match(self, param, default):
+        '''Return the matching mode requested in the parameter'''
+        match = self.query_params.get(param, default)
+        if match not in self.match_choices:
+            raise ValidationError({
+                param: [_('Expected one of: any, all.')]
+            })
+        return match
+
+
+class NameAutocomplete:
+    '''Suggest tags or ingredients for the text typed in ?q=.
+
+    Names starting with the text come first in alphabetical order, read
+    from the (user, UPPER(name) COLLATE "C") index. When they do not fill
+    the ?limit=, names with a word resembling the text follow, ordered by
+    trigram word similarity and read from the (user, UPPER(name)) trigram
+    index. Texts shorter than a trigram are only matched as prefixes'''
+    query_param = 'q'
+    limit_param = 'limit'
+    default_limit = 10
+    max_limit = 50
+    min_fuzzy_length = 3
+
+    def __init__(self, query_params):
+        self.query_params = query_params
+
+    def suggest(self, queryset):
+        '''Return the best suggestions among the queryset'''
+        text = self.get_text().upper()
+        limit = self.get_limit()
+        suggestions = list(self.match_prefix(queryset, text)[:limit])
+        if len(suggestions) < limit and len(text) >= self.min_fuzzy_length:
+            suggestions += self.match_fuzzy(
+                queryset.exclude(pk__in=[obj.pk for obj in suggestions]),
+                text
+            )[:limit - len(suggestions)]
+        return suggestions
+
+    def match_prefix(self, queryset, text):
+        '''Return the objects whose name starts with the text'''
+        return queryset.annotate(
+            upper_name=Collate(Upper('name'), 'C')
+        ).filter(upper_name__startswith=text).order_by('upper_name', 'id')
+
+    def match_fuzzy(self, queryset, text):
+        '''Return the objects having a word that resembles the text, the
+        most similar first'''
+        upper_name = Upper('name')
+        return queryset.filter(
+            TrigramWordSimilar(upper_name, Value(text))
+        ).annotate(
+            similarity=TrigramWordSimilarity(Value(text), upper_name)
+        ).order_by('-similarity', 'name', 'id')
+
+    def get_text(self):
+        '''Return the typed text'''
+        text = self.query_params.get(self.query_param, '').strip()
+        if not text:
+            raise ValidationError({
+                self.query_param: [_('This parameter is required.')]
+            })
+        return text
+
+    def get_limit(self):
+        '''Return the number of suggestions requested'''
+        limit = self.query_params.get(self.limit_param)
+        if limit is None:
+            return self.default_limit
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_limit:
+            raise ValidationError({
+                self.limit_param: [
+                    _('Expected an integer between 1 and {max}.').format(
+                        max=self.max_limit
+                    )
+                ]
+            })
+        return limit
@@ -0,0 +1,177 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.db import connections, transaction
+from django.dispatch import receiver
+from PIL import features, Image, ImageOps
+
+from core.models import CollectionVersion, Recipe, recipe_image_storage
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'JPEG': {
+        'extension': 'jpg',
+        'feature': 'jpg',
+        'options': {'quality': 80, 'optimize': True, 'progressive': True},
+    },
+    'WEBP': {
+        'extension': 'webp',
+        'feature': 'webp',
+        'options': {'quality': 80, 'method': 4},
+    },
+}
+VARIANTS = {
+    'thumbnail': {'size': (200, 200), 'format': 'JPEG'},
+    'medium': {'size': (800, 800), 'format': 'JPEG'},
+    'webp': {'size': (800, 800), 'format': 'WEBP'},
+}
+
+
+def variant_path(image_name, variant):
+    '''Return the storage name of a variant of the image'''
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    extension = FORMATS[VARIANTS[variant]['format']]['extension']
+    return os.path.join(directory, 'variants', f'{stem}-{variant}.{extension}')
+
+
+def build_variants(image_name, storage=recipe_image_storage):
+    '''Resize and recompress the image into every variant, dropping its
+    EXIF data, and return the storage names of the variants.
+
+    Variants are named after the image, itself named after its content, so
+    an existing variant was built from the same bytes for another recipe.
+    It is reused as it is, since rewriting it would make it missing for
+    that recipe meanwhile'''
+    variants = {}
+    missing = []
+    for variant, options in VARIANTS.items():
+        if not features.check(FORMATS[options['format']]['feature']):
+            continue
+        name = variant_path(image_name, variant)
+        if storage.exists(name):
+            # Keep it from being collected as an unreferenced file before
+            # the recipe records it
+            storage.touch(name)
+            variants[variant] = name
+        else:
+            missing.append(variant)
+    if not missing:
+        return variants
+
+    with storage.open(image_name, 'rb') as original:
+        image = Image.open(original)
+        # Apply the EXIF orientation before the data is dropped
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        for variant in missing:
+            options = VARIANTS[variant]
+            resized = image.copy()
+            resized.thumbnail(options['size'], Image.Resampling.LANCZOS)
+            content = BytesIO()
+            resized.save(
+                content,
+                format=options['format'],
+                **FORMATS[options['format']]['options']
+            )
+            variants[variant] = storage.save(
+                variant_path(image_name, variant),
+                ContentFile(content.getvalue())
+            )
+    # In the order of VARIANTS, whichever were reused
+    return {
+        variant: variants[variant]
+        for variant in VARIANTS if variant in variants
+    }
+
+
+def process_recipe_image(recipe_id, image_name):
+    '''Build the variants of a recipe image and record them on the recipe,
+    unless the image was replaced meanwhile'''
+    recipes = Recipe.objects.filter(pk=recipe_id, image=image_name)
+    try:
+        variants = build_variants(image_name)
+    except Exception:
+        logger.exception('Could not process the image %s', image_name)
+        changes = {'image_status': Recipe.IMAGE_FAILED}
+    else:
+        changes = {
+            'image_status': Recipe.IMAGE_READY,
+            'image_variants': variants,
+        }
+
+    user_id = recipes.values_list('user_id', flat=True).first()
+    if user_id is not None and recipes.update(**changes):
+        CollectionVersion.objects.bump(user_id)
+
+
+class ImagePipeline:
+    '''Run the image processing in a pool of worker threads, or right away
+    when eager'''
+
+    def __init__(self, workers=2, eager=False):
+        self.workers = workers
+        self.eager = eager
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, recipe_id, image_name):
+        '''Process the image of the recipe'''
+        if self.eager:
+            process_recipe_image(recipe_id, image_name)
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='recipe-images'
+                )
+        self._executor.submit(self._run, recipe_id, image_name)
+
+    def _run(self, recipe_id, image_name):
+        '''Process the image and release the connections of the worker'''
+        try:
+            process_recipe_image(recipe_id, image_name)
+        finally:
+            connections.close_all()
+
+
+_pipeline = None
+
+
+def get_image_pipeline():
+    '''Return the pipeline configured by the RECIPE_IMAGE_PIPELINE
+    setting'''
+    global _pipeline
+    if _pipeline is None:
+        options = getattr(settings, 'RECIPE_IMAGE_PIPELINE', {})
+        _pipeline = ImagePipeline(
+            workers=options.get('WORKERS', 2),
+            eager=options.get('EAGER', False),
+        )
+    return _pipeline
+
+
+@receiver(setting_changed)
+def reset_image_pipeline(setting, **kwargs):
+    '''Rebuild the pipeline when its settings change'''
+    global _pipeline
+    if setting == 'RECIPE_IMAGE_PIPELINE':
+        _pipeline = None
+
+
+def schedule_image_processing(recipe):
+    '''Process the image of the recipe once the upload is committed'''
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    transaction.on_commit(
+        lambda: get_image_pipeline().submit(recipe_id, image_name)
+    )
@@ -0,0 +1,159 @@
+import json
+
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+from .serializers import RecipeSerializer
+
+
+class RecipeImportSerializer(RecipeSerializer):
+    '''Validate an imported recipe like RecipeSerializer does, but leave the
+    existence check of its tags and ingredients to the importer, which runs
+    it once per batch'''
+
+    ingredients = serializers.ListField(child=serializers.IntegerField())
+    tags = serializers.ListField(child=serializers.IntegerField())
+
+
+class RecipeImporter:
+    '''Import recipes of a user from newline delimited JSON.
+
+    Lines are read lazily and handled in batches: every recipe of a batch is
+    validated, the tags and ingredients it references are checked with one
+    query per model, and the valid recipes are written with their m2m rows
+    by three bulk inserts, followed by updates of their search vectors and
+    of the collection version of the user, in a single transaction. Invalid
+    lines are reported with their line number and never block the valid
+    ones. Lines given as None, which were too long to read, are reported
+    as such'''
+    max_reported_errors = 1000
+    does_not_exist = PrimaryKeyRelatedField.default_error_messages[
+        'does_not_exist'
+    ]
+    relations = {
+        'tags': (Tag, Recipe.tags.through, 'tag_id'),
+        'ingredients': (Ingredient, Recipe.ingredients.through,
+                        'ingredient_id'),
+    }
+
+    def __init__(self, user, batch_size=1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        # Reused for every line, like ListSerializer reuses its child, so
+        # the fields are only built once
+        self.serializer = RecipeImportSerializer()
+
+    def run(self, lines):
+        '''Import every line and return the report'''
+        batch = []
+        for number, line in enumerate(lines, start=1):
+            if line is not None and not line.strip():
+                continue
+            batch.append((number, line))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report()
+
+    def report(self):
+        '''Return the number of created recipes and the line errors'''
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+    def import_batch(self, batch):
+        '''Validate and write a batch of (line number, line) pairs'''
+        valid = []
+        for number, line in batch:
+            if line is None:
+                self.add_error(number, {'non_field_errors': [
+                    'Line too long.'
+                ]})
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                self.add_error(number, {'non_field_errors': [
+                    f'Invalid JSON: {exc}'
+                ]})
+                continue
+
+            try:
+                valid.append((number, self.serializer.run_validation(data)))
+            except ValidationError as exc:
+                self.add_error(number, exc.detail)
+
+        valid = self.check_relations(valid)
+        if valid:
+            self.write(valid)
+
+    def check_relations(self, valid):
+        '''Return the recipes whose tags and ingredients all exist and
+        belong to the user, reporting the other ones'''
+        existing = {}
+        for field, (model, through, column) in self.relations.items():
+            ids = {pk for number, data in valid for pk in data[field]}
+            existing[field] = set(model.objects.filter(
+                user=self.user,
+                id__in=ids
+            ).values_list('id', flat=True))
+
+        checked = []
+        for number, data in valid:
+            errors = {}
+            for field in self.relations:
+                missing = [
+                    pk for pk in data[field] if pk not in existing[field]
+                ]
+                if missing:
+                    errors[field] = [
+                        self.does_not_exist.format(pk_value=pk)
+                        for pk in missing
+                    ]
+            if errors:
+                self.add_error(number, errors)
+            else:
+                checked.append((number, data))
+        return checked
+
+    @transaction.atomic
+    def write(self, valid):
+        '''Insert the recipes and their m2m rows'''
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=self.user,
+                **{
+                    key: value for key, value in data.items()
+                    if key not in self.relations
+                }
+            )
+            for number, data in valid
+        ])
+        for field, (model, through, column) in self.relations.items():
+            through.objects.bulk_create([
+                through(recipe_id=recipe.id, **{column: pk})
+                for recipe, (number, data) in zip(recipes, valid)
+                for pk in sorted(set(data[field]))
+            ])
+        update_search_vectors(Recipe.objects.filter(
+            pk__in=[recipe.id for recipe in recipes]
+        ))
+        CollectionVersion.objects.bump(self.user.id)
+        self.created += len(recipes)
+
+    def add_error(self, number, errors):
+        '''Record the errors of a line'''
+        self.failed += 1
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({'line': number, 'errors': errors})
@@ -0,0 +1,548 @@
+import datetime
+import http.client
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from contextlib import ExitStack
+from io import BytesIO
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.test import override_settings
+from django.test.client import BOUNDARY, encode_multipart, MULTIPART_CONTENT
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.seeding import Seeder
+
+BENCH_EMAIL_DOMAIN = 'bench-api.example.com'
+BENCH_NAME_PREFIX = 'Bench'
+# Scenarios answered by the response cache once warm, run without it unless
+# --response-cache asks to report them with it as well
+CACHED_SCENARIOS = ('recipe-list', 'recipe-list-filtered', 'recipe-detail')
+
+
+def image_content():
+    '''Return a small JPEG image'''
+    content = BytesIO()
+    Image.new('RGB', (64, 64), color=(200, 120, 40)).save(content, 'JPEG')
+    return content.getvalue()
+
+
+def summarize(latencies, queries, statuses, seconds):
+    '''Return the throughput, latency percentiles and queries per request
+    of a run'''
+    latencies = sorted(latency * 1000 for latency in latencies)
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    else:
+        cuts = latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': sum(
+            count for code, count in statuses.items()
+            if not 200 <= int(code) < 300
+        ),
+        'statuses': statuses,
+        'seconds': round(seconds, 3),
+        'throughput_rps': round(len(latencies) / seconds, 2),
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(cuts[49], 3),
+            'p90': round(cuts[89], 3),
+            'p95': round(cuts[94], 3),
+            'p99': round(cuts[98], 3),
+            'max': round(latencies[-1], 3),
+        },
+        # Unknown when the queries run in a server
+        'queries_per_request': {
+            'mean': round(statistics.fmean(queries), 2),
+            'max': max(queries),
+        } if queries else None,
+    }
+
+
+class TestClientTransport:
+    '''Send the requests of a client through the test client, in this
+    process. The clients share its GIL with the code under test'''
+
+    def __init__(self, token_key):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token_key}')
+
+    def send(self, method, path, data, data_format):
+        '''Make the request and return its status'''
+        # The test client skips what the handlers do at the start and end
+        # of a request with the connections
+        close_old_connections()
+        try:
+            if data is None:
+                response = getattr(self.client, method)(path)
+            else:
+                response = getattr(self.client, method)(
+                    path,
+                    data,
+                    format=data_format
+                )
+        finally:
+            close_old_connections()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    '''Send the requests of a client over a kept alive HTTP connection to a
+    running server, such as gunicorn started with gunicorn.conf.py'''
+
+    def __init__(self, base_url, token_key, timeout=60):
+        url = urlsplit(base_url)
+        if url.scheme == 'https':
+            connection_class = http.client.HTTPSConnection
+        else:
+            connection_class = http.client.HTTPConnection
+        self.connection = connection_class(url.netloc, timeout=timeout)
+        self.prefix = url.path.rstrip('/')
+        self.headers = {'Authorization': f'Token {token_key}'}
+
+    def send(self, method, path, data, data_format):
+        '''Make the request and return its status'''
+        headers = dict(self.headers)
+        body = None
+        if data_format == 'multipart':
+            body = encode_multipart(BOUNDARY, data)
+            headers['Content-Type'] = MULTIPART_CONTENT
+        elif data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        try:
+            return self.exchange(method, path, body, headers)
+        except (http.client.RemoteDisconnected, ConnectionResetError):
+            # Workers close kept alive connections when they restart
+            self.connection.close()
+            return self.exchange(method, path, body, headers)
+
+    def exchange(self, method, path, body, headers):
+        '''Send the request and read the whole response'''
+        self.connection.request(
+            method.upper(),
+            self.prefix + path,
+            body,
+            headers
+        )
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self.connection.close()
+
+
+class BenchClient:
+    '''A client of the API authenticated as a seeded user, building the
+    requests of every scenario with its own random generator'''
+
+    def __init__(self, user, index, seed, base_url=None):
+        self.user = user
+        self.index = index
+        self.rng = random.Random(seed * 1000 + index)
+        token, _ = Token.objects.get_or_create(user=user)
+        if base_url:
+            self.transport = HTTPTransport(base_url, token.key)
+        else:
+            self.transport = TestClientTransport(token.key)
+        self.tag_ids = list(Tag.objects.filter(
+            user=user
+        ).values_list('id', flat=True))
+        self.ingredient_ids = list(Ingredient.objects.filter(
+            user=user
+        ).values_list('id', flat=True))
+        self.recipe_ids = list(Recipe.objects.filter(
+            user=user
+        ).values_list('id', flat=True))
+        # The recipe updated and given images, restored after the run
+        self.recipe_id = self.recipe_ids[0]
+        self.created = 0
+
+    def next_name(self):
+        '''Return a name no other request of the run uses'''
+        self.created += 1
+        return f'{self.index}-{self.created}'
+
+    def sample(self, ids, size):
+        return self.rng.sample(ids, min(size, len(ids)))
+
+    def user_create(self, password):
+        return 'post', reverse('users:create'), {
+            'email': f'user{self.next_name()}@{BENCH_EMAIL_DOMAIN}',
+            'password': password,
+            'name': 'Bench user',
+        }, 'json'
+
+    def token_obtain(self, password):
+        return 'post', reverse('users:token'), {
+            'email': self.user.email,
+            'password': password,
+        }, 'json'
+
+    def tag_list(self, password):
+        return 'get', reverse('recipe:tag-list'), None, None
+
+    def tag_create(self, password):
+        return 'post', reverse('recipe:tag-list'), {
+            'name': f'{BENCH_NAME_PREFIX} {self.next_name()}',
+        }, 'json'
+
+    def ingredient_list(self, password):
+        return 'get', reverse('recipe:ingredient-list'), None, None
+
+    def ingredient_create(self, password):
+        return 'post', reverse('recipe:ingredient-list'), {
+            'name': f'{BENCH_NAME_PREFIX} {self.next_name()}',
+        }, 'json'
+
+    def recipe_list(self, password):
+        return 'get', reverse('recipe:recipe-list'), None, None
+
+    def recipe_list_filtered(self, password):
+        tags = ','.join(map(str, self.sample(self.tag_ids, 2)))
+        ingredients = ','.join(map(str, self.sample(self.ingredient_ids, 2)))
+        return 'get', (
+            f'{reverse("recipe:recipe-list")}'
+            f'?tags={tags}&ingredients={ingredients}'
+        ), None, None
+
+    def recipe_detail(self, password):
+        recipe_id = self.rng.choice(self.recipe_ids)
+        return 'get', reverse(
+            'recipe:recipe-detail',
+            args=[recipe_id]
+        ), None, None
+
+    def recipe_update(self, password):
+        return 'patch', reverse(
+            'recipe:recipe-detail',
+            args=[self.recipe_id]
+        ), {
+            'tags': self.sample(self.tag_ids, self.rng.randint(0, 3)),
+            'ingredients': self.sample(
+                self.ingredient_ids,
+                self.rng.randint(1, 6)
+            ),
+        }, 'json'
+
+    def image_upload(self, password):
+        image = BytesIO(IMAGE)
+        image.name = 'bench.jpg'
+        return 'post', reverse(
+            'recipe:recipe-upload-image',
+            args=[self.recipe_id]
+        ), {'image': image}, 'multipart'
+
+
+IMAGE = image_content()
+
+# Scenario names and the BenchClient methods building their requests
+SCENARIOS = {
+    'user-create': BenchClient.user_create,
+    'token-obtain': BenchClient.token_obtain,
+    'tag-list': BenchClient.tag_list,
+    'tag-create': BenchClient.tag_create,
+    'ingredient-list': BenchClient.ingredient_list,
+    'ingredient-create': BenchClient.ingredient_create,
+    'recipe-list': BenchClient.recipe_list,
+    'recipe-list-filtered': BenchClient.recipe_list_filtered,
+    'recipe-detail': BenchClient.recipe_detail,
+    'recipe-update': BenchClient.recipe_update,
+    'image-upload': BenchClient.image_upload,
+}
+
+
+class Command(BaseCommand):
+    """ Command benchmarking the API endpoints against the users generated by
+    seed_data, with concurrent clients running on threads. Prints a JSON
+    report with the throughput, latency percentiles and queries per request
+    of every endpoint, to compare between commits. Rows and tokens created
+    by the run are deleted and the updated recipes restored afterwards.
+
+    By default the requests go through the test client in this process,
+    where the clients compete with the views for the GIL. With --base-url
+    they are sent over HTTP to a running server, such as gunicorn with its
+    uvicorn workers, and the queries are not counted. The cached scenarios
+    bypass the response cache, with a unique query parameter for a server,
+    unless --response-cache also reports them with it """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=4)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Requests of each client to every endpoint'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Untimed requests of each client to every endpoint'
+        )
+        parser.add_argument(
+            '--endpoints',
+            nargs='+',
+            choices=list(SCENARIOS),
+            default=list(SCENARIOS),
+            metavar='ENDPOINT',
+            help=f'Endpoints to benchmark: {", ".join(SCENARIOS)}'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Email prefix of the seeded users'
+        )
+        parser.add_argument(
+            '--password',
+            default='seedpassword',
+            help='Password of the seeded users'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--base-url',
+            help='URL of a running server to send the requests to, such as '
+                 'http://localhost:8000, instead of the test client'
+        )
+        parser.add_argument(
+            '--response-cache',
+            action='store_true',
+            help=f'Also report {", ".join(CACHED_SCENARIOS)} served by the '
+                 f'response cache, as ENDPOINT-cached'
+        )
+        parser.add_argument('--output', help='File to write the report to')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError('--clients and --requests must be positive')
+        users = list(Seeder(prefix=options['prefix']).seeded_users().filter(
+            recipe__isnull=False
+        ).distinct().order_by('id')[:options['clients']])
+        if not users:
+            raise CommandError(
+                f'No users with recipes and the prefix {options["prefix"]}, '
+                f'run seed_data first'
+            )
+
+        # Tokens created for the clients are deleted afterwards
+        token_user_ids = set(Token.objects.filter(
+            user__in=users
+        ).values_list('user_id', flat=True))
+        clients = [
+            BenchClient(
+                users[index % len(users)],
+                index,
+                options['seed'],
+                options['base_url']
+            )
+            for index in range(options['clients'])
+        ]
+        saved = self.save_recipes(clients)
+        runs = []
+        for name in options['endpoints']:
+            runs.append((name, name, False))
+            if options['response_cache'] and name in CACHED_SCENARIOS:
+                runs.append((f'{name}-cached', name, True))
+        results = {}
+        try:
+            for label, name, cached in runs:
+                self.stderr.write(f'Benchmarking {label}...')
+                with override_settings(RECIPE_RESPONSE_CACHE={
+                    **settings.RECIPE_RESPONSE_CACHE,
+                    'ENABLED': cached,
+                }):
+                    results[label] = self.run(
+                        SCENARIOS[name],
+                        clients,
+                        dict(
+                            options,
+                            bypass_cache=bool(
+                                options['base_url'] and
+                                name in CACHED_SCENARIOS and not cached
+                            )
+                        )
+                    )
+        finally:
+            for client in clients:
+                client.transport.close()
+            self.clean_up(clients, saved, token_user_ids)
+
+        report = {
+            'revision': self.revision(),
+            'started_at': datetime.datetime.now(
+                datetime.timezone.utc
+            ).isoformat(timespec='seconds'),
+            'django': django.get_version(),
+            'database': connections['default'].vendor,
+            'options': {
+                key: options[key]
+                for key in (
+                    'clients', 'requests', 'warmup', 'seed', 'base_url',
+                    'response_cache',
+                )
+            },
+            'dataset': {
+                'users': len(users),
+                'recipes': Recipe.objects.filter(user__in=users).count(),
+            },
+            'endpoints': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def run(self, scenario, clients, options):
+        '''Run the scenario with every client on its own thread and return
+        its summary'''
+        latencies = []
+        queries = []
+        statuses = {}
+        failures = []
+        lock = threading.Lock()
+        ready = threading.Barrier(len(clients) + 1)
+        counting = not options['base_url']
+
+        def work(client):
+            timings = []
+            counts = []
+            codes = []
+            count = [0]
+
+            def count_query(execute, sql, params, many, context):
+                count[0] += 1
+                return execute(sql, params, many, context)
+
+            try:
+                with ExitStack() as stack:
+                    # The queries of a server run in its own processes
+                    for alias in connections if counting else []:
+                        stack.enter_context(
+                            connections[alias].execute_wrapper(count_query)
+                        )
+                    for _ in range(options['warmup']):
+                        self.request(client, scenario, options)
+                    ready.wait()
+                    for _ in range(options['requests']):
+                        count[0] = 0
+                        start = time.perf_counter()
+                        status = self.request(client, scenario, options)
+                        timings.append(time.perf_counter() - start)
+                        if counting:
+                            counts.append(count[0])
+                        codes.append(str(status))
+            except Exception as exc:
+                failures.append(exc)
+                ready.abort()
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(timings)
+                queries.extend(counts)
+                for code in codes:
+                    statuses[code] = statuses.get(code, 0) + 1
+
+        threads = [
+            threading.Thread(target=work, args=[client])
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        # Time the run from the moment every client has warmed up
+        try:
+            ready.wait()
+        except threading.BrokenBarrierError:
+            pass
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        if failures:
+            raise CommandError(f'A client failed: {failures[0]!r}')
+        return summarize(
+            latencies,
+            queries,
+            statuses,
+            time.perf_counter() - start
+        )
+
+    def request(self, client, scenario, options):
+        '''Make a request of the scenario and return its status'''
+        method, path, data, data_format = scenario(
+            client,
+            options['password']
+        )
+        if options['bypass_cache']:
+            # The response cache of a server is keyed on the query string
+            path += f'{"&" if "?" in path else "?"}bench={client.next_name()}'
+        return client.transport.send(method, path, data, data_format)
+
+    def save_recipes(self, clients):
+        '''Return the relations and images of the recipes the run changes'''
+        recipe_ids = {client.recipe_id for client in clients}
+        return {
+            recipe.id: (
+                [tag.id for tag in recipe.tags.all()],
+                [ingredient.id for ingredient in recipe.ingredients.all()],
+                {
+                    'image': recipe.image.name,
+                    'image_status': recipe.image_status,
+                    'image_variants': recipe.image_variants,
+                },
+            )
+            for recipe in Recipe.objects.filter(
+                id__in=recipe_ids
+            ).prefetch_related('tags', 'ingredients')
+        }
+
+    def clean_up(self, clients, saved, token_user_ids):
+        '''Delete the rows and tokens created by the run and restore the
+        recipes it changed. Uploaded images are left to gc_recipe_images'''
+        get_user_model().objects.filter(
+            email__endswith=f'@{BENCH_EMAIL_DOMAIN}'
+        ).delete()
+        users = {client.user for client in clients}
+        Token.objects.filter(user__in=users).exclude(
+            user_id__in=token_user_ids
+        ).delete()
+        for model in (Tag, Ingredient):
+            model.objects.filter(
+                user__in=users,
+                name__startswith=f'{BENCH_NAME_PREFIX} '
+            ).delete()
+        for recipe in Recipe.objects.filter(id__in=saved):
+            tags, ingredients, image = saved[recipe.id]
+            recipe.tags.set(tags)
+            recipe.ingredients.set(ingredients)
+            Recipe.objects.filter(id=recipe.id).update(**image)
+
+    def revision(self):
+        '''Return the git commit of the code, if known'''
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,226 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.models import Ingredient, Recipe, Tag
+
+BENCH_EMAIL = 'bench-async@example.com'
+
+
+class Command(BaseCommand):
+    """ Command comparing the throughput of the sync endpoints behind a pool
+    of WSGI worker threads with the async endpoints behind the ASGI handler,
+    when every client takes a while to read its response. The requests run
+    on other threads, so the seeded data is committed and deleted
+    afterwards """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Threads serving the WSGI requests'
+        )
+        parser.add_argument(
+            '--client-delay',
+            type=float,
+            default=0.25,
+            help='Seconds each client takes to read a response'
+        )
+
+    def handle(self, *args, **options):
+        get_user_model().objects.filter(email=BENCH_EMAIL).delete()
+        self.stdout.write('Seeding dataset...')
+        user = self.seed(options)
+        headers = {
+            'authorization': f'Token {Token.objects.create(user=user).key}'
+        }
+        try:
+            self.stdout.write(
+                f'{options["requests"]} requests, {options["clients"]} '
+                f'clients reading for {options["client_delay"]}s, '
+                f'{options["workers"]} WSGI threads'
+            )
+            for label, sync_path, async_path in self.endpoints(user):
+                self.stdout.write(f'\n{label}')
+                self.report('sync WSGI', self.run_wsgi(
+                    sync_path,
+                    headers,
+                    options
+                ))
+                self.report('sync ASGI', asyncio.run(self.run_asgi(
+                    sync_path,
+                    headers,
+                    options
+                )))
+                self.report('async ASGI', asyncio.run(self.run_asgi(
+                    async_path,
+                    headers,
+                    options
+                )))
+        finally:
+            user.delete()
+
+    def seed(self, options):
+        '''Create a user with tags, ingredients and recipes using them'''
+        user = get_user_model().objects.create_user(
+            email=BENCH_EMAIL,
+            password=None
+        )
+        tags = Tag.objects.bulk_create([
+            Tag(user=user, name=f'Tag {index}') for index in range(20)
+        ])
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=f'Ingredient {index}')
+            for index in range(20)
+        ])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {index}',
+                time_minutes=30,
+                price=10
+            )
+            for index in range(options['recipes'])
+        ])
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes
+            for tag in tags[:3]
+        ])
+        Recipe.ingredients.through.objects.bulk_create([
+            Recipe.ingredients.through(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient.id
+            )
+            for recipe in recipes
+            for ingredient in ingredients[:3]
+        ])
+        return user
+
+    def endpoints(self, user):
+        '''Return the label and the sync and async paths of each endpoint'''
+        recipe = Recipe.objects.filter(user=user).first()
+        return [
+            (
+                'recipes',
+                reverse('recipe:recipe-list'),
+                reverse('recipe-async:recipe-list'),
+            ),
+            (
+                'recipe detail',
+                reverse('recipe:recipe-detail', args=[recipe.id]),
+                reverse('recipe-async:recipe-detail', args=[recipe.id]),
+            ),
+            (
+                'tags',
+                reverse('recipe:tag-list'),
+                reverse('recipe-async:tag-list'),
+            ),
+            ('me', reverse('users:me'), reverse('users-async:me')),
+        ]
+
+    def run_wsgi(self, path, headers, options):
+        '''Return the wall time and latencies of the requests served by a
+        pool of threads, each held while its client reads'''
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        extra = {
+            f'HTTP_{name.upper()}': value for name, value in headers.items()
+        }
+
+        def request(_):
+            start = time.perf_counter()
+            environ = factory.get(path, **extra).environ
+            statuses = []
+            response = handler(
+                environ,
+                lambda status, headers, exc_info=None: statuses.append(status)
+            )
+            b''.join(response)
+            response.close()
+            time.sleep(options['client_delay'])
+            self.check_status(statuses[0])
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['workers']) as executor:
+            latencies = list(executor.map(request, range(options['requests'])))
+        return time.perf_counter() - start, latencies
+
+    async def run_asgi(self, path, headers, options):
+        '''Return the wall time and latencies of the requests served by the
+        ASGI handler, whose clients read on the event loop'''
+        handler = ASGIHandler()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')] + [
+                (name.encode(), value.encode())
+                for name, value in headers.items()
+            ],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 0),
+        }
+        pending = iter(range(options['requests']))
+        latencies = []
+
+        async def request():
+            start = time.perf_counter()
+            body_sent = asyncio.Event()
+
+            async def receive():
+                if body_sent.is_set():
+                    # Nothing else comes from a client until it disconnects
+                    await asyncio.Future()
+                body_sent.set()
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    self.check_status(message['status'])
+                elif not message.get('more_body'):
+                    await asyncio.sleep(options['client_delay'])
+
+            await handler(dict(scope), receive, send)
+            latencies.append(time.perf_counter() - start)
+
+        async def client():
+            for _ in pending:
+                await request()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(options['clients'])])
+        return time.perf_counter() - start, latencies
+
+    def check_status(self, status):
+        '''Fail on responses other than 200 OK'''
+        if not str(status).startswith('200'):
+            raise RuntimeError(f'Unexpected response status {status}')
+
+    def report(self, label, result):
+        '''Print the throughput and latencies of a run'''
+        elapsed, latencies = result
+        latencies = sorted(latency * 1000 for latency in latencies)
+        self.stdout.write(
+            f'  {label:<10} {len(latencies) / elapsed:8.1f} req/s  '
+            f'median {statistics.median(latencies):8.2f} ms  '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1]:8.2f} ms'
+        )
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import QueryDict
+
+from core.models import Ingredient
+from recipe.filters import NameAutocomplete
+
+# Syllables of the seeded names, varied like the trigrams of real names
+SYLLABLES = [
+    consonant + vowel + coda
+    for consonant in 'bcdfghjklmnprstvwz'
+    for vowel in 'aeiou'
+    for coda in ['', 'l', 'n', 'r', 's']
+]
+
+
+class Command(BaseCommand):
+    """ Command timing the ingredient autocomplete of an account with many
+    names on a seeded dataset, which is rolled back afterwards """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=100000)
+        parser.add_argument('--other-users', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.stdout.write('Seeding dataset...')
+            users = self.seed(rng, options)
+            names = list(Ingredient.objects.filter(
+                user=users[0]
+            ).values_list('name', flat=True)[:1000])
+            for label, texts in self.scenarios(rng, names):
+                self.report(label, users[0], texts, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, rng, options):
+        '''Create users owning the given number of ingredients each'''
+        users = [
+            get_user_model().objects.create_user(
+                email=f'bench-autocomplete-{index}@example.com',
+                password=None
+            )
+            for index in range(options['other_users'] + 1)
+        ]
+        for user in users:
+            Ingredient.objects.bulk_create([
+                Ingredient(user=user, name=self.make_name(rng))
+                for _ in range(options['names'])
+            ], batch_size=5000)
+        with connection.cursor() as cursor:
+            # Merge the entries autovacuum would have moved out of the
+            # pending list of the trigram index by now
+            cursor.execute(
+                "SELECT gin_clean_pending_list('core_ingredient_trgm_idx')"
+            )
+            cursor.execute('ANALYZE')
+        return users
+
+    def make_name(self, rng):
+        '''Return a random name of one to three words'''
+        return ' '.join(
+            ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 3))).capitalize()
+            for _ in range(rng.randint(1, 3))
+        )
+
+    def scenarios(self, rng, names):
+        '''Return typed texts to time: prefixes, and prefixes or whole names
+        with a typo'''
+        def typo(name):
+            index = rng.randrange(1, len(name))
+            return name[:index] + name[index + 1:]
+
+        return [
+            ('1 letter', [rng.choice(names)[:1] for _ in range(50)]),
+            ('3 letters', [rng.choice(names)[:3] for _ in range(50)]),
+            ('6 letters', [rng.choice(names)[:6] for _ in range(50)]),
+            ('6 + typo', [typo(rng.choice(names)[:7]) for _ in range(50)]),
+            ('name typo', [typo(rng.choice(names)) for _ in range(50)]),
+        ]
+
+    def report(self, label, user, texts, repeat):
+        '''Print the latency percentiles of the autocomplete queries'''
+        queryset = Ingredient.objects.filter(user=user)
+        timings = []
+        for index in range(repeat):
+            query_params = QueryDict(mutable=True)
+            query_params['q'] = texts[index % len(texts)]
+            start = time.perf_counter()
+            NameAutocomplete(query_params).suggest(queryset)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{label:<10} median {statistics.median(timings):7.2f} ms  '
+            f'p99 {timings[int(len(timings) * 0.99) - 1]:7.2f} ms'
+        )
@@ -0,0 +1,137 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.db.backends.postgresql.base import close_pools
+from core.models import Ingredient, Recipe, Tag
+
+BENCH_EMAIL = 'bench-connections@example.com'
+
+
+class Command(BaseCommand):
+    """ Command timing the recipe endpoints with a connection per request,
+    persistent connections and the connection pool, with and without health
+    checks. The requests run on other threads, so the seeded data is
+    committed and deleted afterwards """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--recipes', type=int, default=50)
+
+    def handle(self, *args, **options):
+        get_user_model().objects.filter(email=BENCH_EMAIL).delete()
+        user = self.seed(options)
+        recipe = Recipe.objects.filter(user=user).first()
+        urls = [
+            reverse('recipe:recipe-list'),
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+        ]
+        settings_dict = connections.settings['default']
+        saved = {
+            key: settings_dict.get(key)
+            for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'POOL')
+        }
+        pool = {'MAX_SIZE': options['threads'], 'TIMEOUT': 10}
+        configs = [
+            ('connect per request', 0, False, None),
+            ('persistent', 600, False, None),
+            ('persistent + checks', 600, True, None),
+            ('pool', 0, False, pool),
+            ('pool + checks', 0, True, pool),
+        ]
+        self.stdout.write(
+            f'{options["threads"]} threads, {options["requests"]} requests '
+            f'each, response cache off'
+        )
+        try:
+            # Every thread builds its connection from this same dict
+            with override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': False}):
+                for label, max_age, checks, pool_options in configs:
+                    settings_dict.update(
+                        CONN_MAX_AGE=max_age,
+                        CONN_HEALTH_CHECKS=checks,
+                        POOL=pool_options
+                    )
+                    self.report(label, self.run(user, urls, options))
+                    close_pools()
+        finally:
+            settings_dict.update(saved)
+            connections['default'].close()
+            user.delete()
+
+    def seed(self, options):
+        '''Create a user with recipes using a few tags and ingredients'''
+        user = get_user_model().objects.create_user(
+            email=BENCH_EMAIL,
+            password=None
+        )
+        tags = Tag.objects.bulk_create([
+            Tag(user=user, name=f'Tag {index}') for index in range(5)
+        ])
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=f'Ingredient {index}')
+            for index in range(5)
+        ])
+        for index in range(options['recipes']):
+            recipe = Recipe.objects.create(
+                user=user,
+                title=f'Recipe {index}',
+                time_minutes=30,
+                price=10
+            )
+            recipe.tags.add(*tags[:2])
+            recipe.ingredients.add(*ingredients[:2])
+        return user
+
+    def run(self, user, urls, options):
+        '''Return the latencies of the requests of every thread'''
+        latencies = []
+        lock = threading.Lock()
+
+        def work():
+            client = APIClient()
+            client.force_authenticate(user)
+            timings = []
+            try:
+                for index in range(options['requests']):
+                    start = time.perf_counter()
+                    # The test client skips what the handlers do at the
+                    # start and end of a request with the connections
+                    close_old_connections()
+                    response = client.get(urls[index % len(urls)])
+                    close_old_connections()
+                    timings.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        raise RuntimeError(
+                            f'Unexpected response status '
+                            f'{response.status_code}'
+                        )
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(timings)
+
+        threads = [
+            threading.Thread(target=work) for _ in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies
+
+    def report(self, label, latencies):
+        '''Print the latency percentiles of a run'''
+        latencies = sorted(latency * 1000 for latency in latencies)
+        self.stdout.write(
+            f'{label:<20} median {statistics.median(latencies):7.2f} ms  '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1]:7.2f} ms'
+        )
@@ -0,0 +1,101 @@
+import io
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+from core.seeding import ADJECTIVES, DISHES, INGREDIENTS, TAGS
+
+
+class Command(BaseCommand):
+    """ Command comparing JSONRenderer and JSONParser with their orjson
+    counterparts on pages of recipes shaped like the API responses """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 10000],
+            help='Recipes per payload'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed, both sides use the json module'
+            ))
+        rng = random.Random(options['seed'])
+        for count in options['recipes']:
+            data = self.payload(rng, count)
+            content = JSONRenderer().render(data)
+            self.stdout.write(
+                f'\n{count} recipes, {len(content) / 1024:.0f} KiB'
+            )
+            self.compare(
+                'render',
+                lambda renderer: renderer.render(data),
+                JSONRenderer(),
+                FastJSONRenderer(),
+                options['repeat']
+            )
+            self.compare(
+                'parse',
+                lambda parser: parser.parse(io.BytesIO(content)),
+                JSONParser(),
+                FastJSONParser(),
+                options['repeat']
+            )
+
+    def payload(self, rng, count):
+        '''Return a page of recipes with their tags and ingredients, like
+        the recipe list returns with details'''
+        def names(choices, size):
+            return [
+                {'id': rng.randint(1, 10 ** 6), 'name': name}
+                for name in rng.sample(choices, size)
+            ]
+
+        return {
+            'next': 'http://localhost/api/recipe/recipes/?cursor=cD0xMjM0',
+            'previous': None,
+            'results': [
+                {
+                    'id': index + 1,
+                    'title': f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+                    'time_minutes': rng.randint(5, 240),
+                    'price': f'{rng.randint(100, 99999) / 100:.2f}',
+                    'link': f'https://recipes.example.com/{index}',
+                    'ingredients': names(INGREDIENTS, rng.randint(1, 8)),
+                    'tags': names(TAGS, rng.randint(0, 4)),
+                    'image_status': 'ready',
+                    'image_variants': {
+                        'thumbnail': f'http://localhost/media/{index}.webp',
+                    },
+                }
+                for index in range(count)
+            ],
+        }
+
+    def compare(self, label, run, baseline, fast, repeat):
+        '''Print the median times of the baseline and the fast class'''
+        times = {}
+        for name, instance in [('json', baseline), ('orjson', fast)]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run(instance)
+                timings.append(time.perf_counter() - start)
+            times[name] = statistics.median(timings) * 1000
+        self.stdout.write(
+            f'  {label:<7} json {times["json"]:8.2f} ms  '
+            f'orjson {times["orjson"]:8.2f} ms  '
+            f'{times["json"] / times["orjson"]:5.1f}x'
+        )
@@ -0,0 +1,136 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import QueryDict
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.filters import RecipeFilter
+
+
+class Command(BaseCommand):
+    """ Command comparing the recipe filters with the former m2m joins on a
+    seeded dataset, which is rolled back afterwards """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--per-recipe', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.stdout.write('Seeding dataset...')
+            user = self.seed(rng, options)
+            for label, params in self.scenarios(rng, user):
+                self.compare(label, user, params, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, rng, options):
+        '''Create a user with tags, ingredients and recipes'''
+        user = get_user_model().objects.create_user(
+            email='bench-filters@example.com',
+            password=None
+        )
+        tags = Tag.objects.bulk_create([
+            Tag(user=user, name=f'Tag {index}')
+            for index in range(options['tags'])
+        ])
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=f'Ingredient {index}')
+            for index in range(options['ingredients'])
+        ])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {index}',
+                time_minutes=rng.randint(5, 240),
+                price=rng.randint(100, 99999) / 100
+            )
+            for index in range(options['recipes'])
+        ], batch_size=5000)
+
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe in recipes:
+            for tag in rng.sample(tags, min(options['per_recipe'], len(tags))):
+                recipe_tags.append(Recipe.tags.through(
+                    recipe_id=recipe.id,
+                    tag_id=tag.id
+                ))
+            for ingredient in rng.sample(
+                ingredients,
+                min(options['per_recipe'], len(ingredients))
+            ):
+                recipe_ingredients.append(Recipe.ingredients.through(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient.id
+                ))
+        Recipe.tags.through.objects.bulk_create(recipe_tags, batch_size=5000)
+        Recipe.ingredients.through.objects.bulk_create(
+            recipe_ingredients,
+            batch_size=5000
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return user
+
+    def scenarios(self, rng, user):
+        '''Return the query parameters to compare'''
+        tag_ids = list(user.tag_set.values_list('id', flat=True))
+        ingredient_ids = list(user.ingredient_set.values_list('id', flat=True))
+        tags = ','.join(str(pk) for pk in rng.sample(tag_ids, 3))
+        ingredients = ','.join(str(pk) for pk in rng.sample(ingredient_ids, 3))
+        return [
+            ('tags any', {'tags': tags}),
+            ('ingredients any', {'ingredients': ingredients}),
+            ('tags + ingredients any', {
+                'tags': tags,
+                'ingredients': ingredients,
+            }),
+            ('tags all', {'tags': tags, 'match': 'all'}),
+        ]
+
+    def compare(self, label, user, params, repeat):
+        '''Time both approaches for the parameters and print the results'''
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        joined = queryset
+        if 'match' not in params:
+            if 'tags' in params:
+                joined = joined.filter(
+                    tags__id__in=params['tags'].split(',')
+                )
+            if 'ingredients' in params:
+                joined = joined.filter(
+                    ingredients__id__in=params['ingredients'].split(',')
+                )
+        query_params = QueryDict(mutable=True)
+        query_params.update(params)
+        filtered = RecipeFilter(query_params).filter_queryset(queryset)
+
+        self.stdout.write(f'\n{label}')
+        if joined is not queryset:
+            self.report('joins', joined, repeat)
+            self.report('distinct', joined.distinct(), repeat)
+        self.report('subqueries', filtered, repeat)
+
+    def report(self, name, queryset, repeat):
+        '''Print the timings and row counts of a queryset'''
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ids = list(queryset.values_list('id', flat=True))
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'  {name:<11} median {statistics.median(timings):8.2f} ms  '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms  '
+            f'rows {len(ids):>7}  distinct {len(set(ids)):>7}'
+        )
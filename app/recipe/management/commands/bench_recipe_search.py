@@ -0,0 +1,126 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.http import QueryDict
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+from recipe.filters import RecipeFilter
+
+WORDS = [
+    'apple', 'bacon', 'basil', 'bean', 'beef', 'bread', 'butter', 'cake',
+    'carrot', 'cheese', 'chicken', 'chili', 'chocolate', 'coconut', 'corn',
+    'cream', 'curry', 'egg', 'fish', 'garlic', 'ginger', 'honey', 'lemon',
+    'lentil', 'lime', 'mango', 'mint', 'mushroom', 'noodle', 'onion',
+    'orange', 'pasta', 'peanut', 'pepper', 'pork', 'potato', 'pumpkin',
+    'rice', 'salad', 'salmon', 'sauce', 'soup', 'spinach', 'stew', 'sugar',
+    'tofu', 'tomato', 'tuna', 'vanilla', 'yogurt',
+]
+STYLES = [
+    'baked', 'braised', 'creamy', 'crispy', 'fried', 'grilled', 'quick',
+    'roasted', 'smoked', 'spicy', 'steamed', 'sweet',
+]
+
+
+class Command(BaseCommand):
+    """ Command comparing the recipe full-text search with icontains lookups
+    on a seeded dataset, which is rolled back afterwards """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.stdout.write('Seeding dataset...')
+            user = self.seed(rng, options)
+            for terms in ['curry', 'spicy chicken', 'roasted -potato']:
+                self.compare(terms, user, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, rng, options):
+        '''Create a user with tags, ingredients and titled recipes'''
+        user = get_user_model().objects.create_user(
+            email='bench-search@example.com',
+            password=None
+        )
+        tags = Tag.objects.bulk_create([
+            Tag(user=user, name=style.title()) for style in STYLES
+        ])
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=word.title()) for word in WORDS
+        ])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=' '.join([
+                    rng.choice(STYLES),
+                    *rng.sample(WORDS, 2),
+                ]).capitalize(),
+                time_minutes=rng.randint(5, 240),
+                price=rng.randint(100, 99999) / 100
+            )
+            for _ in range(options['recipes'])
+        ], batch_size=5000)
+
+        per_recipe = options['per_recipe']
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes
+            for tag in rng.sample(tags, per_recipe)
+        ], batch_size=5000)
+        Recipe.ingredients.through.objects.bulk_create([
+            Recipe.ingredients.through(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient.id
+            )
+            for recipe in recipes
+            for ingredient in rng.sample(ingredients, per_recipe)
+        ], batch_size=5000)
+        update_search_vectors(Recipe.objects.filter(user=user))
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return user
+
+    def compare(self, terms, user, repeat):
+        '''Time both approaches for the terms and print the results'''
+        queryset = Recipe.objects.filter(user=user)
+        words = [word for word in terms.split() if not word.startswith('-')]
+        naive = queryset
+        for word in words:
+            naive = naive.filter(
+                Q(title__icontains=word) |
+                Q(tags__name__icontains=word) |
+                Q(ingredients__name__icontains=word)
+            )
+        query_params = QueryDict(mutable=True)
+        query_params['search'] = terms
+        searched = RecipeFilter(query_params).filter_queryset(queryset)
+
+        self.stdout.write(f'\n{terms}')
+        self.report('icontains', naive.distinct().order_by('-id'), repeat)
+        self.report('search', searched.order_by('-rank', '-id'), repeat)
+
+    def report(self, name, queryset, repeat):
+        '''Print the timings of the first page of a queryset'''
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ids = list(queryset.values_list('id', flat=True)[:50])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        count = queryset.count()
+        self.stdout.write(
+            f'  {name:<10} median {statistics.median(timings):8.2f} ms  '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms  '
+            f'page {len(ids):>3}  matches {count:>7}'
+        )
@@ -0,0 +1,109 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.seeding import Seeder
+from recipe.readers import ValuesReader
+from recipe.serializers import RecipeSerializer, TagSerializer
+
+
+class Command(BaseCommand):
+    """ Command comparing the list endpoints built by the serializers with
+    the ones built from values() rows, on a dataset generated like seed_data
+    does, which is rolled back afterwards """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write('Seeding dataset...')
+            seeder = Seeder(
+                users=1,
+                tags=200,
+                ingredients=200,
+                recipes=options['recipes'],
+                tags_per_recipe=3,
+                ingredients_per_recipe=8,
+                seed=options['seed'],
+                prefix='bench-values',
+                search_vectors=False
+            )
+            seeder.run()
+            user = seeder.seeded_users().get()
+            size = options['page_size']
+            recipes = Recipe.objects.filter(user=user).order_by('-id')[:size]
+            tags = Tag.objects.filter(user=user).order_by('-name', '-id')
+            recipe_reader = ValuesReader(RecipeSerializer())
+            tag_reader = ValuesReader(TagSerializer())
+
+            self.stdout.write(f'\nSerializing {size} recipes')
+            self.compare(
+                lambda: RecipeSerializer(
+                    recipes.prefetch_related('tags', 'ingredients'),
+                    many=True
+                ).data,
+                lambda: recipe_reader.to_representation(
+                    recipe_reader.get_queryset(recipes)
+                ),
+                size,
+                options['repeat']
+            )
+            self.stdout.write(f'\nSerializing {tags.count()} tags')
+            self.compare(
+                lambda: TagSerializer(tags, many=True).data,
+                lambda: tag_reader.to_representation(
+                    tag_reader.get_queryset(tags)
+                ),
+                tags.count(),
+                options['repeat']
+            )
+
+            client = APIClient()
+            client.force_authenticate(user)
+            for label, url in [
+                ('recipe list', reverse('recipe:recipe-list')),
+                ('tag list', reverse('recipe:tag-list')),
+            ]:
+                self.stdout.write(f'\nGET {label}, page size {size}')
+                self.compare(
+                    lambda: client.get(url, {'page_size': size}),
+                    lambda: client.get(url, {'page_size': size}),
+                    None,
+                    options['repeat'],
+                    settings=True
+                )
+            transaction.set_rollback(True)
+
+    def compare(self, serialized, values, rows, repeat, settings=False):
+        '''Time both implementations and print the results. With settings,
+        the same call is timed with RECIPE_VALUES_LISTS off and on'''
+        for name, run, values_lists in [
+            ('serializers', serialized, False),
+            ('values', values, True),
+        ]:
+            overrides = {'RECIPE_RESPONSE_CACHE': {'ENABLED': False}}
+            if settings:
+                overrides['RECIPE_VALUES_LISTS'] = values_lists
+            with override_settings(**overrides):
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    run()
+                    timings.append(time.perf_counter() - start)
+            median = statistics.median(timings)
+            line = f'  {name:<12} median {median * 1000:8.2f} ms'
+            if rows:
+                line += f'  {rows / median:10.0f} rows/s'
+            else:
+                line += f'  {1 / median:8.1f} requests/s'
+            self.stdout.write(line)
@@ -0,0 +1,204 @@
+import json
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.db.routers import replica_aliases
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """ Command requesting each API endpoint as a user and running EXPLAIN
+    ANALYZE on every query it makes, to catch plans that regress to
+    sequential scans """
+
+    help = 'Explain the queries of the API endpoints for a user'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user whose data is queried'
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Report sequential scans on tables with at least these rows'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Exit with an error if a sequential scan is reported'
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the whole plan of every query'
+        )
+
+    def handle(self, *args, **options):
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get(email=options['user'])
+        except user_model.DoesNotExist:
+            raise CommandError(f'No user with the email {options["user"]}')
+
+        client = APIClient()
+        client.force_authenticate(user)
+        table_rows = self.table_rows()
+        problems = []
+        # Responses served from the cache would run no query to explain
+        with transaction.atomic(), override_settings(
+            RECIPE_RESPONSE_CACHE={'ENABLED': False}
+        ):
+            for label, url, params in self.endpoints(user):
+                problems += self.explain_endpoint(
+                    client,
+                    label,
+                    url,
+                    params,
+                    table_rows,
+                    options
+                )
+            transaction.set_rollback(True)
+
+        if problems:
+            self.stdout.write(self.style.WARNING(
+                f'\n{len(problems)} sequential scans on large tables:'
+            ))
+            for problem in problems:
+                self.stdout.write(f'  {problem}')
+            if options['check']:
+                raise CommandError('Sequential scans found')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                '\nNo sequential scans on large tables'
+            ))
+
+    def endpoints(self, user):
+        '''Return the label, url and query parameters of each request'''
+        tag = user.tag_set.order_by('id').first()
+        tag_ids = list(user.tag_set.values_list('id', flat=True)[:2])
+        ingredient = user.ingredient_set.order_by('id').first()
+        ingredient_ids = list(
+            user.ingredient_set.values_list('id', flat=True)[:2]
+        )
+        recipe = Recipe.objects.filter(user=user).order_by('-id').first()
+
+        endpoints = [
+            ('tags', reverse('recipe:tag-list'), {}),
+            ('ingredients', reverse('recipe:ingredient-list'), {}),
+            ('recipes', reverse('recipe:recipe-list'), {}),
+        ]
+        if tag:
+            endpoints += [
+                ('tags autocomplete', reverse('recipe:tag-autocomplete'), {
+                    'q': tag.name[:3],
+                }),
+                ('recipes by tags', reverse('recipe:recipe-list'), {
+                    'tags': ','.join(str(pk) for pk in tag_ids),
+                }),
+                ('recipes by all tags', reverse('recipe:recipe-list'), {
+                    'tags': ','.join(str(pk) for pk in tag_ids),
+                    'match': 'all',
+                }),
+            ]
+        if ingredient:
+            endpoints += [
+                (
+                    'ingredients autocomplete',
+                    reverse('recipe:ingredient-autocomplete'),
+                    {'q': ingredient.name[:3]}
+                ),
+                ('recipes by ingredients', reverse('recipe:recipe-list'), {
+                    'ingredients': ','.join(
+                        str(pk) for pk in ingredient_ids
+                    ),
+                }),
+            ]
+        if recipe:
+            endpoints += [
+                ('recipes search', reverse('recipe:recipe-list'), {
+                    'search': recipe.title.split()[0],
+                }),
+                (
+                    'recipe detail',
+                    reverse('recipe:recipe-detail', args=[recipe.id]),
+                    {}
+                ),
+            ]
+        return endpoints
+
+    def explain_endpoint(self, client, label, url, params, table_rows,
+                         options):
+        '''Request the endpoint, explain its queries and return the
+        sequential scans found. Queries routed to a replica are explained
+        on it'''
+        with ExitStack() as stack:
+            contexts = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias])
+                )
+                for alias in ['default', *replica_aliases()]
+            }
+            response = client.get(url, params)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n{label}: GET {url} {params or ""} -> {response.status_code}'
+        ))
+
+        problems = []
+        selects = [
+            (alias, query['sql'])
+            for alias, context in contexts.items()
+            for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+        for index, (alias, sql) in enumerate(selects, start=1):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}'
+                )
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+            plan = plan[0]
+            scans = [
+                node['Relation Name'] for node in self.nodes(plan['Plan'])
+                if node['Node Type'] == 'Seq Scan'
+                and table_rows.get(node['Relation Name'], 0) >=
+                options['min_rows']
+            ]
+            problems += [f'{label}: query {index} on {name}' for name in scans]
+            self.stdout.write(
+                f'  query {index}: {plan["Execution Time"]:.2f} ms'
+                + (f'  on {alias}' if alias != 'default' else '')
+                + (f'  seq scan on {", ".join(scans)}' if scans else '')
+            )
+            if options['verbose_plans']:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}')
+                    for line, in cursor.fetchall():
+                        self.stdout.write(f'    {line}')
+        return problems
+
+    def nodes(self, node):
+        '''Yield the node of a JSON plan and its descendants'''
+        yield node
+        for child in node.get('Plans', []):
+            yield from self.nodes(child)
+
+    def table_rows(self):
+        '''Return the estimated number of rows of each table, counting the
+        never analyzed ones as empty'''
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+            )
+            return {name: max(rows, 0) for name, rows in cursor.fetchall()}
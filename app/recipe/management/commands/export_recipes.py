@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.exporters import RecipeExporter
+
+
+class Command(BaseCommand):
+    """ Command streaming every recipe of a user to a file as newline
+    delimited JSON or CSV """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Owner email')
+        parser.add_argument(
+            '--type',
+            choices=list(RecipeExporter.content_types),
+            default='ndjson'
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File, or - for stdout'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist')
+
+        exporter = RecipeExporter(user, chunk_size=options['chunk_size'])
+        lines = exporter.iter_lines(options['type'])
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        with open(options['output'], 'w', newline='') as output:
+            output.writelines(lines)
@@ -0,0 +1,38 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importers import RecipeImporter
+from recipe.parsers import iter_lines, NDJSONParser
+
+
+class Command(BaseCommand):
+    """ Command importing recipes of a user from a newline delimited JSON
+    file, streamed in batches """
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file, or - for stdin')
+        parser.add_argument('--user', required=True, help='Owner email')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist')
+
+        importer = RecipeImporter(user, batch_size=options['batch_size'])
+        max_length = NDJSONParser.max_line_length
+        if options['path'] == '-':
+            report = importer.run(iter_lines(sys.stdin.buffer, max_length))
+        else:
+            with open(options['path'], 'rb') as lines:
+                report = importer.run(iter_lines(lines, max_length))
+
+        for error in report['errors']:
+            self.stderr.write(f'Line {error["line"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{report["created"]} recipes imported, '
+            f'{report["failed"]} lines failed'
+        ))
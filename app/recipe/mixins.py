@@ -0,0 +1,226 @@
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, urlencode
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.models import CollectionVersion
+from .cache import get_response_cache
+from .readers import ordering_fields, ValuesReader
+
+
+class CollectionVersionMixin:
+    '''Read the collection version of the user once per request'''
+
+    def get_collection_version(self):
+        '''Return the collection version of the user'''
+        if not hasattr(self, '_collection_version'):
+            self._collection_version = CollectionVersion.objects.get_version(
+                self.request.user
+            )
+        return self._collection_version
+
+
+class CollectionETagMixin(CollectionVersionMixin):
+    '''Answer a list request with 304 Not Modified, before running the list
+    query and the serializers, when the collections of the user did not
+    change since the client got the ETag it sends in If-None-Match.
+
+    The ETag hashes the collection version of the user with the path, the
+    query parameters and the media type of the response. The version is
+    read before the list query, so a write committed in between can only
+    make the ETag older than the data, never newer'''
+
+    def list(self, request, *args, **kwargs):
+        '''List the objects unless the client already has them'''
+        etag = self.get_list_etag(request)
+        if self.etag_matches(etag, request):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        # Let clients keep the list but revalidate it before every use
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_list_etag(self, request):
+        '''Return the weak ETag of the list requested'''
+        version = self.get_collection_version()
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = '\n'.join([
+            str(request.user.pk),
+            str(version),
+            request.path,
+            query,
+            request.accepted_media_type or '',
+        ])
+        return f'W/"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+    def etag_matches(self, etag, request):
+        '''Return whether If-None-Match holds the ETag, compared weakly'''
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if '*' in etags:
+            return True
+        return etag.removeprefix('W/') in {
+            value.removeprefix('W/') for value in etags
+        }
+
+
+class CachedResponseMixin(CollectionVersionMixin):
+    '''Serve list and retrieve requests from the response cache. Entries
+    are keyed on the collection version of the user, which the writes of the
+    user bump, so they are never served stale'''
+
+    def list(self, request, *args, **kwargs):
+        '''List the objects, from the cache if possible'''
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        '''Retrieve the object, from the cache if possible'''
+        return self.cached_response(
+            super().retrieve,
+            request,
+            *args,
+            **kwargs
+        )
+
+    def cached_response(self, method, request, *args, **kwargs):
+        '''Return the cached response to the request or call the method and
+        cache its response if it succeeded'''
+        response_cache = get_response_cache()
+        if not response_cache.enabled:
+            return method(request, *args, **kwargs)
+
+        key = response_cache.make_key(request, self.get_collection_version())
+        data = response_cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = method(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set(key, response.data)
+        return response
+
+
+class ValuesListMixin:
+    '''Build list responses from values() rows with the ValuesReader of
+    the serializer, when the RECIPE_VALUES_LISTS setting is on, instead of
+    building model instances and walking the serializer fields per object.
+    The output is the same. Serializers the reader does not support are
+    listed as usual'''
+
+    def list(self, request, *args, **kwargs):
+        '''List the objects from values() rows if possible'''
+        if not getattr(settings, 'RECIPE_VALUES_LISTS', False):
+            return super().list(request, *args, **kwargs)
+        try:
+            reader = ValuesReader(self.get_serializer())
+        except ValueError:
+            return super().list(request, *args, **kwargs)
+
+        rows = reader.get_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.to_representation(page))
+        return Response(reader.to_representation(rows))
+
+
+class SparseFieldsMixin:
+    '''Let list and retrieve requests pick the fields of the objects, with
+    ?fields=id,title, or leave some out, with ?exclude=tags,ingredients.
+
+    The serializers drop the other fields, through the fieldset of their
+    context, and get_sparse_queryset() defers the columns they do not read.
+    Views load the many-to-many fields only if wanted_field() says so'''
+    fields_param = 'fields'
+    exclude_param = 'exclude'
+    sparse_actions = ('list', 'retrieve')
+
+    def get_fieldset(self):
+        '''Return the names of the requested fields, or None for all of
+        them'''
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = self.parse_fieldset()
+        return self._fieldset
+
+    def parse_fieldset(self):
+        '''Read the fieldset from the query parameters'''
+        params = self.request.query_params
+        if self.action not in self.sparse_actions or not (
+            self.fields_param in params or self.exclude_param in params
+        ):
+            return None
+        available = list(self.get_serializer_class()().fields)
+        fields = available
+        if self.fields_param in params:
+            fields = self.get_names(self.fields_param, available)
+        exclude = self.get_names(self.exclude_param, available)
+        fieldset = [
+            name for name in available
+            if name in fields and name not in exclude
+        ]
+        if not fieldset:
+            param = (
+                self.fields_param if self.fields_param in params
+                else self.exclude_param
+            )
+            raise ValidationError({
+                param: [_('At least one field must be returned.')]
+            })
+        return fieldset
+
+    def get_names(self, param, available):
+        '''Return the field names listed in the parameter'''
+        names = {
+            name.strip()
+            for name in self.request.query_params.get(param, '').split(',')
+            if name.strip()
+        }
+        unknown = names.difference(available)
+        if unknown:
+            raise ValidationError({
+                param: [_('Unknown fields: {names}.').format(
+                    names=', '.join(sorted(unknown))
+                )]
+            })
+        return names
+
+    def wanted_field(self, name):
+        '''Return whether the response holds the field'''
+        fieldset = self.get_fieldset()
+        return fieldset is None or name in fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+        return context
+
+    def get_sparse_queryset(self, queryset):
+        '''Defer the columns of the fields left out of the response. The
+        ordering fields are kept for the pagination'''
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        meta = queryset.model._meta
+        fields = self.get_serializer_class()().fields
+        columns = []
+        for name in fieldset:
+            source = fields[name].source
+            try:
+                model_field = meta.get_field(source)
+            except FieldDoesNotExist:
+                # Read by a method or a dotted source, load everything
+                return queryset
+            if model_field.concrete and not model_field.many_to_many:
+                columns.append(source)
+        ordering = [
+            name for name in ordering_fields(queryset)
+            if name not in queryset.query.annotations
+        ]
+        return queryset.only(meta.pk.name, *columns, *ordering)
@@ -0,0 +1,190 @@
+import json
+import math
+
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class OptionalPaginationMixin:
+    '''Let clients that expect the full list opt out of pagination with
+    ?paginate=false'''
+    paginate_query_param = 'paginate'
+    paginate_disabled_values = ('0', 'false', 'no', 'off')
+
+    def is_paginated(self, request):
+        '''Return whether the client asked for a paginated response'''
+        value = request.query_params.get(self.paginate_query_param, '')
+        return value.lower() not in self.paginate_disabled_values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        '''Skip pagination for clients that opted out of it'''
+        if not self.is_paginated(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeCursorPagination(OptionalPaginationMixin, CursorPagination):
+    '''Paginate recipes from the newest to the oldest one. The cursor holds
+    the id of the last recipe sent, so every page is a range scan on the
+    primary key no matter how deep the client pages, and recipes created
+    meanwhile never shift the following pages'''
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class KeysetPagination(CursorPagination):
+    '''Cursor pagination on a composite key such as (name, id). The cursor
+    holds the whole key of the last object sent, so ties on the leading
+    field are resolved by the following ones instead of the OFFSET that
+    CursorPagination falls back to'''
+    ordering = ('-id',)
+    # Types of the values of the ordering fields, checked in the cursors
+    # sent by clients before they reach a query
+    key_types = (int,)
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        '''Return the page of objects following the requested cursor'''
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            reverse = self.cursor.reverse
+            position = self.decode_position(self.cursor.position)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self._flip(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(
+                ordering,
+                position
+            ))
+
+        results = list(queryset[:self.page_size + 1])
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_keyset_filter(self, ordering, position):
+        '''Return the condition matching the objects placed after the
+        position, e.g. name < x OR (name = x AND id < y). The leading field
+        is also bounded on its own so the index scan starts at the
+        position'''
+        condition = Q()
+        for index, field in enumerate(ordering):
+            clause = Q(**{self._lookup(field, 'lt', 'gt'): position[index]})
+            for previous, value in zip(ordering[:index], position):
+                clause &= Q(**{previous.lstrip('-'): value})
+            condition |= clause
+
+        bound = Q(**{self._lookup(ordering[0], 'lte', 'gte'): position[0]})
+        return bound & condition
+
+    def get_next_link(self):
+        '''Return the link to the page following the current one'''
+        if not self.has_next or not self.page:
+            return None
+        cursor = Cursor(
+            offset=0,
+            reverse=False,
+            position=self.encode_position(self.page[-1])
+        )
+        return self.encode_cursor(cursor)
+
+    def get_previous_link(self):
+        '''Return the link to the page preceding the current one'''
+        if not self.has_previous or not self.page:
+            return None
+        cursor = Cursor(
+            offset=0,
+            reverse=True,
+            position=self.encode_position(self.page[0])
+        )
+        return self.encode_cursor(cursor)
+
+    def encode_position(self, instance):
+        '''Serialize the ordering key of an object or values() row'''
+        key = []
+        for field in self.ordering:
+            field = field.lstrip('-')
+            if isinstance(instance, dict):
+                key.append(instance[field])
+            else:
+                key.append(getattr(instance, field))
+        return json.dumps(key)
+
+    def decode_position(self, position):
+        '''Parse the ordering key stored in the cursor'''
+        try:
+            key = json.loads(position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(key, list) or
+            len(key) != len(self.ordering) or
+            not all(map(self.valid_value, key, self.key_types))
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return key
+
+    def valid_value(self, value, kind):
+        '''Return whether a value of the cursor has the type of its field
+        and fits in its column'''
+        if isinstance(value, bool):
+            return False
+        if kind is int:
+            return isinstance(value, int) and -2 ** 63 <= value < 2 ** 63
+        if kind is float:
+            return isinstance(value, (int, float)) and math.isfinite(value)
+        if kind is str:
+            return isinstance(value, str) and '\x00' not in value
+        return isinstance(value, kind)
+
+    def _flip(self, field):
+        '''Reverse the direction of an ordering field'''
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def _lookup(self, field, descending, ascending):
+        '''Return the lookup comparing a field in its ordering direction'''
+        if field.startswith('-'):
+            return f'{field[1:]}__{descending}'
+        return f'{field}__{ascending}'
+
+
+class NameKeysetPagination(OptionalPaginationMixin, KeysetPagination):
+    '''Paginate tags and ingredients on (name, id), matching the
+    (user, name) indexes of their tables'''
+    ordering = ('-name', '-id')
+    key_types = (str, int)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class RecipeSearchPagination(OptionalPaginationMixin, KeysetPagination):
+    '''Paginate searched recipes from the best ranked one, on the
+    (rank, id) key'''
+    ordering = ('-rank', '-id')
+    key_types = (float, int)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,30 @@
+from rest_framework.parsers import BaseParser
+
+
+def iter_lines(stream, max_length):
+    '''Yield the lines of a binary stream, reading at most max_length bytes
+    of a line. Longer lines are skipped to their end, never held whole in
+    memory, and yielded as None'''
+    while True:
+        line = stream.readline(max_length + 1)
+        if not line:
+            return
+        if len(line) <= max_length or line.endswith(b'\n'):
+            yield line
+            continue
+        while line and not line.endswith(b'\n'):
+            line = stream.readline(max_length + 1)
+        yield None
+
+
+class NDJSONParser(BaseParser):
+    '''Parse newline delimited JSON. The body is not read at once: the
+    parsed data is an iterator over its raw lines, so consumers decode one
+    document at a time in bounded memory. Lines longer than max_line_length
+    bytes are given as None'''
+    media_type = 'application/x-ndjson'
+    max_line_length = 1024 * 1024
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        '''Return an iterator over the lines of the body'''
+        return iter_lines(stream, self.max_line_length)
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import OuterRef
+from rest_framework import relations, serializers
+
+from core.metrics import measure_serializer
+
+# Fields whose representation of a database value is the value itself
+PLAIN_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+)
+
+
+def ordering_fields(queryset):
+    '''Return the names of the fields the queryset is ordered by, which
+    the pagination reads from the last object of a page'''
+    return [
+        field.lstrip('-') for field in queryset.query.order_by
+        if isinstance(field, str)
+    ]
+
+
+class ValuesReader:
+    '''Build the representation a serializer gives to a list of objects,
+    without building the objects.
+
+    The columns of the fields are read with values(), and the ids of
+    many-to-many fields are aggregated into an array per row by a subquery,
+    ordered by id like the prefetches of the views, so a page is read with
+    a single query. Rows are turned into the output of the serializer by
+    the to_representation of its own fields, skipped for the fields whose
+    values need no conversion, such as integers and strings.
+
+    Only fields sourced from a column or a many-to-many field of the model,
+    represented by their primary keys, are supported: other serializers
+    raise ValueError'''
+    array_prefix = 'values_'
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.columns = []
+        self.arrays = {}
+        self.fields = []
+        for field in serializer._readable_fields:
+            self.add_field(field)
+
+    def add_field(self, field):
+        '''Plan reading the value of a field of the serializer'''
+        if len(field.source_attrs) != 1:
+            raise ValueError(f'Unsupported source {field.source}')
+        source = field.source_attrs[0]
+        try:
+            model_field = self.model._meta.get_field(source)
+        except FieldDoesNotExist:
+            raise ValueError(f'{source} is not a field of the model')
+
+        if isinstance(field, relations.ManyRelatedField):
+            if (
+                not model_field.many_to_many or
+                type(field.child_relation) is not (
+                    relations.PrimaryKeyRelatedField
+                ) or
+                field.child_relation.pk_field is not None
+            ):
+                raise ValueError(f'Unsupported related field {source}')
+            key = f'{self.array_prefix}{source}'
+            self.arrays[key] = self.related_ids(model_field)
+            self.fields.append((field.field_name, key, None))
+            return
+
+        if not model_field.concrete or model_field.is_relation:
+            raise ValueError(f'Unsupported field {source}')
+        self.columns.append(source)
+        if type(field) in PLAIN_FIELDS:
+            convert = None
+        else:
+            convert = field.to_representation
+        self.fields.append((field.field_name, source, convert))
+
+    def related_ids(self, model_field):
+        '''Return the subquery of the ordered ids linked to each row'''
+        through = model_field.remote_field.through
+        source = model_field.m2m_field_name()
+        target = through._meta.get_field(
+            model_field.m2m_reverse_field_name()
+        ).attname
+        return ArraySubquery(through.objects.filter(
+            **{source: OuterRef('pk')}
+        ).order_by(target).values(target))
+
+    def get_queryset(self, queryset):
+        '''Return the values() rows of the queryset. Its ordering fields
+        and annotations, such as the rank of searched recipes, are kept for
+        the pagination'''
+        names = dict.fromkeys([
+            self.model._meta.pk.attname,
+            *self.columns,
+            *ordering_fields(queryset),
+            *queryset.query.annotations,
+            *self.arrays,
+        ])
+        return queryset.prefetch_related(None).annotate(
+            **self.arrays
+        ).values(*names)
+
+    def to_representation(self, rows):
+        '''Return the representation of the rows'''
+        with measure_serializer():
+            return [self.row_representation(row) for row in rows]
+
+    def row_representation(self, row):
+        '''Return the representation of a row, like Serializer does for its
+        object'''
+        ret = OrderedDict()
+        for name, key, convert in self.fields:
+            value = row[key]
+            if value is None or convert is None:
+                ret[name] = value
+            else:
+                ret[name] = convert(value)
+        return ret
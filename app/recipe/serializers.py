@@ -1,26 +1,62 @@
 from rest_framework import serializers
-from core.models import Ingredient, Recipe, Tag
+from core.metrics import MeasuredListSerializer, MeasuredSerializerMixin
+from core.models import Ingredient, Recipe, recipe_image_storage, Tag
 
 
-class TagSerializer(serializers.ModelSerializer):
+class SparseFieldsSerializerMixin:
+    '''Keep only the fields named by the fieldset of the context, which
+    recipe.mixins.SparseFieldsMixin sets for ?fields= and ?exclude=. Nested
+    serializers are built without the context and keep all their fields'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get('fieldset')
+        if fieldset is not None:
+            for name in list(self.fields):
+                if name not in fieldset:
+                    self.fields.pop(name)
+
+
+class TagSerializer(SparseFieldsSerializerMixin, MeasuredSerializerMixin,
+                    serializers.ModelSerializer):
     '''Serializer for the tag objects'''
 
     class Meta:
         model = Tag
         fields = ['id', 'name']
         read_only_fields = ['id']
+        list_serializer_class = MeasuredListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SparseFieldsSerializerMixin,
+                           MeasuredSerializerMixin,
+                           serializers.ModelSerializer):
     '''Serializer for the ingredient objects'''
 
     class Meta:
         model = Ingredient
         fields = ['id', 'name']
         read_only_fields = ['id']
+        list_serializer_class = MeasuredListSerializer
+
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    '''Serialize the variants of a recipe image as URLs, absolute ones when
+    the request is known, like ImageField does'''
 
-class RecipeSerializer(serializers.ModelSerializer):
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in value.items():
+            url = recipe_image_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant] = url
+        return urls
+
+
+class RecipeSerializer(SparseFieldsSerializerMixin, MeasuredSerializerMixin,
+                       serializers.ModelSerializer):
     '''Serializer for the recipe objects'''
 
     ingredients = serializers.PrimaryKeyRelatedField(
@@ -31,12 +67,14 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = ['id', 'title', 'time_minutes', 'price', 'link',
-                  'ingredients', 'tags']
-        read_only_fields = ['id']
+                  'ingredients', 'tags', 'image_status', 'image_variants']
+        read_only_fields = ['id', 'image_status']
+        list_serializer_class = MeasuredListSerializer
 
 
 class DetailSerializer(RecipeSerializer):
@@ -51,5 +89,9 @@ class ImageSerializer(RecipeSerializer):
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'image_status', 'image_variants']
         read_only = ['id']
+        read_only_fields = ['image_status']
+        # An upload without a file would be marked as processing, and
+        # fail once the pipeline found no image to process
+        extra_kwargs = {'image': {'required': True, 'allow_null': False}}
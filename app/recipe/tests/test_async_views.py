@@ -0,0 +1,83 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+class AsyncRecipeViewsTests(TransactionTestCase):
+    '''Test the async recipe endpoints, which run the queries on worker
+    threads and so need committed data'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='rolando@lero.com',
+            password='senhadorolando123'
+        )
+        token = Token.objects.create(user=self.user)
+        self.authorization = f'Token {token.key}'
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.async_client = AsyncClient()
+
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Tofu stew',
+            time_minutes=30,
+            price=12
+        )
+        self.recipe.tags.add(tag)
+        self.recipe.ingredients.add(ingredient)
+
+    def headers(self):
+        '''Return the headers of the requests, which the async client of
+        Django 4.0 takes by their HTTP names'''
+        if self.authorization:
+            return {'authorization': self.authorization}
+        return {}
+
+    def get(self, url, params=None):
+        '''Request the url with the async client'''
+        return async_to_sync(self.async_client.get)(
+            url,
+            params or {},
+            **self.headers()
+        )
+
+    def test_same_as_sync(self):
+        '''Test the async endpoints answer like the sync ones'''
+        for name, args, params in [
+            ('recipe-list', [], {}),
+            ('recipe-list', [], {'search': 'stew'}),
+            ('recipe-detail', [self.recipe.id], {}),
+            ('tag-list', [], {}),
+            ('ingredient-list', [], {}),
+        ]:
+            res = self.get(reverse(f'recipe-async:{name}', args=args), params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            sync_res = self.client.get(
+                reverse(f'recipe:{name}', args=args),
+                params
+            )
+            self.assertEqual(res.json(), sync_res.json())
+
+    def test_auth_required(self):
+        '''Test the async endpoints require authentication'''
+        self.authorization = None
+        res = self.get(reverse('recipe-async:recipe-list'))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_read_only(self):
+        '''Test the async endpoints do not accept writes'''
+        res = async_to_sync(self.async_client.post)(
+            reverse('recipe-async:tag-list'),
+            {'name': 'Quick'},
+            **self.headers()
+        )
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,190 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import (
+    LiveServerTestCase, override_settings, TestCase
+)
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.management.commands.bench_api import SCENARIOS
+
+
+class ExplainEndpointsTests(TestCase):
+    '''Test explaining the queries of the API endpoints'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='professor@pardal.com',
+            password='senhadopardal123'
+        )
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Corn bread',
+            time_minutes=45,
+            price=8
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Bakery'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Corn')
+        )
+
+    def test_explain_endpoints(self):
+        '''Test every endpoint is requested and its queries explained'''
+        out = StringIO()
+        call_command('explain_endpoints', user=self.user.email, stdout=out)
+        output = out.getvalue()
+        self.assertIn('recipes search: GET', output)
+        self.assertIn('recipe detail: GET', output)
+        self.assertIn('query 1:', output)
+        self.assertIn('No sequential scans', output)
+
+    def test_cached_responses_explained(self):
+        '''Test the queries of responses the cache holds are explained'''
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get(reverse('recipe:recipe-list'))
+        out = StringIO()
+        call_command(
+            'explain_endpoints',
+            user=self.user.email,
+            verbose_plans=True,
+            stdout=out
+        )
+        recipes = out.getvalue().split('\nrecipes: GET', 1)[1]
+        self.assertIn(' on core_recipe ', recipes.split('\n\n', 1)[0])
+
+    def test_check_sequential_scans(self):
+        '''Test --check fails when a large table is scanned sequentially'''
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_indexscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+        with self.assertRaises(CommandError):
+            call_command(
+                'explain_endpoints',
+                user=self.user.email,
+                min_rows=0,
+                check=True,
+                stdout=StringIO()
+            )
+
+    def test_unknown_user(self):
+        '''Test an unknown user is reported'''
+        with self.assertRaises(CommandError):
+            call_command('explain_endpoints', user='nobody@example.com')
+
+
+class BenchApiTests(LiveServerTestCase):
+    '''Test benchmarking the API endpoints, whose clients run on other
+    threads, or make requests to the live server, and only see committed
+    data'''
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        # Uploaded images are processed within the request, so that no
+        # worker writes to the media root once it is removed
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name,
+            RECIPE_IMAGE_PIPELINE={'EAGER': True}
+        )
+        self.settings_override.enable()
+        call_command(
+            'seed_data',
+            users=2,
+            recipes=3,
+            tags=4,
+            ingredients=4,
+            stdout=StringIO()
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def bench(self, **options):
+        '''Run the benchmark and return its report'''
+        out = StringIO()
+        call_command(
+            'bench_api',
+            clients=3,
+            requests=2,
+            warmup=1,
+            stdout=out,
+            stderr=StringIO(),
+            **options
+        )
+        return json.loads(out.getvalue())
+
+    def test_bench_api(self):
+        '''Test every endpoint is reported and the run leaves the data as
+        it found it'''
+        snapshot = self.snapshot()
+        report = self.bench()
+        self.assertEqual(report['dataset'], {'users': 2, 'recipes': 6})
+        self.assertEqual(list(report['endpoints']), list(SCENARIOS))
+        for name, result in report['endpoints'].items():
+            self.assertEqual(result['requests'], 6, name)
+            self.assertEqual(result['errors'], 0, name)
+            self.assertGreater(result['throughput_rps'], 0)
+            self.assertLessEqual(
+                result['latency_ms']['p50'],
+                result['latency_ms']['p99']
+            )
+            self.assertGreaterEqual(result['queries_per_request']['max'], 1)
+        self.assertEqual(self.snapshot(), snapshot)
+
+    def test_bench_api_response_cache(self):
+        '''Test the cached scenarios run without the response cache, and
+        with it as well when asked to'''
+        report = self.bench(
+            endpoints=['recipe-list', 'tag-list'],
+            response_cache=True
+        )
+        self.assertEqual(
+            list(report['endpoints']),
+            ['recipe-list', 'recipe-list-cached', 'tag-list']
+        )
+        endpoints = report['endpoints']
+        self.assertGreater(
+            endpoints['recipe-list']['queries_per_request']['max'],
+            endpoints['recipe-list-cached']['queries_per_request']['max']
+        )
+
+    def test_bench_api_server(self):
+        '''Test benchmarking a running server over HTTP'''
+        snapshot = self.snapshot()
+        report = self.bench(base_url=self.live_server_url)
+        self.assertEqual(list(report['endpoints']), list(SCENARIOS))
+        for name, result in report['endpoints'].items():
+            self.assertEqual(result['requests'], 6, name)
+            self.assertEqual(result['errors'], 0, name)
+            self.assertIsNone(result['queries_per_request'])
+        self.assertEqual(self.snapshot(), snapshot)
+
+    def snapshot(self):
+        '''Return the users, tokens, collections and recipes'''
+        return (
+            sorted(get_user_model().objects.values_list('email', flat=True)),
+            sorted(Token.objects.values_list('user_id', flat=True)),
+            sorted(Tag.objects.values_list('id', 'name')),
+            sorted(Ingredient.objects.values_list('id', 'name')),
+            sorted(Recipe.objects.values_list(
+                'id',
+                'image',
+                'tags',
+                'ingredients'
+            ), key=str),
+        )
+
+    def test_bench_api_without_seed(self):
+        '''Test the benchmark asks for seeded users'''
+        with self.assertRaisesMessage(CommandError, 'seed_data'):
+            call_command('bench_api', prefix='missing', stdout=StringIO())
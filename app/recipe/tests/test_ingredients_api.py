@@ -7,6 +7,7 @@ from rest_framework import status
 from django.test import TestCase
 
 INGREDIENT_URL = reverse('recipe:ingredient-list')
+AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
 
 
 class PublicIngredientAPITests(TestCase):
@@ -50,7 +51,7 @@ class PrivateIngredientAPITests(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_limited_to_user(self):
         '''Test the ingredients are limited to the user ingredients'''
@@ -69,8 +70,8 @@ class PrivateIngredientAPITests(TestCase):
         )
         res = self.client.get(INGREDIENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient(self):
         '''Test creating ingredient'''
@@ -88,6 +89,17 @@ class PrivateIngredientAPITests(TestCase):
         res = self.client.post(INGREDIENT_URL, payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_bulk_create_ingredients(self):
+        '''Test creating several ingredients with a single request'''
+        payload = [{'name': 'Eggs'}, {'name': 'Flour'}]
+        res = self.client.post(INGREDIENT_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        names = Ingredient.objects.filter(user=self.user).values_list(
+            'name',
+            flat=True
+        )
+        self.assertEqual(sorted(names), ['Eggs', 'Flour'])
+
     def test_ingredients_assigned_only(self):
         '''Test filtering only ingredients assigned to a recipe'''
         ingredient1 = Ingredient.objects.create(
@@ -115,5 +127,58 @@ class PrivateIngredientAPITests(TestCase):
         serializer2 = IngredientSerializer(ingredient2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
+
+
+class IngredientAutocompleteTests(TestCase):
+    '''Test suggesting ingredients for a typed text'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='muttley@vigarista.com',
+            password='senhadomuttley123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name in ['Tomato', 'Cherry tomato', 'Tomatillo', 'Potato', 'Tofu']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+    def suggest(self, **params):
+        '''Return the names suggested for the parameters'''
+        res = self.client.get(AUTOCOMPLETE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [ingredient['name'] for ingredient in res.data]
+
+    def test_prefix_first(self):
+        '''Test names starting with the text come before similar ones'''
+        names = self.suggest(q='toma')
+        self.assertEqual(names[:2], ['Tomatillo', 'Tomato'])
+        self.assertIn('Cherry tomato', names[2:])
+        self.assertNotIn('Tofu', names)
+
+    def test_fuzzy_match(self):
+        '''Test names are suggested for a text with a typo'''
+        names = self.suggest(q='tomatp')
+        self.assertIn('Tomato', names)
+        self.assertNotIn('Tofu', names)
+
+    def test_limit(self):
+        '''Test the number of suggestions is limited'''
+        self.assertEqual(self.suggest(q='to', limit=2), ['Tofu', 'Tomatillo'])
+
+    def test_limited_to_user(self):
+        '''Test only the names of the user are suggested'''
+        other_user = get_user_model().objects.create_user(
+            email='penelope@charmosa.com',
+            password='senhadapenelope123'
+        )
+        Ingredient.objects.create(user=other_user, name='Tomato paste')
+        self.assertNotIn('Tomato paste', self.suggest(q='tomato'))
+
+    def test_invalid_params(self):
+        '''Test the text is required and the limit bounded'''
+        res = self.client.get(AUTOCOMPLETE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'to', 'limit': 500})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
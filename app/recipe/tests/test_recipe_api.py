@@ -1,5 +1,8 @@
+import base64
 import os
 import tempfile
+from unittest.mock import patch
+from urllib.parse import urlencode
 
 from rest_framework.test import APIClient
 from recipe.serializers import (
@@ -10,7 +13,9 @@ from PIL import Image
 from core.models import Ingredient, Recipe, Tag
 from django.urls import reverse
 from rest_framework import status
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from recipe.cache import get_response_cache
+from recipe.images import build_variants
 
 RECIPE_URL = reverse('recipe:recipe-list')
 
@@ -90,7 +95,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
         res = self.client.get(RECIPE_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_user_only_recipes(self):
         '''Test if the API shows recipes other than the ones from the
@@ -111,8 +116,8 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
         res = self.client.get(RECIPE_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_details(self):
         '''Test retrieving details from a recipe'''
@@ -238,8 +243,8 @@ class PrivateRecipeAPITests(TestCase):
         )
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         for tag in [serializer1, serializer2]:
-            self.assertIn(tag.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+            self.assertIn(tag.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         '''Test filtering recipes by its ingredients'''
@@ -264,8 +269,176 @@ class PrivateRecipeAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         for ingredient in [serializer1, serializer2]:
-            self.assertIn(ingredient.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+            self.assertIn(ingredient.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+
+class RecipeFilterTests(TestCase):
+    '''Test matching any or all of the requested tags and ingredients'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='gato@felix.com',
+            password='senhadogato123',
+            name='Gato Felix'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = create_tag(self.user, 'Vegan')
+        self.quick = create_tag(self.user, 'Quick')
+        self.rice = create_ingredient(self.user, 'Rice')
+        self.beans = create_ingredient(self.user, 'Beans')
+        self.both = create_recipe(self.user, title='Rice and beans')
+        self.both.tags.add(self.vegan, self.quick)
+        self.both.ingredients.add(self.rice, self.beans)
+        self.vegan_only = create_recipe(self.user, title='Rice pudding')
+        self.vegan_only.tags.add(self.vegan)
+        self.vegan_only.ingredients.add(self.rice)
+
+    def get_ids(self, params):
+        '''Return the ids of the recipes listed with the parameters'''
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_match_any_without_duplicates(self):
+        '''Test recipes matching several ids are listed once'''
+        ids = self.get_ids({
+            'tags': f'{self.vegan.id},{self.quick.id}',
+            'ingredients': f'{self.rice.id},{self.beans.id}',
+        })
+        self.assertEqual(ids, [self.vegan_only.id, self.both.id])
+
+    def test_match_all_tags(self):
+        '''Test listing recipes having every requested tag'''
+        ids = self.get_ids({
+            'tags': f'{self.vegan.id},{self.quick.id}',
+            'match': 'all',
+        })
+        self.assertEqual(ids, [self.both.id])
+
+    def test_match_per_dimension(self):
+        '''Test choosing the matching mode of each dimension'''
+        ids = self.get_ids({
+            'tags': f'{self.vegan.id},{self.quick.id}',
+            'ingredients': f'{self.rice.id},{self.beans.id}',
+            'tags_match': 'any',
+            'ingredients_match': 'all',
+        })
+        self.assertEqual(ids, [self.both.id])
+
+    def test_malformed_ids(self):
+        '''Test filtering with ids that are not integers'''
+        res = self.client.get(RECIPE_URL, {'tags': '1,abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_invalid_match(self):
+        '''Test filtering with an unknown matching mode'''
+        res = self.client.get(
+            RECIPE_URL,
+            {'tags': self.vegan.id, 'match': 'some'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipePaginationTests(TestCase):
+    '''Test the pagination of the recipe list'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='she@ra.com',
+            password='senhadashe123',
+            name='She Ra'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(self.user, title=f'Pie {index}')
+            for index in range(5)
+        ]
+
+    def test_paginate_recipes(self):
+        '''Test walking through all the recipe pages'''
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [recipe['id'] for recipe in res.data['results']]
+        expected = [recipe.id for recipe in reversed(self.recipes)]
+        self.assertEqual(ids, expected)
+
+    def test_pages_stable_on_insert(self):
+        '''Test recipes created between two pages do not shift the pages'''
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        create_recipe(self.user, title='Late pie')
+        res = self.client.get(res.data['next'])
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [self.recipes[2].id, self.recipes[1].id])
+
+    def test_full_list_opt_in(self):
+        '''Test listing every recipe without pagination'''
+        res = self.client.get(RECIPE_URL, {'paginate': 'false'})
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, serializer.data)
+
+
+class RecipeQueryCountTests(TestCase):
+    '''Test the number of queries run by the recipe API endpoints'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='mumm@ra.com',
+            password='senhadomumm123',
+            name='Mumm Ra'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            create_tag(self.user, 'Vegan'),
+            create_tag(self.user, 'Dessert'),
+        ]
+        self.ingredients = [
+            create_ingredient(self.user, 'Flour'),
+            create_ingredient(self.user, 'Cocoa'),
+        ]
+        self.recipes = []
+        for index in range(10):
+            recipe = create_recipe(self.user, title=f'Cake {index}')
+            recipe.tags.add(*self.tags)
+            recipe.ingredients.add(*self.ingredients)
+            self.recipes.append(recipe)
+
+    def test_list_queries(self):
+        '''Test listing recipes does not query once per recipe'''
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_queries(self):
+        '''Test retrieving a recipe loads its relations in fixed queries'''
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(self.recipes[0].id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_filter_by_tags_queries(self):
+        '''Test filtering recipes by tags does not query once per recipe'''
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPE_URL, {'tags': self.tags[0].id})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_filter_by_ingredients_queries(self):
+        '''Test filtering recipes by ingredients does not query once per
+        recipe'''
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                RECIPE_URL,
+                {'ingredients': self.ingredients[0].id}
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
 
 
 class RecipeImageTests(TestCase):
@@ -301,3 +474,327 @@ class RecipeImageTests(TestCase):
         url = image_upload_path(self.recipe.id)
         res = self.client.post(url, {'image': 'notimage'}, format='multipart')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_without_image(self):
+        '''Test an upload without a file is rejected and leaves the recipe
+        as it was'''
+        url = image_upload_path(self.recipe.id)
+        for data in [{}, {'image': ''}]:
+            with patch('recipe.views.schedule_image_processing') as schedule:
+                res = self.client.post(url, data, format='multipart')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('image', res.data)
+            schedule.assert_not_called()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, '')
+
+
+class RecipeImagePipelineTests(TestCase):
+    '''Test building the variants of uploaded recipe images'''
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name,
+            RECIPE_IMAGE_PIPELINE={'EAGER': True}
+        )
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            email='coragem@cao.com',
+            password='senhadocoragem123',
+            name='Coragem'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def upload(self, size=(1600, 1200)):
+        '''Upload a JPEG image with EXIF data to the recipe'''
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            exif = Image.Exif()
+            exif[0x010F] = 'Camera maker'
+            Image.new('RGB', size).save(ntf, format='JPEG', exif=exif)
+            ntf.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    image_upload_path(self.recipe.id),
+                    {'image': ntf},
+                    format='multipart'
+                )
+        return res
+
+    def test_upload_returns_processing(self):
+        '''Test the upload response does not wait for the variants'''
+        res = self.upload()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PROCESSING)
+        self.assertEqual(res.data['image_variants'], {})
+
+    def test_variants_built(self):
+        '''Test resized variants without EXIF data are recorded'''
+        self.upload()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(
+            sorted(self.recipe.image_variants),
+            ['medium', 'thumbnail', 'webp']
+        )
+        path = os.path.join(
+            self.media_root.name,
+            self.recipe.image_variants['thumbnail']
+        )
+        with Image.open(path) as thumbnail:
+            self.assertEqual(thumbnail.size, (200, 150))
+            self.assertEqual(len(thumbnail.getexif()), 0)
+        with Image.open(os.path.join(
+            self.media_root.name,
+            self.recipe.image_variants['webp']
+        )) as webp:
+            self.assertEqual(webp.format, 'WEBP')
+
+    def test_existing_variants_reused(self):
+        '''Test the variants another recipe uses are neither deleted nor
+        rewritten when the same image is processed again'''
+        self.upload()
+        self.recipe.refresh_from_db()
+        variants = self.recipe.image_variants
+        paths = [
+            os.path.join(self.media_root.name, name)
+            for name in variants.values()
+        ]
+        inodes = [os.stat(path).st_ino for path in paths]
+
+        with patch('recipe.images.recipe_image_storage.delete') as delete, \
+                patch.object(Image.Image, 'save') as save:
+            self.assertEqual(build_variants(self.recipe.image.name), variants)
+        delete.assert_not_called()
+        save.assert_not_called()
+        self.assertEqual([os.stat(path).st_ino for path in paths], inodes)
+
+    def test_variant_urls_listed(self):
+        '''Test the recipe list exposes the variant URLs'''
+        self.upload()
+        res = self.client.get(RECIPE_URL)
+        variants = res.data['results'][0]['image_variants']
+        self.assertTrue(variants['thumbnail'].endswith('-thumbnail.jpg'))
+        self.assertTrue(variants['thumbnail'].startswith('http://'))
+
+
+class RecipeSearchTests(TestCase):
+    '''Test searching recipes by title, tag and ingredient names'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='pica@pau.com',
+            password='senhadopicapau123',
+            name='Pica-Pau'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.curry = create_recipe(self.user, title='Chickpea curry')
+        self.stew = create_recipe(self.user, title='Spicy stew')
+        self.salad = create_recipe(self.user, title='Green salad')
+
+    def search(self, terms, **params):
+        '''Return the ids of the recipes found for the terms'''
+        res = self.client.get(RECIPE_URL, {'search': terms, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_title(self):
+        '''Test searching recipes by words of their title'''
+        self.assertEqual(self.search('curries'), [self.curry.id])
+        self.assertEqual(self.search('curry -chickpea'), [])
+
+    def test_search_relations(self):
+        '''Test recipes are found by names of tags and ingredients linked
+        after they were created'''
+        self.stew.ingredients.add(create_ingredient(self.user, 'Chickpea'))
+        tag = create_tag(self.user, 'Vegan')
+        tag.recipe_set.add(self.salad)
+        self.assertEqual(
+            self.search('chickpea'),
+            [self.curry.id, self.stew.id]
+        )
+        self.assertEqual(self.search('vegan'), [self.salad.id])
+
+        tag.name = 'Raw'
+        tag.save()
+        self.assertEqual(self.search('vegan'), [])
+        self.assertEqual(self.search('raw'), [self.salad.id])
+        tag.delete()
+        self.assertEqual(self.search('raw'), [])
+
+    def test_search_title_ranked_first(self):
+        '''Test title matches rank above tag and ingredient matches'''
+        self.salad.tags.add(create_tag(self.user, 'Spicy'))
+        self.assertEqual(self.search('spicy'), [self.stew.id, self.salad.id])
+
+    def test_search_pages(self):
+        '''Test paging through the search results'''
+        for recipe in (self.stew, self.salad):
+            recipe.tags.add(create_tag(self.user, 'Curry'))
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids[0], self.curry.id)
+        self.assertCountEqual(
+            ids,
+            [self.curry.id, self.stew.id, self.salad.id]
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_search_invalid_cursor(self):
+        '''Test requesting a page of results with a cursor whose rank is
+        not a finite number'''
+        for position in ['["0.5", 1]', '[1e400, 1]', '[null, 1]']:
+            cursor = base64.b64encode(
+                urlencode({'p': position}).encode()
+            ).decode()
+            res = self.client.get(
+                RECIPE_URL,
+                {'search': 'curry', 'cursor': cursor}
+            )
+            self.assertEqual(
+                res.status_code,
+                status.HTTP_404_NOT_FOUND,
+                position
+            )
+
+    def test_search_queries(self):
+        '''Test a search runs a fixed number of queries'''
+        with self.assertNumQueries(2):
+            self.client.get(RECIPE_URL, {'search': 'curry'})
+
+
+class RecipeConditionalGetTests(TestCase):
+    '''Test answering unchanged recipe lists with 304 Not Modified'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='penelope@charmosa.com',
+            password='senhadapenelope123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def assertModified(self, etag):
+        '''Assert the recipe list no longer matches the ETag'''
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res['ETag']
+
+    def test_not_modified(self):
+        '''Test an unchanged list is answered without listing it'''
+        res = self.client.get(RECIPE_URL, {'search': 'sample'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            res2 = self.client.get(
+                RECIPE_URL,
+                {'search': 'sample'},
+                HTTP_IF_NONE_MATCH=f'"other", {res["ETag"]}'
+            )
+        self.assertEqual(res2.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_on_write(self):
+        '''Test updating, relinking and deleting recipes changes the ETag'''
+        etag = self.client.get(RECIPE_URL)['ETag']
+        self.client.patch(detail_url(self.recipe.id), {'title': 'Pie'})
+        etag = self.assertModified(etag)
+
+        ingredient = create_ingredient(self.user)
+        etag = self.assertModified(etag)
+        ingredient.recipe_set.add(self.recipe)
+        etag = self.assertModified(etag)
+        ingredient.recipe_set.clear()
+        etag = self.assertModified(etag)
+
+        self.client.delete(detail_url(self.recipe.id))
+        self.assertModified(etag)
+
+    def test_other_user_write(self):
+        '''Test writes of another user keep the ETag'''
+        etag = self.client.get(RECIPE_URL)['ETag']
+        other = get_user_model().objects.create_user(
+            email='tio@charmosa.com',
+            password='senhadotio123'
+        )
+        create_recipe(other)
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class RecipeResponseCacheTests(TestCase):
+    '''Test serving recipe responses from the response cache'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='peter@perfeito.com',
+            password='senhadopeter123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = create_tag(self.user, 'Vegan')
+        self.recipe = create_recipe(self.user)
+        self.recipe.tags.add(self.tag)
+        get_response_cache().clear()
+
+    def test_cached_responses(self):
+        '''Test repeated requests only read the collection version'''
+        for url, params in [
+            (RECIPE_URL, {'tags': self.tag.id}),
+            (detail_url(self.recipe.id), {}),
+        ]:
+            res = self.client.get(url, params)
+            with self.assertNumQueries(1):
+                res2 = self.client.get(url, params)
+            self.assertEqual(res2.status_code, status.HTTP_200_OK)
+            self.assertEqual(res2.data, res.data)
+        self.assertEqual(
+            get_response_cache().stats(),
+            {'hits': 2, 'misses': 2, 'hit_rate': 0.5}
+        )
+
+    def test_invalidated_on_write(self):
+        '''Test writes of the user are seen by the next request'''
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+        self.client.get(RECIPE_URL, {'tags': self.tag.id})
+
+        self.tag.name = 'Raw vegan'
+        self.tag.save()
+        res = self.client.get(url)
+        self.assertEqual(res.data['tags'][0]['name'], 'Raw vegan')
+
+        self.recipe.tags.remove(self.tag)
+        res = self.client.get(RECIPE_URL, {'tags': self.tag.id})
+        self.assertEqual(res.data['results'], [])
+        self.assertEqual(get_response_cache().stats()['hits'], 0)
+
+    def test_normalized_query(self):
+        '''Test the order of the query parameters does not matter'''
+        self.client.get(f'{RECIPE_URL}?tags={self.tag.id}&match=all')
+        with self.assertNumQueries(1):
+            self.client.get(f'{RECIPE_URL}?match=all&tags={self.tag.id}')
+
+    def test_errors_not_cached(self):
+        '''Test failed requests are not cached'''
+        self.client.get(detail_url(0))
+        res = self.client.get(detail_url(0))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(get_response_cache().stats()['hits'], 0)
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': False})
+    def test_disabled(self):
+        '''Test the cache can be turned off'''
+        self.client.get(detail_url(self.recipe.id))
+        with self.assertNumQueries(3):
+            self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(get_response_cache().stats()['hits'], 0)
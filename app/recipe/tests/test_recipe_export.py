@@ -0,0 +1,105 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(TestCase):
+    '''Test streaming the recipes of a user'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='penelope@charmosa.com',
+            password='senhadapenelope123',
+            name='Penelope Charmosa'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Carrot cake',
+            time_minutes=50,
+            price=15.5
+        )
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Sweet'),
+            Tag.objects.create(user=self.user, name='Baked')
+        )
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Carrot')
+        )
+        Recipe.objects.create(
+            user=self.user,
+            title='Plain bread',
+            time_minutes=90,
+            price=4
+        )
+        other_user = get_user_model().objects.create_user(
+            email='tiao@gaviao.com',
+            password='senhadotiao123'
+        )
+        Recipe.objects.create(
+            user=other_user,
+            title='Secret pie',
+            time_minutes=10,
+            price=1
+        )
+
+    def test_export_ndjson(self):
+        '''Test exporting recipes as newline delimited JSON'''
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        recipes = [json.loads(line) for line in lines]
+        self.assertEqual(recipes[0], {
+            'id': self.recipe.id,
+            'title': 'Carrot cake',
+            'time_minutes': 50,
+            'price': '15.50',
+            'link': '',
+            'tags': ['Baked', 'Sweet'],
+            'ingredients': ['Carrot'],
+        })
+        self.assertEqual(
+            [recipe['title'] for recipe in recipes],
+            ['Carrot cake', 'Plain bread']
+        )
+
+    def test_export_csv(self):
+        '''Test exporting recipes as CSV'''
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['tags'], 'Baked|Sweet')
+        self.assertEqual(rows[1]['ingredients'], '')
+
+    def test_export_invalid_type(self):
+        '''Test exporting recipes in an unknown type'''
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        '''Test exporting recipes with the command in several chunks'''
+        out = StringIO()
+        call_command(
+            'export_recipes',
+            user=self.user.email,
+            chunk_size=1,
+            stdout=out
+        )
+        recipes = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(recipes), 2)
+        self.assertEqual(recipes[0]['tags'], ['Baked', 'Sweet'])
@@ -0,0 +1,155 @@
+import json
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.parsers import iter_lines, NDJSONParser
+
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
+
+
+def ndjson(*documents):
+    '''Return the documents as newline delimited JSON'''
+    return ''.join(f'{json.dumps(document)}\n' for document in documents)
+
+
+class RecipeImportTests(TestCase):
+    '''Test importing recipes from newline delimited JSON'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='dick@vigarista.com',
+            password='senhadodick123',
+            name='Dick Vigarista'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Tofu'
+        )
+
+    def post(self, body):
+        '''Post the body to the import endpoint'''
+        return self.client.post(
+            IMPORT_URL,
+            body,
+            content_type='application/x-ndjson'
+        )
+
+    def recipe(self, **kwargs):
+        '''Return an importable recipe document'''
+        document = {
+            'title': 'Tofu stew',
+            'time_minutes': 30,
+            'price': '12.50',
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        }
+        document.update(kwargs)
+        return document
+
+    def test_import_recipes(self):
+        '''Test importing recipes with their tags and ingredients'''
+        res = self.post(ndjson(
+            self.recipe(),
+            self.recipe(title='Tofu salad', tags=[])
+        ))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['failed'], 0)
+        recipe = Recipe.objects.get(title='Tofu stew')
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+
+    def test_import_reports_line_errors(self):
+        '''Test invalid lines are reported without blocking valid ones'''
+        other_user = get_user_model().objects.create_user(
+            email='mutley@vigarista.com',
+            password='senhadomutley123'
+        )
+        other_tag = Tag.objects.create(user=other_user, name='Spicy')
+        body = '\n'.join([
+            json.dumps(self.recipe()),
+            '{not json',
+            json.dumps(self.recipe(time_minutes='soon')),
+            '',
+            json.dumps(self.recipe(tags=[other_tag.id])),
+        ])
+        res = self.post(body)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 3)
+        errors = {
+            error['line']: error['errors'] for error in res.data['errors']
+        }
+        self.assertEqual(sorted(errors), [2, 3, 5])
+        self.assertIn('time_minutes', errors[3])
+        self.assertIn('tags', errors[5])
+
+    @patch.object(NDJSONParser, 'max_line_length', 300)
+    def test_import_line_too_long(self):
+        '''Test lines longer than the limit are reported without being
+        read whole'''
+        body = ndjson(
+            self.recipe(),
+            self.recipe(title='x' * 1000),
+            self.recipe(title='Tofu salad')
+        )
+        res = self.post(body)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['errors'], [{
+            'line': 2,
+            'errors': {'non_field_errors': ['Line too long.']},
+        }])
+
+    def test_iter_lines(self):
+        '''Test lines up to the limit are read, with or without their
+        newline, and longer ones skipped'''
+        stream = BytesIO(b'abcd\nabcde\n' + b'x' * 12 + b'\nab')
+        self.assertEqual(
+            list(iter_lines(stream, 4)),
+            [b'abcd\n', None, None, b'ab']
+        )
+
+    def test_import_queries_per_batch(self):
+        '''Test a batch is written with a fixed number of queries'''
+        body = ndjson(*[self.recipe(title=f'Stew {n}') for n in range(50)])
+        with self.assertNumQueries(9):
+            self.post(body)
+        self.assertEqual(Recipe.objects.count(), 50)
+
+    def test_import_changes_etag(self):
+        '''Test an import changes the ETag of the recipe list'''
+        url = reverse('recipe:recipe-list')
+        etag = self.client.get(url)['ETag']
+        self.post(ndjson(self.recipe()))
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_import_command(self):
+        '''Test importing recipes from a file with the command'''
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as ntf:
+            ntf.write(ndjson(*[self.recipe() for _ in range(3)]))
+            ntf.flush()
+            out = StringIO()
+            call_command(
+                'import_recipes',
+                ntf.name,
+                user=self.user.email,
+                batch_size=2,
+                stdout=out
+            )
+        self.assertIn('3 recipes imported', out.getvalue())
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
@@ -0,0 +1,162 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': False})
+class SparseFieldsTests(TestCase):
+    '''Test picking the fields of the recipes, tags and ingredients with
+    ?fields= and ?exclude='''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='magro@esparso.com',
+            password='senhadomagro123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Curry', 'Vegan', 'Dessert']
+        ]
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        self.recipes = []
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Curry {index}',
+                time_minutes=30,
+                price=12
+            )
+            recipe.tags.add(*self.tags)
+            recipe.ingredients.add(ingredient)
+            self.recipes.append(recipe)
+
+    def get(self, url, params):
+        '''Return the response and the SQL of its queries'''
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, '\n'.join(query['sql'] for query in queries)
+
+    def test_fields(self):
+        '''Test only the requested fields are read and returned, with and
+        without the values() lists'''
+        for values_lists in (True, False):
+            with self.subTest(values_lists=values_lists), \
+                    self.settings(RECIPE_VALUES_LISTS=values_lists):
+                res, sql = self.get(RECIPE_URL, {'fields': 'title,id'})
+                for recipe in res.data['results']:
+                    self.assertEqual(list(recipe), ['id', 'title'])
+                self.assertNotIn('"price"', sql)
+                self.assertNotIn('core_recipe_tags', sql)
+                self.assertNotIn('core_recipe_ingredients', sql)
+
+    def test_exclude(self):
+        '''Test the excluded fields are neither read nor returned'''
+        for values_lists in (True, False):
+            with self.subTest(values_lists=values_lists), \
+                    self.settings(RECIPE_VALUES_LISTS=values_lists):
+                res, sql = self.get(
+                    RECIPE_URL,
+                    {'exclude': 'ingredients, image_variants'}
+                )
+                recipe = res.data['results'][0]
+                self.assertNotIn('ingredients', recipe)
+                self.assertNotIn('image_variants', recipe)
+                self.assertEqual(len(recipe['tags']), 3)
+                self.assertIn('core_recipe_tags', sql)
+                self.assertNotIn('core_recipe_ingredients', sql)
+                self.assertNotIn('"image_variants"', sql)
+
+    def test_fields_and_exclude(self):
+        '''Test the excluded fields are removed from the requested ones'''
+        res = self.client.get(RECIPE_URL, {
+            'fields': 'id,title,tags',
+            'exclude': 'tags',
+        })
+        self.assertEqual(list(res.data['results'][0]), ['id', 'title'])
+
+    def test_retrieve(self):
+        '''Test the fields of a recipe detail, whose tags keep all their
+        fields'''
+        res, sql = self.get(
+            detail_url(self.recipes[0].id),
+            {'fields': 'title,tags'}
+        )
+        self.assertEqual(list(res.data), ['title', 'tags'])
+        self.assertEqual(list(res.data['tags'][0]), ['id', 'name'])
+        self.assertNotIn('core_recipe_ingredients', sql)
+
+    def test_search(self):
+        '''Test searched recipes are ranked and paged with few fields'''
+        params = {'search': 'curry', 'fields': 'id', 'page_size': 2}
+        res, sql = self.get(RECIPE_URL, params)
+        ids = [recipe['id'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [recipe['id'] for recipe in res.data['results']]
+        self.assertCountEqual(ids, [recipe.id for recipe in self.recipes])
+
+    def test_name_pages(self):
+        '''Test tags are paged on their names when only ids are wanted'''
+        for values_lists in (True, False):
+            with self.subTest(values_lists=values_lists), \
+                    self.settings(RECIPE_VALUES_LISTS=values_lists):
+                res = self.client.get(
+                    TAG_URL,
+                    {'fields': 'id', 'page_size': 2}
+                )
+                ids = [tag['id'] for tag in res.data['results']]
+                with self.assertNumQueries(2):
+                    res = self.client.get(res.data['next'])
+                ids += [tag['id'] for tag in res.data['results']]
+                self.assertEqual(
+                    ids,
+                    [tag.id for tag in sorted(
+                        self.tags,
+                        key=lambda tag: tag.name,
+                        reverse=True
+                    )]
+                )
+                self.assertEqual(list(res.data['results'][0]), ['id'])
+
+    def test_unknown_fields(self):
+        '''Test unknown fields are refused'''
+        for param in ['fields', 'exclude']:
+            res = self.client.get(RECIPE_URL, {param: 'id,secret'})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(param, res.data)
+
+    def test_no_fields(self):
+        '''Test requests leaving no field to return are refused'''
+        for url, params, param in [
+            (RECIPE_URL, {'fields': ''}, 'fields'),
+            (TAG_URL, {'fields': ' , '}, 'fields'),
+            (RECIPE_URL, {'fields': 'id', 'exclude': 'id'}, 'fields'),
+            (TAG_URL, {'exclude': 'id,name'}, 'exclude'),
+        ]:
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(param, res.data)
+
+    def test_writes_ignore_fields(self):
+        '''Test created objects are returned whole'''
+        res = self.client.post(
+            f'{TAG_URL}?fields=id',
+            {'name': 'Quick'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(res.data), ['id', 'name'])
@@ -1,3 +1,6 @@
+import base64
+from urllib.parse import urlencode
+
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -7,6 +10,7 @@ from recipe.serializers import TagSerializer
 from django.test import TestCase
 
 TAGS_URL = reverse('recipe:tag-list')
+AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
 
 
 class PublicTagAPITest(TestCase):
@@ -45,7 +49,7 @@ class PrivateTagAPITest(TestCase):
         tags = Tag.objects.order_by('-name').all()
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_limited_to_user(self):
         '''Test listing logged user tags only'''
@@ -64,8 +68,8 @@ class PrivateTagAPITest(TestCase):
         )
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag(self):
         '''Test creating a valid tag'''
@@ -110,5 +114,239 @@ class PrivateTagAPITest(TestCase):
         serializer2 = TagSerializer(tag2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
+
+
+class TagPaginationTests(TestCase):
+    '''Test the keyset pagination of the tag list'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='ryu@hoshi.com',
+            name='Ryu Hoshi',
+            password='senhadoryu123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name in ['Vegan', 'Sweet', 'Sweet', 'Sweet', 'Italian']:
+            Tag.objects.create(user=self.user, name=name)
+        self.expected = list(
+            Tag.objects.order_by('-name', '-id').values_list('id', flat=True)
+        )
+
+    def test_paginate_tags(self):
+        '''Test walking forward through pages splitting equal names'''
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        ids = [tag['id'] for tag in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [tag['id'] for tag in res.data['results']]
+        self.assertEqual(ids, self.expected)
+
+    def test_paginate_tags_backwards(self):
+        '''Test going back to the previous page'''
+        first = self.client.get(TAGS_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        res = self.client.get(second.data['previous'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], first.data['results'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_invalid_cursor(self):
+        '''Test requesting a page with a malformed cursor'''
+        res = self.client.get(TAGS_URL, {'cursor': 'bm90LWEtY3Vyc29y'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_cursor_position(self):
+        '''Test requesting a page with a cursor whose key has the wrong
+        types'''
+        for position in [
+            '["Sweet", "abc"]',
+            '["Sweet", {"a": 1}]',
+            '["Sweet", 1e400]',
+            '["Sweet", null]',
+            '["Sweet", true]',
+            '["Sweet", 1.5]',
+            '["Sweet", 99999999999999999999]',
+            '[1, 2]',
+            '["Sw\\u0000eet", 2]',
+        ]:
+            cursor = base64.b64encode(
+                urlencode({'p': position}).encode()
+            ).decode()
+            res = self.client.get(TAGS_URL, {'cursor': cursor})
+            self.assertEqual(
+                res.status_code,
+                status.HTTP_404_NOT_FOUND,
+                position
+            )
+
+    def test_full_list_opt_in(self):
+        '''Test listing every tag without pagination'''
+        res = self.client.get(TAGS_URL, {'paginate': 'false'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['id'] for tag in res.data], self.expected)
+
+
+class TagBulkCreateTests(TestCase):
+    '''Test creating several tags with a single request'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='ken@masters.com',
+            name='Ken Masters',
+            password='senhadoken123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        '''Test creating every tag of an array'''
+        payload = [{'name': 'Vegan'}, {'name': 'Quick'}]
+        res = self.client.post(TAGS_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result['status'] for result in res.data],
+            ['created', 'created']
+        )
+        names = Tag.objects.filter(user=self.user).values_list(
+            'name',
+            flat=True
+        )
+        self.assertEqual(sorted(names), ['Quick', 'Vegan'])
+        self.assertEqual(res.data[0]['data']['name'], 'Vegan')
+
+    def test_bulk_create_single_query(self):
+        '''Test the number of queries does not grow with the batch'''
+        for size in (10, 100):
+            payload = [{'name': f'Tag {index}'} for index in range(size)]
+            with self.assertNumQueries(3):
+                self.client.post(
+                    f'{TAGS_URL}?skip_existing=true',
+                    payload,
+                    format='json'
+                )
+
+    def test_bulk_create_skip_existing(self):
+        '''Test skipping names the user already has'''
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Vegan'}, {'name': 'Quick'}, {'name': 'Quick'}]
+        res = self.client.post(
+            f'{TAGS_URL}?skip_existing=true',
+            payload,
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result['status'] for result in res.data],
+            ['skipped', 'created', 'skipped']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_invalid_items(self):
+        '''Test invalid items are reported without blocking valid ones'''
+        payload = [{'name': ''}, {'name': 'Quick'}]
+        res = self.client.post(TAGS_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data[0]['status'], 'invalid')
+        self.assertIn('name', res.data[0]['errors'])
+        self.assertEqual(res.data[1]['status'], 'created')
+
+    def test_bulk_create_empty(self):
+        '''Test sending an empty array'''
+        res = self.client.post(TAGS_URL, [], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TagAutocompleteTests(TestCase):
+    '''Test suggesting tags for a typed text'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='peter@perfeito.com',
+            password='senhadopeter123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name in ['Vegan', 'Vegetarian', 'Gluten free']:
+            Tag.objects.create(user=self.user, name=name)
+
+    def test_autocomplete_tags(self):
+        '''Test suggesting tags with two queries at most'''
+        with self.assertNumQueries(2):
+            res = self.client.get(AUTOCOMPLETE_URL, {'q': 'veg'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data],
+            ['Vegan', 'Vegetarian']
+        )
+
+
+class TagConditionalGetTests(TestCase):
+    '''Test answering unchanged tag lists with 304 Not Modified'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='ana@anagrama.com',
+            password='senhadaana123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+    def test_not_modified(self):
+        '''Test repeating a list request with its ETag in one query'''
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', res['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            res2 = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res2.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res2['ETag'], res['ETag'])
+
+    def test_etag_changes_on_write(self):
+        '''Test creating, renaming and linking tags changes the ETag'''
+        etags = [self.client.get(TAGS_URL)['ETag']]
+        tag = Tag.objects.create(user=self.user, name='Quick')
+        etags.append(self.client.get(TAGS_URL)['ETag'])
+        tag.name = 'Fast'
+        tag.save()
+        etags.append(self.client.get(TAGS_URL)['ETag'])
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Salad',
+            time_minutes=5,
+            price=2
+        )
+        etags.append(self.client.get(TAGS_URL)['ETag'])
+        recipe.tags.add(tag)
+        etags.append(self.client.get(TAGS_URL)['ETag'])
+        self.client.post(TAGS_URL, [{'name': 'Cheap'}], format='json')
+        etags.append(self.client.get(TAGS_URL)['ETag'])
+
+        self.assertEqual(len(set(etags)), len(etags))
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_per_query_and_user(self):
+        '''Test the ETag differs between query strings and users'''
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.assertEqual(
+            self.client.get(TAGS_URL, {'assigned_only': 1})['ETag'],
+            self.client.get(TAGS_URL, {'assigned_only': 1})['ETag']
+        )
+        self.assertNotEqual(
+            self.client.get(TAGS_URL, {'assigned_only': 1})['ETag'],
+            etag
+        )
+
+        other = get_user_model().objects.create_user(
+            email='bia@anagrama.com',
+            password='senhadabia123'
+        )
+        self.client.force_authenticate(other)
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,150 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.readers import ValuesReader
+from recipe.serializers import DetailSerializer, RecipeSerializer
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': False})
+class ValuesListParityTests(TestCase):
+    '''Test the lists built from values() rows are identical to the ones
+    built by the serializers'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='gemeos@paridade.com',
+            password='senhadosgemeos123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Vegan', 'Dessert', 'Curry', 'Vegan', 'Açaí']
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ['Flour', 'Cocoa', 'Rice', 'Coconut milk']
+        ]
+        for index in range(12):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Curry {index}' if index % 3 else f'Cake {index}',
+                time_minutes=5 + index,
+                price=Decimal(index * 7) + Decimal('0.5'),
+                link=f'https://example.com/{index}' if index % 2 else ''
+            )
+            # Added in reverse to tell id order from insertion order
+            recipe.tags.add(*reversed(tags[:index % 5]))
+            recipe.ingredients.add(*reversed(ingredients[index % 4:]))
+        Recipe.objects.filter(title='Cake 3').update(
+            image='uploads/recipe/cake.jpg',
+            image_status=Recipe.IMAGE_READY,
+            image_variants={'thumbnail': 'uploads/recipe/cake_thumb.webp'}
+        )
+        other = get_user_model().objects.create_user(
+            email='outro@paridade.com',
+            password='senhadooutro123'
+        )
+        Tag.objects.create(user=other, name='Hidden')
+
+    def get(self, url, params=None):
+        '''Return the responses of both list implementations'''
+        responses = []
+        for values_lists in (False, True):
+            with self.settings(RECIPE_VALUES_LISTS=values_lists):
+                responses.append(self.client.get(url, params))
+        return responses
+
+    def assertIdentical(self, url, params=None):
+        '''Assert both implementations answer the same bytes and return
+        the response'''
+        serialized, values = self.get(url, params)
+        self.assertEqual(serialized.status_code, values.status_code)
+        self.assertEqual(serialized.content, values.content)
+        self.assertEqual(serialized['ETag'], values['ETag'])
+        return values
+
+    def test_recipe_pages(self):
+        '''Test every page of the recipes and their links are identical'''
+        res = self.assertIdentical(RECIPE_URL, {'page_size': 5})
+        pages = 1
+        while res.data['next']:
+            res = self.assertIdentical(res.data['next'])
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertIdentical(res.data['previous'])
+
+    def test_recipe_lists(self):
+        '''Test unpaginated, filtered and searched recipes are identical'''
+        tag = Tag.objects.get(name='Curry')
+        ingredient = Ingredient.objects.get(name='Rice')
+        for params in [
+            {},
+            {'paginate': 'false'},
+            {'tags': tag.id},
+            {'tags': tag.id, 'ingredients': ingredient.id, 'match': 'all'},
+            {'search': 'curry', 'page_size': 3},
+            {'search': 'vegan -cake'},
+            {'search': 'nothing matches'},
+        ]:
+            with self.subTest(params=params):
+                res = self.assertIdentical(RECIPE_URL, params)
+                if params.get('page_size'):
+                    self.assertIdentical(res.data['next'])
+
+    def test_recipe_representation(self):
+        '''Test prices, links, relations and image variants are rendered'''
+        res = self.assertIdentical(RECIPE_URL, {'paginate': 'false'})
+        cake = next(r for r in res.data if r['title'] == 'Cake 3')
+        self.assertEqual(cake['price'], '21.50')
+        self.assertTrue(cake['image_variants']['thumbnail'].startswith(
+            'http://testserver/'
+        ))
+        ids = cake['tags']
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(ids), 3)
+
+    def test_names(self):
+        '''Test the tags and ingredients lists are identical'''
+        for url in [TAG_URL, INGREDIENT_URL]:
+            for params in [{}, {'page_size': 2}, {'paginate': 'false'}]:
+                with self.subTest(url=url, params=params):
+                    res = self.assertIdentical(url, params)
+                    if params.get('page_size'):
+                        self.assertIdentical(res.data['next'])
+
+    def test_queries(self):
+        '''Test a page of recipes is read with a single query'''
+        with self.settings(RECIPE_VALUES_LISTS=True):
+            with self.assertNumQueries(2):
+                self.client.get(RECIPE_URL)
+        with self.settings(RECIPE_VALUES_LISTS=False):
+            with self.assertNumQueries(4):
+                self.client.get(RECIPE_URL)
+
+
+class ValuesReaderTests(TestCase):
+    '''Test the serializers the values reader supports'''
+
+    def test_supported(self):
+        '''Test the fields of RecipeSerializer are read from values()'''
+        reader = ValuesReader(RecipeSerializer())
+        self.assertIn('price', reader.columns)
+        self.assertEqual(
+            sorted(reader.arrays),
+            ['values_ingredients', 'values_tags']
+        )
+
+    def test_nested_serializers(self):
+        '''Test nested serializers are refused'''
+        with self.assertRaises(ValueError):
+            ValuesReader(DetailSerializer())
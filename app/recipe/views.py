@@ -1,29 +1,136 @@
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
 from rest_framework.decorators import action
 from rest_framework import mixins, status, viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
-from core.models import Ingredient, Recipe, Tag
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+from .exporters import RecipeExporter
+from .filters import NameAutocomplete, RecipeFilter
+from .images import schedule_image_processing
+from .importers import RecipeImporter
+from .mixins import (
+    CachedResponseMixin, CollectionETagMixin, SparseFieldsMixin,
+    ValuesListMixin
+)
+from .pagination import (
+    NameKeysetPagination, RecipeCursorPagination, RecipeSearchPagination
+)
+from .parsers import NDJSONParser
 from .serializers import (
     DetailSerializer, ImageSerializer, IngredientSerializer, RecipeSerializer,
     TagSerializer
 )
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
+from core.authentication import CachedTokenAuthentication
 
 
 # Create your views here.
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,
-                            mixins.CreateModelMixin):
-    authentication_classes = [TokenAuthentication]
+class BaseRecipeAttrViewSet(CollectionETagMixin, SparseFieldsMixin,
+                            ValuesListMixin, viewsets.GenericViewSet,
+                            mixins.ListModelMixin, mixins.CreateModelMixin):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = NameKeysetPagination
+    bulk_max_items = 1000
 
     def get_queryset(self):
         '''Return objects for the authenticated user'''
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        return self.get_sparse_queryset(self.queryset.filter(
+            user=self.request.user
+        ).order_by('-name', '-id'))
+
+    def create(self, request, *args, **kwargs):
+        '''Create one object, or every object of a JSON array at once'''
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         ''' Create object'''
         serializer.save(user=self.request.user)
 
+    def bulk_create(self, request):
+        '''Validate every item of the array and insert the valid ones with a
+        single query. ?skip_existing=true skips the names the user already
+        has. The response lists the result of each item in the array order:
+        created, skipped or invalid'''
+        items = request.data
+        if not items:
+            raise ValidationError(_('Expected a non-empty list of items.'))
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                _('Expected at most {count} items.').format(
+                    count=self.bulk_max_items
+                )
+            )
+
+        serializer = self.get_serializer()
+        results = []
+        for item in items:
+            try:
+                results.append({
+                    'status': 'created',
+                    'data': serializer.run_validation(item),
+                })
+            except ValidationError as exc:
+                results.append({'status': 'invalid', 'errors': exc.detail})
+
+        skip_existing = request.query_params.get('skip_existing', '')
+        if skip_existing.lower() in ('1', 'true', 'yes', 'on'):
+            self._skip_existing(results)
+
+        created = [
+            result for result in results if result['status'] == 'created'
+        ]
+        objects = self.queryset.model.objects.bulk_create([
+            self.queryset.model(user=request.user, **result['data'])
+            for result in created
+        ])
+        for result, obj in zip(created, objects):
+            result['data'] = self.get_serializer(obj).data
+        if objects:
+            # bulk_create sends no post_save signal
+            CollectionVersion.objects.bump(request.user.id)
+
+        invalid = sum(result['status'] == 'invalid' for result in results)
+        if invalid == len(results):
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif invalid:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response(results, status=response_status)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        '''Return the names of the user best matching the typed text'''
+        suggestions = NameAutocomplete(request.query_params).suggest(
+            self.queryset.filter(user=request.user)
+        )
+        serializer = self.get_serializer(suggestions, many=True)
+        return Response(serializer.data)
+
+    def _skip_existing(self, results):
+        '''Mark the items named like an object of the user, or like an
+        earlier item, as skipped'''
+        names = {
+            result['data']['name'] for result in results
+            if result['status'] == 'created'
+        }
+        seen = set(self.queryset.filter(
+            user=self.request.user,
+            name__in=names
+        ).values_list('name', flat=True))
+        for result in results:
+            if result['status'] != 'created':
+                continue
+            name = result['data']['name']
+            if name in seen:
+                result['status'] = 'skipped'
+            seen.add(name)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     '''Viewset to manage tags in database'''
@@ -37,31 +144,46 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CollectionETagMixin, CachedResponseMixin,
+                    SparseFieldsMixin, ValuesListMixin, viewsets.ModelViewSet):
     '''Viewset to manage recipes in database'''
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-
-    def _params_to_int(self, param):
-        '''Convert a list of numeric strings into a list of integers'''
-        return [int(str_id) for str_id in param.split(',')]
+    pagination_class = RecipeCursorPagination
 
     def get_queryset(self):
         '''Return recipes for the authenticated user'''
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
+        recipe_filter = RecipeFilter(self.request.query_params)
+        queryset = recipe_filter.filter_queryset(self.queryset)
+        queryset = queryset.filter(user=self.request.user)
+        if recipe_filter.is_search():
+            queryset = queryset.order_by('-rank', '-id')
+        else:
+            queryset = queryset.order_by('-id')
+        if self.action in ('list', 'retrieve'):
+            # Load every recipe's tags and ingredients in two extra queries
+            # instead of two per recipe, ordered like the id arrays of
+            # ValuesReader, unless the client left them out
+            for name, model in [('tags', Tag), ('ingredients', Ingredient)]:
+                if self.wanted_field(name):
+                    queryset = queryset.prefetch_related(
+                        Prefetch(name, queryset=model.objects.order_by('id'))
+                    )
+            queryset = self.get_sparse_queryset(queryset)
 
-        if tags:
-            tag_ids = self._params_to_int(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredients_ids = self._params_to_int(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+        return queryset
 
-        return queryset.filter(user=self.request.user).order_by('-id')
+    @property
+    def paginator(self):
+        '''Return the paginator, ordering searches by rank'''
+        if not hasattr(self, '_paginator'):
+            if RecipeFilter(self.request.query_params).is_search():
+                self._paginator = RecipeSearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_serializer_class(self):
         '''Return appropriated serializer class'''
@@ -85,7 +207,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(
+                image_status=Recipe.IMAGE_PROCESSING,
+                image_variants={}
+            )
+            schedule_image_processing(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -95,3 +221,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        parser_classes=[NDJSONParser]
+    )
+    def import_recipes(self, request):
+        '''Import recipes from a newline delimited JSON body'''
+        importer = RecipeImporter(request.user)
+        return Response(
+            importer.run(request.data),
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        '''Stream every recipe as newline delimited JSON, or as CSV with
+        ?type=csv'''
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in RecipeExporter.content_types:
+            raise ValidationError({
+                'type': [_('Expected one of: ndjson, csv.')]
+            })
+
+        exporter = RecipeExporter(request.user)
+        response = StreamingHttpResponse(
+            exporter.iter_lines(export_type),
+            content_type=RecipeExporter.content_types[export_type]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_type}"'
+        )
+        return response
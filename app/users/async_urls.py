@@ -0,0 +1,8 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'users-async'
+
+urlpatterns = [
+    path('me/', async_views.me, name='me'),
+]
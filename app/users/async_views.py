@@ -0,0 +1,6 @@
+from core.async_views import async_api_view
+from .views import ManageUserView
+
+me = async_api_view(ManageUserView.as_view(
+    http_method_names=['get', 'head', 'options']
+))
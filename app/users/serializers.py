@@ -1,9 +1,10 @@
 from django.contrib.auth import authenticate, get_user_model
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from core.metrics import MeasuredSerializerMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(
         write_only=True,
         min_length=5,
@@ -2,11 +2,14 @@ from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
 
 CREATE_USER_URL = reverse('users:create')
 TOKEN_URL = reverse('users:token')
 ME_URL = reverse('users:me')
+ASYNC_ME_URL = reverse('users-async:me')
 
 
 class PublicUsersAPITest(TestCase):
@@ -133,3 +136,40 @@ class PrivateUsersAPITest(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class AsyncUsersAPITest(TransactionTestCase):
+    '''Test the async user management endpoint'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='tom@assincrono.com',
+            password='Grf5!HwC',
+            name='Tom Assincrono'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        # The async client of Django 4.0 takes headers by their HTTP names
+        self.headers = {'authorization': f'Token {token.key}'}
+
+    def test_retrieve_profile(self):
+        '''Test retrieving the profile from the async endpoint'''
+        res = async_to_sync(self.client.get)(
+            ASYNC_ME_URL,
+            **self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {
+            'email': self.user.email,
+            'name': self.user.name,
+        })
+
+    def test_update_not_allowed(self):
+        '''Test the async endpoint does not update the profile'''
+        res = async_to_sync(self.client.patch)(
+            ASYNC_ME_URL,
+            {'name': 'Outro'},
+            content_type='application/json',
+            **self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -3,7 +3,7 @@ from .serializers import AuthTokenSerializer, UserSerializer
 from rest_framework.generics import CreateAPIView, RetrieveUpdateAPIView
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
+from core.authentication import CachedTokenAuthentication
 
 
 # Create your views here.
@@ -21,7 +21,7 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserView(RetrieveUpdateAPIView):
     '''View that helps managing the user profile'''
     serializer_class = UserSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):